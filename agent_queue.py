@@ -0,0 +1,134 @@
+import contextvars
+import heapq
+import itertools
+import threading
+import uuid
+
+
+INTERACTIVE = 0
+BACKGROUND = 10
+
+
+class QueueFullError(Exception):
+  pass
+
+
+class AgentJob:
+  """One agent run waiting in (or taken from) an AgentJobQueue."""
+
+  def __init__(self, prompt, priority, thread_id=None, coalesce_key=None, emit=None, context=None):
+    self.id = uuid.uuid4().hex[:8]
+    self.prompts = [prompt]
+    self.priority = priority
+    self.thread_id = thread_id or f'job-{self.id}'
+    self.coalesce_key = coalesce_key
+    self.emit = emit
+    self.context = context or contextvars.copy_context()
+    self.status = 'pending'
+    self.error = None
+    self._done = threading.Event()
+    self._cancelled = threading.Event()
+
+  @property
+  def prompt(self):
+    if len(self.prompts) == 1:
+      return self.prompts[0]
+    return f'{len(self.prompts)} related alerts were raised:\n' + '\n'.join(f'- {p}' for p in self.prompts)
+
+  @property
+  def cancelled(self):
+    return self._cancelled.is_set()
+
+  @property
+  def done(self):
+    return self._done.is_set()
+
+  def cancel(self):
+    self._cancelled.set()
+
+  def wait(self, timeout=None):
+    return self._done.wait(timeout)
+
+  def _finish(self, status, error=None):
+    self.status = status
+    self.error = error
+    self._done.set()
+
+
+class AgentJobQueue:
+  """Runs agent jobs one at a time on a single worker thread.
+
+  Interactive jobs always go before background ones. Background jobs sharing a
+  coalesce_key are merged while still pending, so an alert storm becomes one
+  diagnosis, and at most `max_background` of them may wait at once; beyond that
+  submit() raises QueueFullError. Each job runs in the contextvars context it was
+  submitted from, so per-session permission prompts keep working.
+  """
+
+  def __init__(self, runner, max_background=20):
+    self.runner = runner
+    self.max_background = max_background
+    self.current = None
+    self._heap = []
+    self._jobs = {}
+    self._seq = itertools.count()
+    self._cond = threading.Condition()
+    self._worker = None
+
+  def _ensure_worker(self):
+    if self._worker is None or not self._worker.is_alive():
+      self._worker = threading.Thread(target=self._run, name='agent-queue', daemon=True)
+      self._worker.start()
+
+  def submit(self, prompt, priority=INTERACTIVE, thread_id=None, coalesce_key=None, emit=None):
+    with self._cond:
+      if coalesce_key is not None:
+        for job in self._jobs.values():
+          if job.coalesce_key == coalesce_key and job.status == 'pending' and not job.cancelled:
+            if prompt not in job.prompts:
+              job.prompts.append(prompt)
+            return job
+      if priority >= BACKGROUND:
+        waiting = sum(1 for j in self._jobs.values() if j.priority >= BACKGROUND and j.status == 'pending')
+        if waiting >= self.max_background:
+          raise QueueFullError(f'{waiting} background jobs are already waiting')
+      job = AgentJob(prompt, priority, thread_id=thread_id, coalesce_key=coalesce_key, emit=emit)
+      self._jobs[job.id] = job
+      heapq.heappush(self._heap, (priority, next(self._seq), job))
+      self._ensure_worker()
+      self._cond.notify()
+      return job
+
+  def cancel(self, job_id):
+    with self._cond:
+      job = self._jobs.get(job_id)
+    if job is None:
+      return False
+    job.cancel()
+    return True
+
+  def pending(self):
+    with self._cond:
+      return [job for _, _, job in sorted(self._heap) if job.status == 'pending']
+
+  def _run(self):
+    while True:
+      with self._cond:
+        while not self._heap:
+          self._cond.wait()
+        _, _, job = heapq.heappop(self._heap)
+        if job.cancelled:
+          self._jobs.pop(job.id, None)
+          job._finish('cancelled')
+          continue
+        job.status = 'running'
+        self.current = job
+      try:
+        job.context.run(self.runner, job)
+        job._finish('cancelled' if job.cancelled else 'done')
+      except Exception as e:
+        job._finish('failed', e)
+      finally:
+        with self._cond:
+          self.current = None
+          self._jobs.pop(job.id, None)
@@ -1,17 +1,81 @@
 import os
+import sys
 
-# Check for .env before importing frontend_cli which imports backend
-if not os.path.exists('.env'):
-  try:
-    from setup_wizard import run_setup
 
-    run_setup()
-  except ImportError:
-    print('Error: setup_wizard module not found. Please ensure all files are installed correctly.')
-    exit(1)
+def ensure_setup():
+  # Check for .env before importing frontend_cli which imports backend
+  if not os.path.exists('.env'):
+    try:
+      from setup_wizard import run_setup
 
-from frontend_cli import run_cli
+      run_setup()
+    except ImportError:
+      print('Error: setup_wizard module not found. Please ensure all files are installed correctly.')
+      exit(1)
 
 
-if __name__ == '__main__':
+def main():
+  args = sys.argv[1:]
+  if '--profile' in args:
+    # Read by backend's TurnProfiler, so daemons and one-shot requests are profiled too
+    args.remove('--profile')
+    os.environ['DEVPY_PROFILE'] = '1'
+  if '--record' in args:
+    # Read by backend's SessionRecorder; replay the file later with `devpy-cli replay <file>`
+    position = args.index('--record')
+    if position + 1 >= len(args):
+      print('Usage: devpy-cli --record <recording.json>')
+      sys.exit(2)
+    os.environ['DEVPY_RECORD'] = args[position + 1]
+    del args[position : position + 2]
+  startup_profiler = None
+  if '--profile-startup' in args:
+    args.remove('--profile-startup')
+    from profiler import TurnProfiler
+
+    startup_profiler = TurnProfiler(enabled=True)
+  if args and args[0] == 'replay':
+    # Offline: no .env, daemon, Docker daemon or LLM credentials needed
+    from session_recorder import run_replay_command
+
+    sys.exit(run_replay_command(args[1:]))
+
+  if args and args[0] == 'daemon':
+    ensure_setup()
+    from daemon_server import run_daemon_command
+
+    run_daemon_command(args[1:])
+    return
+
+  # Thin clients: when a daemon is running, skip the heavy backend import entirely
+  from daemon_client import DaemonClient, run_one_shot, run_thin_cli
+
+  client = DaemonClient()
+  if args and args[0] == 'ask':
+    user_input = ' '.join(args[1:])
+    if client.is_running():
+      sys.exit(run_one_shot(client, user_input))
+    ensure_setup()
+    from backend import submit_agent_request
+
+    submit_agent_request(user_input)
+    return
+
+  if client.is_running():
+    run_thin_cli(client)
+    return
+
+  ensure_setup()
+  if startup_profiler is None:
+    from frontend_cli import run_cli
+  else:
+    # Importing frontend_cli builds the backend: Docker client, LLM router and agent
+    with startup_profiler.profile('startup') as report:
+      from frontend_cli import run_cli
+    print('\n'.join(report[0].summary()))
+
   run_cli()
+
+
+if __name__ == '__main__':
+  main()
@@ -3,20 +3,41 @@ import threading
 import psutil
 import docker
 import time
-import tempfile
-import atexit
 import re
-from docker.transport import SSHHTTPAdapter
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dotenv import load_dotenv
 from rich.console import Console
 from rich.markdown import Markdown
 from langchain_core.tools import tool
+from langchain_core.utils.function_calling import convert_to_openai_tool
 from langgraph.prebuilt import create_react_agent
 from langgraph.checkpoint.memory import MemorySaver
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.callbacks import BaseCallbackHandler
 from permissions_manager import PermissionManager, PermissionDecision
 from config_manager import ConfigManager
 from ssh_key_manager import SSHKeyManager
+from ssh_transport import APIVersionCache, ManagedSSHAdapter
+from events_watcher import EventsWatcher
+from stats_store import StatsStore, downsample, summarize
+from stats_sampler import StatsSampler
+from agent_queue import BACKGROUND, INTERACTIVE, AgentJobQueue, QueueFullError
+from metrics_server import MetricsRegistry, MetricsServer
+from response_cache import ResponseCache
+from query_cache import QueryCache, inventory_fingerprint
+from tool_selector import ToolSelector
+from container_resolver import ContainerIndex, ContainerResolutionError
+from disk_reclaim import ReclaimPlan
+import container_copy
+from image_builder import BuildContext, BuildManifest, build_key, run_build
+from log_export import export_logs as export_log_archives, parse_time
+from llm.router import build_router
+from profiler import TurnProfiler
+from session_recorder import RECORDING_WARNING, SessionRecorder
+from fleet_manager import DEFAULT_HOST, DockerClientPool, FleetManager, format_partial_failures
 
 load_dotenv()
 
@@ -24,121 +45,285 @@ console = Console()
 
 config_manager = ConfigManager()
 ssh_key_manager = SSHKeyManager()
-_docker_client = None
-_ssh_temp_key_path = None
+api_version_cache = APIVersionCache()
+_passphrase_lock = threading.Lock()
 
 
-def cleanup_temp_key():
-  global _ssh_temp_key_path
-  if _ssh_temp_key_path and os.path.exists(_ssh_temp_key_path):
-    try:
-      os.remove(_ssh_temp_key_path)
-    except Exception:
-      pass
-
-
-atexit.register(cleanup_temp_key)
+def _load_ssh_key(key_name):
+  # Decrypted keys stay in memory as paramiko key objects, shared across hosts and reconnects
+  pkey = ssh_key_manager.get_cached_pkey(key_name)
+  if pkey is not None:
+    return pkey
+  # Fan-out may connect several hosts at once; prompt (and derive) once per key
+  with _passphrase_lock:
+    pkey = ssh_key_manager.get_cached_pkey(key_name)
+    if pkey is None:
+      passphrase = os.getenv('DOCKER_SSH_PASSPHRASE')
+      if not passphrase:
+        from rich.prompt import Prompt
 
+        passphrase = Prompt.ask(f"Enter passphrase for key '{key_name}'", password=True)
+      pkey = ssh_key_manager.load_pkey(key_name, passphrase)
+  return pkey
 
-class CustomSSHAdapter(SSHHTTPAdapter):
-  def __init__(self, base_url, key_filename, **kwargs):
-    self.key_filename = key_filename
-    super().__init__(base_url, **kwargs)
-
-  def _create_paramiko_client(self, base_url):
-    super()._create_paramiko_client(base_url)
-    if self.key_filename:
-      self.ssh_params['key_filename'] = self.key_filename
-
-
-def reset_docker_client():
-  global _docker_client
-  if _docker_client:
-    try:
-      _docker_client.close()
-    except Exception:
-      pass
-  _docker_client = None
-  cleanup_temp_key()
 
+# Clients are built against a dummy TCP URL (no I/O with an explicit version) and then
+# re-pointed at the SSH adapter mounted on 'http+docker://ssh'
+_PLACEHOLDER_BASE_URL = 'tcp://127.0.0.1:2375'
 
-def get_docker_client():
-  global _docker_client, _ssh_temp_key_path
-  if _docker_client:
-    return _docker_client
 
-  mode = config_manager.get_mode()
+def create_docker_client(host_name):
+  """Builds a Docker client for a host profile ('default' is the active/legacy profile)."""
+  profile = config_manager.get_profile(None if host_name == DEFAULT_HOST else host_name)
+  mode = profile.get('mode', 'local')
   if mode == 'local':
     try:
-      _docker_client = docker.from_env()
+      return docker.from_env()
     except Exception as e:
       console.print(f'[bold red]Error initializing local Docker client: {e}[/bold red]')
       # Return a dummy client or let it fail later?
       # Better to raise, but tools might need handling.
       raise e
-  else:
-    ssh_config = config_manager.get_ssh_config()
-    host = ssh_config.get('host')
-    user = ssh_config.get('user')
-    key_name = ssh_config.get('key_name')
 
-    if not host or not user or not key_name:
-      console.print('[bold red]SSH configuration incomplete. Please configure SSH settings.[/bold red]')
-      raise ValueError('SSH configuration incomplete')
+  host = profile.get('host')
+  user = profile.get('user')
+  key_name = profile.get('key_name')
 
-    # Get Passphrase
-    passphrase = os.getenv('DOCKER_SSH_PASSPHRASE')
-    if not passphrase:
-      from rich.prompt import Prompt
+  if not host or not user or not key_name:
+    console.print('[bold red]SSH configuration incomplete. Please configure SSH settings.[/bold red]')
+    raise ValueError('SSH configuration incomplete')
 
-      passphrase = Prompt.ask(f"Enter passphrase for key '{key_name}'", password=True)
+  try:
+    pkey = _load_ssh_key(key_name)
+  except Exception as e:
+    console.print(f'[bold red]Failed to load SSH key: {e}[/bold red]')
+    raise e
 
-    try:
-      private_key_content = ssh_key_manager.get_key(key_name, passphrase)
-    except Exception as e:
-      console.print(f'[bold red]Failed to load SSH key: {e}[/bold red]')
-      raise e
+  ssh_url = f'ssh://{user}@{host}'
+
+  try:
+    # Create SSH Adapter (keepalive, channel pool and reconnect handling)
+    ssh_adapter = ManagedSSHAdapter(ssh_url, pkey=pkey)
+
+    # Create API Client with a fixed version so construction does no I/O;
+    # the real version is negotiated over SSH below, once per host
+    cached_version = api_version_cache.get(ssh_url)
+    bootstrap_version = cached_version or docker.constants.MINIMUM_DOCKER_API_VERSION
+    api_client = docker.APIClient(base_url=_PLACEHOLDER_BASE_URL, version=bootstrap_version)
+    api_client.mount('http+docker://ssh', ssh_adapter)
+    api_client.base_url = 'http+docker://ssh'
+    if not cached_version:
+      api_client._version = api_client._retrieve_server_version()
+      api_version_cache.set(ssh_url, api_client._version)
+
+    # Create Docker Client
+    client = docker.DockerClient(base_url=_PLACEHOLDER_BASE_URL, version=api_client._version)
+    client.api.close()
+    client.api = api_client
+    return client
+  except Exception as e:
+    console.print(f'[bold red]Error connecting to remote Docker ({host_name}): {e}[/bold red]')
+    raise e
 
-    # Create temp file for the key
-    # We need to close it so paramiko can open it by name
-    tf = tempfile.NamedTemporaryFile(delete=False, mode='w', encoding='utf-8')
-    tf.write(private_key_content)
-    tf.close()
-    _ssh_temp_key_path = tf.name
 
-    ssh_url = f'ssh://{user}@{host}'
+# Captures agent turns for offline replay while recording (DEVPY_RECORD or the `record` command)
+session_recorder = SessionRecorder()
+# Every pooled client, including the fleet's, goes through the recorder (a pass-through unless recording)
+docker_pool = DockerClientPool(lambda name: session_recorder.attach(create_docker_client(name)))
+fleet_manager = FleetManager(docker_pool)
 
+
+def reset_docker_client(host_name=None, forget_api_version=False):
+  if forget_api_version:
     try:
-      # Create SSH Adapter
-      ssh_adapter = CustomSSHAdapter(ssh_url, key_filename=_ssh_temp_key_path)
-
-      # Create API Client
-      api_client = docker.APIClient(base_url='http://localhost', version='auto')
-      api_client.mount('http+docker://ssh', ssh_adapter)
-      api_client.base_url = 'http+docker://ssh'
-
-      # Create Docker Client
-      client = docker.DockerClient(version='auto')
-      client.api = api_client
-      _docker_client = client
-    except Exception as e:
-      cleanup_temp_key()
-      console.print(f'[bold red]Error connecting to remote Docker: {e}[/bold red]')
-      raise e
+      profile = config_manager.get_profile(None if host_name in (None, DEFAULT_HOST) else host_name)
+      if profile.get('mode') == 'ssh':
+        api_version_cache.invalidate(f'ssh://{profile.get("user")}@{profile.get("host")}')
+    except ValueError:
+      pass
+  docker_pool.reset(host_name)
+  response_cache.invalidate()
+  with _container_indexes_lock:
+    _container_indexes.clear()
+
 
-  return _docker_client
+def get_docker_client(host_name=DEFAULT_HOST):
+  return docker_pool.get(host_name)
 
 
 global_config = {'configurable': {'thread_id': 'prinsipal_devops'}}
 
 permission_manager = PermissionManager()
+if os.getenv('DEVPY_RECORD'):
+  session_recorder.start(os.getenv('DEVPY_RECORD'), dry_run=permission_manager.dry_run)
+  console.print(f'[bold yellow]Recording to {os.getenv("DEVPY_RECORD")}. {RECORDING_WARNING}[/bold yellow]')
+permission_manager.listeners.append(session_recorder.on_permission)
+
+metrics_registry = MetricsRegistry()
+metrics_server = MetricsServer(metrics_registry)
+tool_latency = metrics_registry.histogram('devpy_tool_duration_seconds', 'Agent tool call latency')
+llm_latency = metrics_registry.histogram('devpy_llm_duration_seconds', 'LLM call latency')
+permission_decisions = metrics_registry.counter('devpy_permission_decisions_total', 'Permission decisions by outcome')
+container_restarts = metrics_registry.counter(
+  'devpy_container_restarts_total', 'Container restarts seen on the events stream while /metrics is served'
+)
+
+
+def _observe_permission(entry):
+  decision = entry['decision']
+  if decision.startswith('error'):
+    decision = 'error'
+  permission_decisions.inc(operation=entry['operation'], decision=decision)
+
+
+permission_manager.listeners.append(_observe_permission)
+
+response_cache = ResponseCache()
+
+
+def _cache_host():
+  return config_manager.get_active_host() or DEFAULT_HOST
+
+
+def cached_read(operation, fetch, args=None, target=None):
+  """Serves a read-only operation from the response cache; errors raised by fetch are not cached."""
+  if permission_manager.classify_operation(operation) != 'read':
+    return fetch()
+  return response_cache.get_or_call(_cache_host(), operation, args, fetch, target=target)
+
+
+def _invalidate_on_write(entry):
+  if permission_manager.classify_operation(entry['operation']) != 'write':
+    return
+  if entry['decision'] in ('denied', 'denied_by_config', 'allowed_dry_run'):
+    return
+  response_cache.invalidate(_cache_host(), entry.get('target'))
+  if query_cache.enabled:
+    query_cache.invalidate(_cache_host())
+
+
+permission_manager.listeners.append(_invalidate_on_write)
+
+# One container index per host, refreshed from a sparse listing and kept current from events
+_container_indexes = {}
+_container_indexes_lock = threading.Lock()
+
+
+def container_index(refresh=False):
+  with _container_indexes_lock:
+    index = _container_indexes.setdefault(_cache_host(), ContainerIndex())
+  if refresh or index.stale:
+    index.refresh(c.attrs for c in get_docker_client().containers.list(all=True, sparse=True))
+  return index
+
+
+def resolve_container(container_name, exact=False):
+  """Maps what the user called a container (name, ID prefix, compose service, close spelling) to its name.
+
+  Raises ContainerResolutionError with ranked candidates when the name is ambiguous or
+  unknown; if the host cannot be listed the name is passed through unchanged. Write tools
+  pass `exact` so a service or partial name never stops or deletes a container by guess.
+  """
+  try:
+    index = container_index()
+    try:
+      return index.resolve(container_name, exact=exact)
+    except ContainerResolutionError:
+      if index.refreshed_at and time.monotonic() - index.refreshed_at < 1:
+        raise
+    # Possibly created since the last refresh
+    return container_index(refresh=True).resolve(container_name, exact=exact)
+  except ContainerResolutionError:
+    raise
+  except Exception:
+    return container_name
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+  """Times tool and LLM calls of agent runs into the metrics registry."""
+
+  def __init__(self):
+    self._started = {}
+
+  def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+    self._started[run_id] = (time.monotonic(), (serialized or {}).get('name') or kwargs.get('name', 'unknown'))
+
+  def _finish_tool(self, run_id, status):
+    started = self._started.pop(run_id, None)
+    if started:
+      tool_latency.observe(time.monotonic() - started[0], tool=started[1], status=status)
+
+  def on_tool_end(self, output, *, run_id, **kwargs):
+    self._finish_tool(run_id, 'ok')
+
+  def on_tool_error(self, error, *, run_id, **kwargs):
+    self._finish_tool(run_id, 'error')
+
+  def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+    self._started[run_id] = (time.monotonic(), 'llm')
+
+  def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+    self._started[run_id] = (time.monotonic(), 'llm')
+
+  def _finish_llm(self, run_id, status, provider=None):
+    started = self._started.pop(run_id, None)
+    if started:
+      provider = provider or os.getenv('LLM') or 'chatgpt'
+      llm_latency.observe(time.monotonic() - started[0], provider=provider, status=status)
+
+  def on_llm_end(self, response, *, run_id, **kwargs):
+    self._finish_llm(run_id, 'ok', (response.llm_output or {}).get('provider'))
+
+  def on_llm_error(self, error, *, run_id, **kwargs):
+    self._finish_llm(run_id, 'error')
+
+
+metrics_callback = MetricsCallbackHandler()
 
 
 def build_command_preview(parts):
   return ' '.join(str(p) for p in parts)
 
 
+# Set by client sessions (e.g. daemon connections) that answer permission prompts remotely
+_session_prompt = ContextVar('session_prompt', default=None)
+
+
+@contextmanager
+def client_session(session_id, prompt=None):
+  """Runs the enclosed agent work on behalf of a client session.
+
+  Session-scoped approvals are kept per session_id, and permission prompts are
+  routed to `prompt(operation, impact, command_preview)` when given.
+  """
+  token = _session_prompt.set(prompt)
+  try:
+    with permission_manager.session(session_id):
+      yield
+  finally:
+    _session_prompt.reset(token)
+
+
+def end_client_session(session_id):
+  """Forgets a client session's approvals and conversation once its client has disconnected."""
+  permission_manager.end_session(session_id)
+  memory.delete_thread(session_id)
+
+
+def decision_from_answer(answer):
+  if answer == 'y':
+    return PermissionDecision.ALLOW_ONCE
+  if answer == 'yc':
+    return PermissionDecision.ALLOW_COMMAND
+  if answer == 'ys':
+    return PermissionDecision.ALLOW_SESSION
+  return PermissionDecision.DENY
+
+
 def permission_prompt(operation, impact, command_preview):
+  session_prompt = _session_prompt.get()
+  if session_prompt is not None:
+    return session_prompt(operation, impact, command_preview)
   console.print('\n[bold yellow]Permission Required[/bold yellow]')
   console.print(f'Operation: {operation}')
   if impact:
@@ -149,13 +334,7 @@ def permission_prompt(operation, impact, command_preview):
   from rich.prompt import Prompt
 
   answer = Prompt.ask('(y/n/yc/ys)', choices=['y', 'n', 'yc', 'ys'], default='n')
-  if answer == 'y':
-    return PermissionDecision.ALLOW_ONCE
-  if answer == 'yc':
-    return PermissionDecision.ALLOW_COMMAND
-  if answer == 'ys':
-    return PermissionDecision.ALLOW_SESSION
-  return PermissionDecision.DENY
+  return decision_from_answer(answer)
 
 
 @tool
@@ -167,20 +346,112 @@ def check_resource() -> str:
   # check_resource using psutil checks LOCAL resource.
   # This might be intended or not. If we want remote host stats, we can't easily get them via docker API except via a container.
   # I'll keep it local for now as psutil is local.
-  cpu = psutil.cpu_percent(interval=1)
-  memory = psutil.virtual_memory()
-  disk = psutil.disk_usage('/')
-  return f'CPU: {cpu}%, Memory: {memory.percent}%, Disk: {disk.percent}%'
+
+  def fetch():
+    cpu = psutil.cpu_percent(interval=1)
+    memory = psutil.virtual_memory()
+    disk = psutil.disk_usage('/')
+    return f'CPU: {cpu}%, Memory: {memory.percent}%, Disk: {disk.percent}%'
+
+  return cached_read('check_resource', fetch)
+
+
+def read_container_logs(container_name, tail=50):
+  def fetch():
+    container = get_docker_client().containers.get(container_name)
+    logs = container.logs(tail=tail).decode('utf-8')
+    return f'Logs for container {container_name}:\n{logs[-2000:]}'
+
+  return cached_read('get_logs', fetch, {'container': container_name, 'tail': tail}, target=container_name)
+
+
+CONTAINER_SORT_KEYS = {
+  'name': (lambda c: c['name'], False),
+  'created': (lambda c: c['created'], True),
+  'state': (lambda c: (c['state'], c['name']), False),
+  'image': (lambda c: (c['image'], c['name']), False),
+}
+MAX_CONTAINER_PAGE = 200
+
+
+def _format_container_page(containers, sort_by, limit, offset):
+  key, reverse = CONTAINER_SORT_KEYS[sort_by]
+  containers = sorted(containers, key=key, reverse=reverse)
+  limit = min(limit, MAX_CONTAINER_PAGE)
+  page = containers[offset : offset + limit]
+  if not page:
+    return f'No containers at offset {offset} ({len(containers)} matched)'
+  lines = [f'{c["name"]} ({c["state"]}, {c["status"]}) {c["image"]}' for c in page]
+  end = offset + len(page)
+  header = f'Containers {offset + 1}-{end} of {len(containers)}, sorted by {sort_by}'
+  if end < len(containers):
+    header += f' (next page: offset={end})'
+  return '\n'.join([header] + lines)
+
+
+def _format_container_counts(containers):
+  by_state = {}
+  by_image = {}
+  for c in containers:
+    by_state[c['state']] = by_state.get(c['state'], 0) + 1
+    by_image[c['image']] = by_image.get(c['image'], 0) + 1
+  lines = [f'{len(containers)} containers']
+  lines.append('By state: ' + ', '.join(f'{state}={count}' for state, count in sorted(by_state.items())))
+  top_images = sorted(by_image.items(), key=lambda item: (-item[1], item[0]))
+  lines.append('Top images: ' + ', '.join(f'{image} ({count})' for image, count in top_images[:10]))
+  if len(top_images) > 10:
+    lines.append(f'... and {len(top_images) - 10} more images')
+  return '\n'.join(lines)
+
+
+def read_container_list(
+  include_stopped=False, status='', name='', label='', ancestor='', sort_by='name', limit=50, offset=0, summary=False
+):
+  if sort_by not in CONTAINER_SORT_KEYS:
+    raise ValueError(f'sort_by must be one of: {", ".join(CONTAINER_SORT_KEYS)}')
+  if offset < 0:
+    raise ValueError('offset must be 0 or more')
+  if limit < 1:
+    raise ValueError(f'limit must be between 1 and {MAX_CONTAINER_PAGE}')
+  # Filtering happens in the Docker daemon; sparse listing skips the per-container inspect
+  filters = {}
+  if status:
+    filters['status'] = status
+  if name:
+    filters['name'] = name
+  if label:
+    filters['label'] = [item.strip() for item in label.split(',') if item.strip()]
+  if ancestor:
+    filters['ancestor'] = ancestor
+  list_all = include_stopped or bool(status)
+
+  def fetch():
+    listed = get_docker_client().containers.list(all=list_all, filters=filters, sparse=True)
+    return [_container_summary(c.attrs) for c in listed]
+
+  # One cached listing per filter set; sorting and paging through it costs no further Docker calls
+  containers = cached_read('list_containers', fetch, {'all': list_all, 'filters': filters})
+  if summary:
+    return _format_container_counts(containers)
+  return _format_container_page(containers, sort_by, limit, offset)
+
+
+def read_container_attrs(container_name):
+  def fetch():
+    return str(get_docker_client().containers.get(container_name).attrs)
+
+  return cached_read('inspect_container', fetch, {'container': container_name}, target=container_name)
 
 
 @tool
 def get_docker_logs(container_name: str, tail: int = 50) -> str:
   """Gets the last logs of a Docker container"""
   try:
-    client = get_docker_client()
-    container = client.containers.get(container_name)
-    logs = container.logs(tail=tail).decode('utf-8')
-    return f'Logs for container {container_name}:\n{logs[-2000:]}'
+    container_name = resolve_container(container_name)
+  except ContainerResolutionError as e:
+    return f'Error: {e}'
+  try:
+    return read_container_logs(container_name, tail)
   except docker.errors.NotFound:
     return f'Error: Container {container_name} not found'
   except Exception as e:
@@ -188,12 +459,91 @@ def get_docker_logs(container_name: str, tail: int = 50) -> str:
 
 
 @tool
-def list_containers() -> str:
-  """Lists active Docker containers with their status"""
+def export_logs(containers: str = '', since: str = '', until: str = '', output_dir: str = '') -> str:
+  """Exports the full logs of containers (comma-separated names; all running containers if empty) to
+  gzip-compressed local files, streaming them in parallel, and writes a manifest with sizes, line counts and time
+  ranges. since/until accept 30m, 2h, 1d (ago), a unix timestamp or ISO 8601. Use this instead of get_docker_logs
+  to snapshot logs for later analysis"""
   try:
-    client = get_docker_client()
-    containers = client.containers.list()
-    return '\n'.join([f'{c.name} ({c.status})' for c in containers])
+    since_time = parse_time(since)
+    until_time = parse_time(until)
+  except ValueError as e:
+    return f'Error: {e}'
+  names, errors = [], []
+  try:
+    if containers.strip():
+      for reference in [item.strip() for item in containers.split(',') if item.strip()]:
+        try:
+          names.append(resolve_container(reference))
+        except ContainerResolutionError as e:
+          errors.append(str(e))
+    else:
+      running = get_docker_client().containers.list(sparse=True)
+      names = sorted((c.attrs.get('Names') or [c.id[:12]])[0].lstrip('/') for c in running)
+  except Exception as e:
+    return f'Error listing containers: {e}'
+  names = list(dict.fromkeys(names))
+  if not names:
+    return '\n'.join(errors) or 'No containers to export'
+  if not output_dir:
+    output_dir = os.path.join('logs', 'exports', time.strftime('%Y%m%d-%H%M%S'))
+  command_preview = build_command_preview(
+    ['docker', 'logs', '--timestamps']
+    + (['--since', since_time.isoformat()] if since_time else [])
+    + (['--until', until_time.isoformat()] if until_time else [])
+    + [','.join(names), '|', 'gzip', '>', os.path.join(output_dir, '<container>.log.gz')]
+  )
+
+  def action():
+    try:
+      manifest = export_log_archives(get_docker_client(), names, output_dir, since_time, until_time)
+    except Exception as e:
+      return f'Error exporting logs: {e}'
+    lines = [f'Exported logs of {len(names)} containers to {output_dir} in {manifest["duration_ms"] / 1000:.1f}s']
+    lines.append('Container | Lines | Size | Compressed | From | To')
+    for entry in manifest['containers']:
+      row = (
+        f'{entry["container"]} | {entry["lines"]} | {format_bytes(entry["bytes"])} | '
+        f'{format_bytes(entry["compressed_bytes"])} | {entry["first_timestamp"] or "-"} | '
+        f'{entry["last_timestamp"] or "-"}'
+      )
+      if entry['error']:
+        row += f' | error: {entry["error"]}'
+      lines.append(row)
+    lines.append(f'Manifest: {os.path.join(output_dir, "manifest.json")}')
+    return '\n'.join(lines)
+
+  result = permission_manager.execute(
+    operation='export_logs',
+    fn=action,
+    fn_kwargs={},
+    command_preview=command_preview,
+    impact=f'Writes gzip log archives of {len(names)} containers and a manifest into {output_dir}',
+    command_key=f'export_logs:{output_dir}',
+    prompt_func=permission_prompt,
+    target=names[0] if len(names) == 1 else None,
+  )
+  return '\n'.join(errors + [result])
+
+
+@tool
+def list_containers(
+  include_stopped: bool = False,
+  status: str = '',
+  name: str = '',
+  label: str = '',
+  ancestor: str = '',
+  sort_by: str = 'name',
+  limit: int = 50,
+  offset: int = 0,
+  summary: bool = False,
+) -> str:
+  """Lists Docker containers (running only unless include_stopped) with state, status and image. Filters are
+  applied by Docker: status (running, exited, paused, restarting, created, dead), name (substring), label
+  (key or key=value, comma-separated) and ancestor (image). sort_by is name, created, state or image; results
+  are paged with limit/offset. summary=True returns only counts by state and image, best for large hosts"""
+  try:
+    return read_container_list(include_stopped, status, name, label, ancestor, sort_by, limit, offset, summary)
   except Exception as e:
     return f'Error listing containers: {e}'
 
@@ -202,9 +552,11 @@ def list_containers() -> str:
 def inspect_container(container_name: str) -> str:
   """Inspects a Docker container and returns its attributes"""
   try:
-    client = get_docker_client()
-    container = client.containers.get(container_name)
-    return str(container.attrs)
+    container_name = resolve_container(container_name)
+  except ContainerResolutionError as e:
+    return f'Error: {e}'
+  try:
+    return read_container_attrs(container_name)
   except docker.errors.NotFound:
     return f'Error: Container {container_name} not found'
   except Exception as e:
@@ -214,6 +566,10 @@ def inspect_container(container_name: str) -> str:
 @tool
 def restart_docker_container(container_name: str) -> str:
   """Restarts a specified Docker container"""
+  try:
+    container_name = resolve_container(container_name, exact=True)
+  except ContainerResolutionError as e:
+    return f'Error: {e}'
   command_preview = build_command_preview(['docker', 'restart', container_name])
 
   def action():
@@ -230,6 +586,7 @@ def restart_docker_container(container_name: str) -> str:
     impact='Restarts the indicated container',
     command_key=f'restart:{container_name}',
     prompt_func=permission_prompt,
+    target=container_name,
   )
 
 
@@ -251,6 +608,100 @@ def download_image(image_name: str) -> str:
     impact='Downloads a Docker image',
     command_key=f'download:{image_name}',
     prompt_func=permission_prompt,
+    target=image_name,
+  )
+
+
+build_manifest = BuildManifest()
+
+
+def _parse_build_args(build_args):
+  parsed = {}
+  for item in [part.strip() for part in build_args.split(',') if part.strip()]:
+    key, sep, value = item.partition('=')
+    if not sep or not key.strip():
+      raise ValueError(f'Invalid build arg {item!r}, expected KEY=VALUE')
+    parsed[key.strip()] = value
+  return parsed
+
+
+@tool
+def build_image(
+  path: str,
+  tag: str,
+  dockerfile: str = 'Dockerfile',
+  build_args: str = '',
+  cache_from: str = '',
+  target: str = '',
+  pull: bool = False,
+  force: bool = False,
+) -> str:
+  """Builds a Docker image from a local directory, honouring .dockerignore. build_args are comma-separated
+  KEY=VALUE pairs, cache_from comma-separated images to reuse layers from, target a multi-stage target. The
+  build is skipped when the context, Dockerfile and arguments are unchanged since the last build of this tag on
+  this host and the image still exists; force=True rebuilds anyway"""
+  try:
+    buildargs = _parse_build_args(build_args)
+    context = BuildContext(path, dockerfile)
+  except (ValueError, OSError) as e:
+    return f'Error: {e}'
+  images = [item.strip() for item in cache_from.split(',') if item.strip()]
+  host = _cache_host()
+  digest, hashes = context.digest(build_manifest.file_hashes(context.root))
+  key = build_key(digest, dockerfile, buildargs, target)
+
+  last = build_manifest.last_build(host, tag)
+  if last and last['key'] == key and not force and not pull:
+    try:
+      current_id = get_docker_client().api.inspect_image(tag)['Id']
+    except docker.errors.ImageNotFound:
+      current_id = None
+    except Exception as e:
+      return f'Error checking image {tag}: {e}'
+    if current_id == last['image_id']:
+      return f'Build context unchanged since {tag} ({current_id[:19]}) was built; skipped. Use force=True to rebuild'
+
+  parts = ['docker', 'build', '-t', tag, '-f', dockerfile]
+  for name, value in buildargs.items():
+    parts += ['--build-arg', f'{name}={value}']
+  for image in images:
+    parts += ['--cache-from', image]
+  if target:
+    parts += ['--target', target]
+  if pull:
+    parts.append('--pull')
+  command_preview = build_command_preview(parts + [path])
+
+  def action():
+    started = time.monotonic()
+    try:
+      image_id, output = run_build(
+        get_docker_client().api,
+        context,
+        tag,
+        buildargs,
+        images,
+        target,
+        pull,
+        on_output=lambda line: console.print(line, style='dim', markup=False, highlight=False),
+      )
+    except (RuntimeError, docker.errors.APIError) as e:
+      return f'Build of {tag} failed: {e}'
+    if image_id is None:
+      image_id = get_docker_client().api.inspect_image(tag)['Id']
+    build_manifest.record(host, tag, key, image_id, context.root, hashes)
+    tail = '\n'.join(output[-10:])
+    return f'Built {tag} ({image_id[:19]}) in {time.monotonic() - started:.1f}s\n{tail}'
+
+  return permission_manager.execute(
+    operation='build_image',
+    fn=action,
+    fn_kwargs={},
+    command_preview=command_preview,
+    impact=f'Builds {tag} from {len(context.entries)} files ({format_bytes(context.size)}) and replaces the tag',
+    command_key=f'build:{tag}:{key}',
+    prompt_func=permission_prompt,
+    target=tag,
   )
 
 
@@ -277,12 +728,17 @@ def create_container(container_image: str, container_name: str) -> str:
     impact='Creates and starts a new container',
     command_key=f'create:{container_image}:{container_name}',
     prompt_func=permission_prompt,
+    target=container_name,
   )
 
 
 @tool
 def delete_container(container_name: str) -> str:
   """Stops and removes the specified Docker container"""
+  try:
+    container_name = resolve_container(container_name, exact=True)
+  except ContainerResolutionError as e:
+    return f'Error: {e}'
   command_preview = build_command_preview(['docker', 'rm', '-f', container_name])
 
   def action():
@@ -300,12 +756,17 @@ def delete_container(container_name: str) -> str:
     impact='Stops and removes the indicated container',
     command_key=f'delete:{container_name}',
     prompt_func=permission_prompt,
+    target=container_name,
   )
 
 
 @tool
 def stop_container(container_name: str) -> str:
   """Stops the specified Docker container"""
+  try:
+    container_name = resolve_container(container_name, exact=True)
+  except ContainerResolutionError as e:
+    return f'Error: {e}'
   command_preview = build_command_preview(['docker', 'stop', container_name])
 
   def action():
@@ -322,38 +783,198 @@ def stop_container(container_name: str) -> str:
     impact='Stops the indicated container',
     command_key=f'stop:{container_name}',
     prompt_func=permission_prompt,
+    target=container_name,
+  )
+
+
+def _container_summary(attrs):
+  names = attrs.get('Names') or ['']
+  return {
+    'name': names[0].lstrip('/'),
+    'image': attrs.get('Image', ''),
+    'image_id': attrs.get('ImageID', ''),
+    'state': attrs.get('State', ''),
+    'status': attrs.get('Status', ''),
+    'created': attrs.get('Created', 0),
+  }
+
+
+def _is_unhealthy(summary):
+  status = summary['status']
+  if '(unhealthy)' in status:
+    return True
+  if summary['state'] in ('restarting', 'dead'):
+    return True
+  return summary['state'] == 'exited' and not status.startswith('Exited (0)')
+
+
+def _fleet_query(target, per_host):
+  try:
+    hosts = config_manager.resolve_targets(target)
+  except ValueError as e:
+    return None, f'Error: {e}'
+  if not hosts:
+    return None, "Error: no hosts configured. Add some with 'config host add <name>'."
+  return fleet_manager.fan_out(hosts, per_host), None
+
+
+def _format_fleet_results(results, render, empty_message):
+  lines = []
+  for result in results:
+    if result.ok and result.value:
+      lines.extend(render(result.host, result.value))
+  report = '\n'.join(lines) if lines else empty_message
+  failures = format_partial_failures(results)
+  if failures:
+    report += '\n\n' + failures
+  return report
+
+
+@tool
+def fleet_list_containers(target: str = '', unhealthy_only: bool = False) -> str:
+  """Lists containers across several Docker hosts at once. target is a host name, a host group, a comma separated
+  list of both, or empty for every configured host. Set unhealthy_only to report only unhealthy, restarting, dead or
+  failed containers."""
+
+  def per_host(client, host):
+    # sparse=True avoids one inspect call per container
+    summaries = [_container_summary(c.attrs) for c in client.containers.list(all=True, sparse=True)]
+    if unhealthy_only:
+      return [s for s in summaries if _is_unhealthy(s)]
+    return [s for s in summaries if s['state'] == 'running']
+
+  results, error = _fleet_query(target, per_host)
+  if error:
+    return error
+  return _format_fleet_results(
+    results,
+    lambda host, items: [f'{host}: {s["name"]} ({s["status"]}) [{s["image"]}]' for s in items],
+    'No unhealthy containers found' if unhealthy_only else 'No running containers found',
+  )
+
+
+@tool
+def fleet_find_image(image_name: str, target: str = '') -> str:
+  """Finds which Docker hosts run containers created from the given image (name, name:tag or ID prefix). target
+  is a host name, a host group, a comma separated list of both, or empty for every configured host."""
+  wanted = image_name if ':' in image_name or image_name.startswith('sha256:') else f'{image_name}:latest'
+
+  def matches(summary):
+    image = summary['image']
+    if image in (image_name, wanted) or image.startswith(image_name + ':') or image.startswith(image_name + '@'):
+      return True
+    image_id = summary['image_id'].removeprefix('sha256:')
+    return len(image_name) >= 12 and image_id.startswith(image_name.removeprefix('sha256:'))
+
+  def per_host(client, host):
+    summaries = [_container_summary(c.attrs) for c in client.containers.list(all=True, sparse=True)]
+    return [s for s in summaries if matches(s)]
+
+  results, error = _fleet_query(target, per_host)
+  if error:
+    return error
+  return _format_fleet_results(
+    results,
+    lambda host, items: [f'{host}: {", ".join(s["name"] + " (" + s["state"] + ")" for s in items)}'],
+    f'No host runs a container from image {image_name}',
   )
 
 
+def format_bytes(value):
+  value = float(value)
+  for unit in ('B', 'KiB', 'MiB', 'GiB', 'TiB'):
+    if abs(value) < 1024 or unit == 'TiB':
+      return f'{value:.0f}{unit}' if unit == 'B' else f'{value:.1f}{unit}'
+    value /= 1024
+
+
+stats_store = StatsStore()
+stats_sampler = StatsSampler(get_docker_client, stats_store)
+
+
+def _collect_container_metrics():
+  # Served from cached samples only; stale containers drop out after a few missed rounds
+  horizon = time.time() - max(stats_sampler.interval * 5, 60)
+  latest = {}
+  for name in stats_store.containers():
+    sample = stats_store.latest(name)
+    if sample and sample['timestamp'] >= horizon:
+      latest[name] = sample
+
+  def family(metric, kind, documentation, column):
+    return (metric, kind, documentation, [({'container': n}, sample[column]) for n, sample in latest.items()])
+
+  return [
+    family('devpy_container_cpu_percent', 'gauge', 'Container CPU usage percent', 'cpu_percent'),
+    family('devpy_container_memory_usage_bytes', 'gauge', 'Container memory usage without page cache', 'mem_usage'),
+    family('devpy_container_memory_limit_bytes', 'gauge', 'Container memory limit', 'mem_limit'),
+    family('devpy_container_memory_percent', 'gauge', 'Container memory usage percent of limit', 'mem_percent'),
+    family('devpy_container_network_receive_bytes_total', 'counter', 'Bytes received', 'net_rx'),
+    family('devpy_container_network_transmit_bytes_total', 'counter', 'Bytes transmitted', 'net_tx'),
+    family('devpy_container_block_read_bytes_total', 'counter', 'Block device bytes read', 'blk_read'),
+    family('devpy_container_block_write_bytes_total', 'counter', 'Block device bytes written', 'blk_write'),
+    (
+      'devpy_stats_last_round_timestamp_seconds',
+      'gauge',
+      'Unix time of the last stats sampling round',
+      [({}, stats_sampler.last_round or 0)],
+    ),
+  ]
+
+
+metrics_registry.add_collector(_collect_container_metrics)
+
+
+def start_metrics_endpoint(host=None, port=None):
+  """Serves /metrics (localhost by default) and makes sure the stats sampler and restart counter feed it."""
+  host = host or os.getenv('DEVPY_METRICS_HOST', '127.0.0.1')
+  port = int(port or os.getenv('DEVPY_METRICS_PORT', '9464'))
+  started = metrics_server.start(host, port)
+  stats_sampler.start()
+  # Shares the events stream with alerting; the 'metrics' holder only feeds the restart counter
+  get_events_watcher().start(holder='metrics')
+  return started
+
+
+def stop_metrics_endpoint():
+  metrics_server.stop()
+  get_events_watcher().stop(holder='metrics')
+
+
 def background_monitor_task(container_name: str, threshold: float):
+  # Reads the shared sampler's samples instead of polling Docker itself
+  last_seen = 0
   while True:
-    try:
-      client = get_docker_client()
-      container = client.containers.get(container_name)
-      stats = container.stats(stream=False)
-      mem_usage = stats['memory_stats']['usage']
-      mem_limit = stats['memory_stats']['limit']
-      mem_percent = (mem_usage / mem_limit) * 100
+    sample = stats_store.latest(container_name)
+    if sample and sample['timestamp'] > last_seen:
+      last_seen = sample['timestamp']
+      mem_percent = sample['mem_percent']
       if mem_percent > threshold:
         console.print(
           f'[blink bold red]Warning: Memory usage {mem_percent:.2f}% exceeds threshold {threshold}%[/blink bold red]'
         )
-        console.print('[yellow]Autodiagnostic[/yellow]')
-        alert_msg = f'Warning: Memory usage {mem_percent:.2f}% exceeds threshold {threshold}%'
-        run_agent_flow(alert_msg)
+        alert_msg = (
+          f'Warning: Memory usage of container {container_name} is {mem_percent:.2f}%, exceeding threshold {threshold}%'
+        )
+        submit_background_diagnosis(alert_msg, coalesce_key=f'container:{container_name}')
         break
-    except Exception:
-      pass
-    time.sleep(10)
+    time.sleep(stats_sampler.interval)
 
 
 @tool
 def start_monitoring(container_name: str, threshold_percent: float) -> str:
   """Starts memory monitoring for the container and alerts if threshold is exceeded"""
+  try:
+    container_name = resolve_container(container_name)
+  except ContainerResolutionError as e:
+    return f'Error: {e}'
   command_preview = build_command_preview(['monitor', 'memory', container_name, f'threshold={threshold_percent}'])
 
   def action():
-    t = threading.Thread(target=background_monitor_task, args=(container_name, threshold_percent), daemon=True)
+    stats_sampler.start()
+    t = threading.Thread(
+      target=background_monitor_task, args=(container_name, threshold_percent), name='memory-monitor', daemon=True
+    )
     t.start()
     return f'Monitoring started for container {container_name} with threshold {threshold_percent}%'
 
@@ -368,6 +989,159 @@ def start_monitoring(container_name: str, threshold_percent: float) -> str:
   )
 
 
+def rank_samples(samples, sort_by='memory', limit=10):
+  key = 'cpu_percent' if sort_by == 'cpu' else 'mem_usage'
+  ranked = sorted(samples.items(), key=lambda item: item[1][key], reverse=True)
+  return ranked[:limit] if limit else ranked
+
+
+@tool
+def top_containers(sort_by: str = 'memory', limit: int = 10, fresh: bool = False) -> str:
+  """Ranks running containers by resource usage. sort_by is 'memory' or 'cpu'. Takes one stats sample from every
+  running container concurrently (CPU % from stats deltas, memory without page cache, like docker stats) unless
+  the stats sampler already has a recent round; set fresh to force a new sample"""
+  if sort_by not in ('memory', 'cpu'):
+    return "Error: sort_by must be 'memory' or 'cpu'"
+  if limit < 1:
+    return 'Error: limit must be at least 1'
+  try:
+    if stats_sampler.is_fresh() and not fresh:
+      samples = stats_sampler.latest_samples()
+    else:
+      samples = stats_sampler.sample_once()
+  except Exception as e:
+    return f'Error sampling container stats: {e}'
+  if not samples:
+    return 'No running containers'
+
+  lines = [f'Top {min(limit, len(samples))} of {len(samples)} running containers by {sort_by}:']
+  lines.append('# | Container | CPU % | Memory | Mem %')
+  for rank, (name, sample) in enumerate(rank_samples(samples, sort_by, limit), start=1):
+    memory = format_bytes(sample['mem_usage'])
+    if sample.get('mem_limit'):
+      memory += f' / {format_bytes(sample["mem_limit"])}'
+    lines.append(f'{rank} | {name} | {sample["cpu_percent"]:.1f} | {memory} | {sample["mem_percent"]:.1f}')
+  return '\n'.join(lines)
+
+
+@tool
+def stats_history(container_name: str, minutes: int = 60, points: int = 12) -> str:
+  """Shows how a container's CPU, memory, network and block I/O trended over the last `minutes`, from samples
+  already collected by the monitoring engine (no new Docker calls): min/max/mean/p95/slope per metric plus a
+  downsampled series of at most `points` rows"""
+  try:
+    container_name = resolve_container(container_name)
+  except ContainerResolutionError as e:
+    return f'Error: {e}'
+  history = stats_store.history(container_name, since=time.time() - minutes * 60)
+  if not history or not history['timestamp']:
+    if not stats_sampler.running:
+      return f'No samples for {container_name}. Start monitoring first so the stats sampler collects history.'
+    return f'No samples for {container_name} in the last {minutes} minutes'
+
+  ts = history['timestamp']
+  span = ts[-1] - ts[0]
+  lines = [f'Stats for {container_name}: {len(ts)} samples over {span / 60:.1f} min']
+  for name, label, fmt in (
+    ('cpu_percent', 'CPU %', lambda v: f'{v:.1f}'),
+    ('mem_percent', 'Memory %', lambda v: f'{v:.1f}'),
+    ('mem_usage', 'Memory', format_bytes),
+  ):
+    summary = summarize(ts, history[name])
+    lines.append(
+      f'{label}: min {fmt(summary["min"])}, max {fmt(summary["max"])}, mean {fmt(summary["mean"])}, '
+      f'p95 {fmt(summary["p95"])}, slope {fmt(summary["slope_per_min"])}/min'
+    )
+  # Network and block I/O are cumulative counters: report what moved during the window
+  counters = (('net_rx', 'Net RX'), ('net_tx', 'Net TX'), ('blk_read', 'Block read'), ('blk_write', 'Block write'))
+  for name, label in counters:
+    delta = max(history[name][-1] - history[name][0], 0)
+    rate = delta / span if span else 0
+    lines.append(f'{label}: {format_bytes(delta)} ({format_bytes(rate)}/s)')
+
+  lines.append('Time | CPU % | Mem %')
+  cpu = dict(downsample(ts, history['cpu_percent'], points))
+  for t, mem in downsample(ts, history['mem_percent'], points):
+    lines.append(f'{time.strftime("%H:%M:%S", time.localtime(t))} | {cpu.get(t, 0):.1f} | {mem:.1f}')
+  return '\n'.join(lines)
+
+
+_events_watcher = None
+_events_watcher_lock = threading.Lock()
+
+
+def handle_alert(alert):
+  console.print(f'\n[blink bold red]Alert ({alert.rule.get("name")}): {alert.message}[/blink bold red]')
+  if alert.action == 'diagnose':
+    submit_background_diagnosis(
+      f'Alert: {alert.message}. Investigate the cause with the container logs and state, and suggest a fix.',
+      coalesce_key=f'container:{alert.container}',
+    )
+
+
+_last_container_action = {}
+
+
+def _count_restarts(event):
+  # Both policy and manual restarts emit 'die' then 'start' (manual ones add a 'restart' event we ignore)
+  actor = event.get('Actor') or {}
+  name = (actor.get('Attributes') or {}).get('name') or actor.get('ID', '')[:12]
+  action = event.get('Action') or event.get('status') or ''
+  if action == 'start' and _last_container_action.get(name) == 'die':
+    container_restarts.inc(container=name)
+  if action in ('die', 'start'):
+    _last_container_action[name] = action
+
+
+def _invalidate_on_event(event):
+  # Healthchecks exec into containers constantly; only real state changes drop cached reads
+  action = event.get('Action') or event.get('status') or ''
+  if event.get('Type') != 'container' or action.startswith('exec_'):
+    return
+  actor = event.get('Actor') or {}
+  name = (actor.get('Attributes') or {}).get('name')
+  response_cache.invalidate(_cache_host(), name)
+
+
+def _index_event(event):
+  index = _container_indexes.get(_cache_host())
+  if index is not None:
+    index.apply_event(event)
+
+
+def get_events_watcher():
+  global _events_watcher
+  with _events_watcher_lock:
+    if _events_watcher is None:
+      _events_watcher = EventsWatcher(get_docker_client, handle_alert)
+      _events_watcher.listeners.append(_invalidate_on_event)
+      _events_watcher.listeners.append(_index_event)
+      _events_watcher.listeners.append(_count_restarts)
+    return _events_watcher
+
+
+@tool
+def watch_events() -> str:
+  """Starts the Docker events watcher, which alerts immediately on crashed containers, OOM kills, failed health
+  checks and crash loops according to the rules in alert_rules.json"""
+  command_preview = build_command_preview(['docker', 'events', '--filter', 'type=container'])
+
+  def action():
+    if not get_events_watcher().start():
+      return 'Events watcher is already running'
+    return 'Events watcher started'
+
+  return permission_manager.execute(
+    operation='watch_events',
+    fn=action,
+    fn_kwargs={},
+    command_preview=command_preview,
+    impact='Starts an events watcher that can trigger automatic diagnoses',
+    command_key='watch_events',
+    prompt_func=permission_prompt,
+  )
+
+
 def sanitize_command(command: str) -> str:
   """Sanitizes the command to prevent common injection attacks."""
   # Deny chaining characters
@@ -384,6 +1158,10 @@ def sanitize_command(command: str) -> str:
 @tool
 def exec_command(container_name: str, command: str) -> str:
   """Executes a command in the specified Docker container"""
+  try:
+    container_name = resolve_container(container_name, exact=True)
+  except ContainerResolutionError as e:
+    return f'Error: {e}'
   try:
     safe_command = sanitize_command(command)
   except ValueError as e:
@@ -405,6 +1183,127 @@ def exec_command(container_name: str, command: str) -> str:
     impact='Executes a command in the indicated container',
     command_key=f'exec:{container_name}:{safe_command}',
     prompt_func=permission_prompt,
+    target=container_name,
+  )
+
+
+# Size cap for a single copy_from_container / copy_to_container transfer
+COPY_MAX_BYTES = int(float(os.getenv('DEVPY_COPY_MAX_MB', '1024')) * 1024 * 1024)
+
+
+def _copy_progress(label):
+  # Prints at most twice a second, plus once on completion, so large transfers don't flood the console
+  state = {'last': 0.0, 'complete': False}
+
+  def report(done, total):
+    complete = bool(total) and done >= total
+    now = time.monotonic()
+    if now - state['last'] < 0.5 and not (complete and not state['complete']):
+      return
+    state['last'] = now
+    state['complete'] = complete
+    suffix = f' / {format_bytes(total)} ({min(done * 100 // total, 100)}%)' if total else ''
+    console.print(f'[dim]{label}: {format_bytes(done)}{suffix}[/dim]')
+
+  return report
+
+
+def _format_copied_files(files, limit=20):
+  lines = [f'{f["path"]} | {format_bytes(f["bytes"])} | sha256 {f["sha256"]}' for f in files[:limit]]
+  if len(files) > limit:
+    lines.append(f'... {len(files) - limit} more files')
+  return lines
+
+
+@tool
+def copy_from_container(container_name: str, path: str, local_dir: str = '') -> str:
+  """Copies a file or directory out of a container to a local directory (default copies/<container>) through
+  the Docker archive API. Binary-safe and streamed to disk, with a size limit and sha256 checksums of every file.
+  Use this instead of exec_command with cat"""
+  try:
+    container_name = resolve_container(container_name)
+  except ContainerResolutionError as e:
+    return f'Error: {e}'
+  local_dir = local_dir or os.path.join('copies', container_name)
+  command_preview = build_command_preview(['docker', 'cp', f'{container_name}:{path}', local_dir])
+
+  def action():
+    try:
+      result = container_copy.copy_from_container(
+        get_docker_client().api,
+        container_name,
+        path,
+        local_dir,
+        COPY_MAX_BYTES,
+        _copy_progress(f'Copying {container_name}:{path}'),
+      )
+    except docker.errors.NotFound:
+      return f'Error: {path} not found in container {container_name}'
+    except (container_copy.CopyLimitError, ValueError) as e:
+      return f'Error: {e}'
+    lines = [
+      f'Copied {container_name}:{path} to {local_dir} '
+      f'({len(result["files"])} files, {format_bytes(result["archive_bytes"])} in {result["duration_ms"] / 1000:.1f}s)'
+    ]
+    lines.extend(_format_copied_files(result['files']))
+    if result['skipped']:
+      lines.append(f'Skipped links and special files: {", ".join(result["skipped"][:10])}')
+    return '\n'.join(lines)
+
+  return permission_manager.execute(
+    operation='copy_from_container',
+    fn=action,
+    fn_kwargs={},
+    command_preview=command_preview,
+    impact=f'Writes files from the container into {local_dir} (limit {format_bytes(COPY_MAX_BYTES)})',
+    command_key=f'copy_from:{container_name}:{path}',
+    prompt_func=permission_prompt,
+    target=container_name,
+  )
+
+
+@tool
+def copy_to_container(container_name: str, local_path: str, container_dir: str) -> str:
+  """Copies a local file or directory into an existing directory of a container through the Docker archive API,
+  streamed from disk with a size limit and sha256 checksums of every file sent"""
+  try:
+    container_name = resolve_container(container_name, exact=True)
+  except ContainerResolutionError as e:
+    return f'Error: {e}'
+  if not os.path.exists(local_path):
+    return f'Error: {local_path} does not exist'
+  command_preview = build_command_preview(['docker', 'cp', local_path, f'{container_name}:{container_dir}'])
+
+  def action():
+    try:
+      result = container_copy.copy_to_container(
+        get_docker_client().api,
+        container_name,
+        local_path,
+        container_dir,
+        COPY_MAX_BYTES,
+        _copy_progress(f'Copying {local_path}'),
+      )
+    except docker.errors.NotFound:
+      return f'Error: directory {container_dir} not found in container {container_name}'
+    except (container_copy.CopyLimitError, OSError) as e:
+      return f'Error: {e}'
+    lines = [
+      f'Copied {local_path} to {container_name}:{container_dir} '
+      f'({len(result["files"])} files, {format_bytes(result["bytes"])} in {result["duration_ms"] / 1000:.1f}s)'
+    ]
+    lines.extend(_format_copied_files(result['files']))
+    return '\n'.join(lines)
+
+  return permission_manager.execute(
+    operation='copy_to_container',
+    fn=action,
+    fn_kwargs={},
+    command_preview=command_preview,
+    impact=f'Writes files into {container_dir} inside the container, overwriting existing ones',
+    command_key=f'copy_to:{container_name}:{local_path}:{container_dir}',
+    prompt_func=permission_prompt,
+    target=container_name,
   )
 
 
@@ -433,12 +1332,288 @@ def delete_image(image_name: str) -> str:
     impact='Deletes the specified Docker image if it exists',
     command_key=f'delete_image:{image_name}',
     prompt_func=permission_prompt,
+    target=image_name,
+  )
+
+
+def read_system_df():
+  # One `system df` call gives sizes and usage of every image, volume and build cache record
+  return cached_read('system_df', lambda: get_docker_client().df())
+
+
+def _short_id(object_id):
+  return object_id.split(':', 1)[-1][:12]
+
+
+def _age_days(created):
+  return max(time.time() - created, 0) / 86400 if created else 0
+
+
+def _image_tag(image):
+  tags = [t for t in image.get('RepoTags') or [] if t != '<none>:<none>']
+  return tags[0] if tags else '<none>'
+
+
+def _is_dangling(image):
+  return _image_tag(image) == '<none>'
+
+
+@tool
+def list_images(
+  reference: str = '',
+  label: str = '',
+  dangling_only: bool = False,
+  unused_only: bool = False,
+  sort_by: str = 'size',
+  limit: int = 50,
+) -> str:
+  """Lists Docker images with size, shared size, containers using them and age, plus totals for dangling and
+  unused images. reference (e.g. 'nginx' or 'myrepo/*:1.*') and label filters are applied by Docker. sort_by is
+  size, created or name"""
+  if sort_by not in ('size', 'created', 'name'):
+    return "Error: sort_by must be 'size', 'created' or 'name'"
+  if limit < 1:
+    return 'Error: limit must be at least 1'
+  try:
+    images = read_system_df().get('Images') or []
+    filters = {}
+    if reference:
+      filters['reference'] = reference
+    if label:
+      filters['label'] = [item.strip() for item in label.split(',') if item.strip()]
+    if filters:
+
+      def fetch_ids():
+        return set(get_docker_client().api.images(quiet=True, filters=filters))
+
+      ids = cached_read('list_images', fetch_ids, {'filters': filters})
+      images = [image for image in images if image['Id'] in ids]
+  except Exception as e:
+    return f'Error listing images: {e}'
+
+  dangling = [image for image in images if _is_dangling(image)]
+  unused = [image for image in images if image.get('Containers', 0) == 0]
+  shown = dangling if dangling_only else images
+  if unused_only:
+    shown = [image for image in shown if image.get('Containers', 0) == 0]
+  if sort_by == 'size':
+    shown = sorted(shown, key=lambda image: image.get('Size', 0), reverse=True)
+  elif sort_by == 'created':
+    shown = sorted(shown, key=lambda image: image.get('Created', 0), reverse=True)
+  else:
+    shown = sorted(shown, key=_image_tag)
+
+  total = sum(image.get('Size', 0) for image in images)
+  lines = [
+    f'{len(images)} images, {format_bytes(total)} total; '
+    f'dangling: {len(dangling)} ({format_bytes(sum(i.get("Size", 0) for i in dangling))}); '
+    f'unused: {len(unused)} ({format_bytes(sum(i.get("Size", 0) for i in unused))}, shared layers not deducted)'
+  ]
+  if not shown:
+    return '\n'.join(lines + ['No images match'])
+  lines.append('Image | ID | Size | Shared | Containers | Age (days)')
+  for image in shown[:limit]:
+    shared = image.get('SharedSize', -1)
+    lines.append(
+      f'{_image_tag(image)} | {_short_id(image["Id"])} | {format_bytes(image.get("Size", 0))} | '
+      f'{format_bytes(shared) if shared >= 0 else "-"} | {image.get("Containers", 0)} | '
+      f'{_age_days(image.get("Created", 0)):.0f}'
+    )
+  if len(shown) > limit:
+    lines.append(f'... {len(shown) - limit} more')
+  return '\n'.join(lines)
+
+
+@tool
+def list_volumes(name: str = '', driver: str = '', label: str = '', unused_only: bool = False, limit: int = 50) -> str:
+  """Lists Docker volumes with size and how many containers reference them, largest first, plus the total size
+  of unused (dangling) volumes. name, driver and label filters are applied by Docker"""
+  if limit < 1:
+    return 'Error: limit must be at least 1'
+  try:
+    volumes = read_system_df().get('Volumes') or []
+    filters = {}
+    if name:
+      filters['name'] = name
+    if driver:
+      filters['driver'] = driver
+    if label:
+      filters['label'] = [item.strip() for item in label.split(',') if item.strip()]
+    if unused_only:
+      filters['dangling'] = True
+    if filters:
+
+      def fetch_names():
+        return {v['Name'] for v in get_docker_client().api.volumes(filters=filters).get('Volumes') or []}
+
+      names = cached_read('list_volumes', fetch_names, {'filters': filters})
+      volumes = [volume for volume in volumes if volume['Name'] in names]
+  except Exception as e:
+    return f'Error listing volumes: {e}'
+
+  def usage(volume):
+    data = volume.get('UsageData') or {}
+    return max(data.get('Size', 0), 0), data.get('RefCount', 0)
+
+  unused = [volume for volume in volumes if usage(volume)[1] == 0]
+  lines = [
+    f'{len(volumes)} volumes, {format_bytes(sum(usage(v)[0] for v in volumes))} total; '
+    f'unused: {len(unused)} ({format_bytes(sum(usage(v)[0] for v in unused))})'
+  ]
+  if not volumes:
+    return '\n'.join(lines + ['No volumes match'])
+  lines.append('Volume | Driver | Size | Containers')
+  ordered = sorted(volumes, key=lambda volume: usage(volume)[0], reverse=True)
+  for volume in ordered[:limit]:
+    size, refs = usage(volume)
+    lines.append(f'{volume["Name"]} | {volume.get("Driver", "")} | {format_bytes(size)} | {refs}')
+  if len(ordered) > limit:
+    lines.append(f'... {len(ordered) - limit} more')
+  return '\n'.join(lines)
+
+
+_RECLAIM_LABELS = {
+  'stopped_containers': 'Stopped containers',
+  'dangling_images': 'Dangling images',
+  'unused_images': 'Unused images',
+  'unused_volumes': 'Unused volumes',
+  'build_cache': 'Build cache',
+}
+
+
+def _format_reclaim_plan(plan):
+  lines = [f'Reclamation plan ({format_bytes(plan.total_bytes)} estimated):']
+  for category, item in plan.items.items():
+    names = item['names']
+    preview = ', '.join(names[:5]) + (f', ... {len(names) - 5} more' if len(names) > 5 else '')
+    detail = f': {preview}' if names else ''
+    lines.append(f'- {_RECLAIM_LABELS[category]}: {len(names)}, {format_bytes(item["bytes"])}{detail}')
+  if plan.items.get('unused_images', {}).get('names'):
+    lines.append(f'  (unused images created more than {plan.older_than_days} days ago)')
+  return '\n'.join(lines)
+
+
+@tool
+def reclaim_space(
+  older_than_days: int = 7,
+  stopped_containers: bool = True,
+  unused_images: bool = True,
+  unused_volumes: bool = False,
+  build_cache: bool = True,
+) -> str:
+  """Frees disk space. Plans from one `system df` call what would be removed (dangling images always, plus stopped
+  containers, unused images created more than older_than_days ago, unused volumes and build cache when enabled)
+  with byte estimates, asks for permission once and removes exactly the planned objects in one batch. Volumes are
+  off by default because they hold data"""
+  selected = {
+    'stopped_containers': stopped_containers,
+    'dangling_images': True,
+    'unused_images': unused_images,
+    'unused_volumes': unused_volumes,
+    'build_cache': build_cache,
+  }
+  try:
+    # Plan from fresh data, never a cached df
+    plan = ReclaimPlan(
+      get_docker_client().df(), [c for c, on in selected.items() if on], older_than_days=max(older_than_days, 0)
+    )
+  except Exception as e:
+    return f'Error computing reclamation plan: {e}'
+  plan_text = _format_reclaim_plan(plan)
+  if plan.empty:
+    return f'{plan_text}\nNothing to reclaim'
+
+  executed = []
+
+  def action():
+    results = plan.execute(get_docker_client())
+    executed.append(results)
+    lines = ['Reclaimed:']
+    for category, result in results.items():
+      if result['error'] and not result['deleted']:
+        lines.append(f'- {_RECLAIM_LABELS[category]}: failed: {result["error"]}')
+      else:
+        failed = f'; failed: {result["error"]}' if result['error'] else ''
+        removed = f'{result["deleted"]} removed, {format_bytes(result["reclaimed"])}'
+        lines.append(f'- {_RECLAIM_LABELS[category]}: {removed}{failed}')
+    total = sum(result['reclaimed'] for result in results.values())
+    lines.append(f'Total: {format_bytes(total)} (planned {format_bytes(plan.total_bytes)})')
+    return '\n'.join(lines)
+
+  result = permission_manager.execute(
+    operation='reclaim_space',
+    fn=action,
+    fn_kwargs={},
+    command_preview=' && '.join(plan.commands()),
+    impact=plan_text,
+    command_key=f'reclaim_space:{",".join(plan.categories)}:{plan.older_than_days}',
+    prompt_func=permission_prompt,
   )
+  if executed:
+    return result
+  # Denied or dry-run: still show what would have been removed
+  return f'{plan_text}\n{result}'
+
+
+# Networks Docker creates itself; never reported as unused
+_BUILTIN_NETWORKS = {'bridge', 'host', 'none'}
+
+
+@tool
+def list_networks(name: str = '', driver: str = '', label: str = '', unused_only: bool = False) -> str:
+  """Lists Docker networks with driver, scope and the number of containers attached, flagging user networks no
+  container uses. name, driver and label filters are applied by Docker"""
+  filters = {}
+  if name:
+    filters['name'] = name
+  if driver:
+    filters['driver'] = driver
+  if label:
+    filters['label'] = [item.strip() for item in label.split(',') if item.strip()]
+
+  def fetch():
+    client = get_docker_client()
+    networks = client.api.networks(filters=filters)
+    # Attachment counts from one sparse listing instead of one inspect per network
+    attached = {}
+    for container in client.containers.list(all=True, sparse=True):
+      for network in ((container.attrs.get('NetworkSettings') or {}).get('Networks') or {}).values():
+        network_id = network.get('NetworkID')
+        if network_id:
+          attached[network_id] = attached.get(network_id, 0) + 1
+    return [
+      {
+        'name': n['Name'],
+        'id': n['Id'],
+        'driver': n.get('Driver', ''),
+        'scope': n.get('Scope', ''),
+        'containers': attached.get(n['Id'], 0),
+      }
+      for n in networks
+    ]
+
+  try:
+    networks = cached_read('list_networks', fetch, {'filters': filters})
+  except Exception as e:
+    return f'Error listing networks: {e}'
+
+  unused = [n for n in networks if n['containers'] == 0 and n['name'] not in _BUILTIN_NETWORKS]
+  shown = unused if unused_only else networks
+  lines = [f'{len(networks)} networks; unused: {len(unused)}']
+  if unused:
+    lines[0] += f' ({", ".join(n["name"] for n in unused)})'
+  if not shown:
+    return '\n'.join(lines + ['No networks match'])
+  lines.append('Network | ID | Driver | Scope | Containers')
+  for n in sorted(shown, key=lambda n: n['name']):
+    lines.append(f'{n["name"]} | {_short_id(n["id"])} | {n["driver"]} | {n["scope"]} | {n["containers"]}')
+  return '\n'.join(lines)
 
 
 tools = [
   check_resource,
   get_docker_logs,
+  export_logs,
   list_containers,
   inspect_container,
   restart_docker_container,
@@ -446,34 +1621,287 @@ tools = [
   delete_container,
   stop_container,
   start_monitoring,
+  stats_history,
+  top_containers,
+  watch_events,
   exec_command,
+  copy_from_container,
+  copy_to_container,
   download_image,
+  build_image,
   delete_image,
+  list_images,
+  list_volumes,
+  list_networks,
+  reclaim_space,
+  fleet_list_containers,
+  fleet_find_image,
 ]
 
 
-llm_name = os.getenv('LLM')
-if llm_name == 'deepseek':
-  from llm.deepseek import llm
-elif llm_name in ('anthropic', 'claude'):
-  from llm.claude import llm
-elif llm_name in ('google', 'gemini'):
-  from llm.google import llm
-elif llm_name in ('ollama', 'openwebui'):
-  from llm.ollama import llm
-else:
-  from llm.chatgpt import llm
+# One or more providers (LLM_PROVIDERS, else LLM) behind timeouts, retries, failover and optional hedging
+llm = build_router()
 
 
 memory = MemorySaver()
 agent_executor = create_react_agent(llm, tools, checkpointer=memory)
 
+tool_selection_enabled = os.getenv('DEVPY_TOOL_SELECTION', '1').lower() not in {'0', 'false', 'no', 'n'}
+tool_selector = ToolSelector([t.name for t in tools])
+# Rough prompt size of each tool schema (~4 characters per token), for the selection trace
+_tool_schema_tokens = {t.name: len(json.dumps(convert_to_openai_tool(t))) // 4 for t in tools}
+# Agents compiled per tool subset; they share the checkpointer, so a turn can move to the full agent
+_subset_agents = {}
+_subset_agents_lock = threading.Lock()
+
+
+def _agent_for(tool_names):
+  if tool_names is None:
+    return agent_executor
+  key = tuple(tool_names)
+  with _subset_agents_lock:
+    agent = _subset_agents.get(key)
+    if agent is None:
+      subset = [t for t in tools if t.name in tool_names]
+      agent = create_react_agent(llm, subset, checkpointer=memory)
+      _subset_agents[key] = agent
+    return agent
+
+
+query_cache = QueryCache()
+# Tools whose calls may be replayed from the query cache: read-only and free of prompts
+REPLAYABLE_TOOLS = {
+  'check_resource',
+  'get_docker_logs',
+  'list_containers',
+  'inspect_container',
+  'stats_history',
+  'top_containers',
+  'fleet_list_containers',
+  'fleet_find_image',
+  'list_images',
+  'list_volumes',
+  'list_networks',
+}
+REPLAY_PROMPT = (
+  'You are a DevOps assistant. Answer the user question using only the live tool results provided. '
+  'Be concise and point out anything unhealthy.'
+)
+
+
+def print_agent_message(content):
+  console.print('\n[bold magenta]Agent[/bold magenta]')
+  console.print(Markdown(content))
+
+
+def _close_dangling_tool_calls(config):
+  # A turn stopped between the model's tool call and its result would leave the thread
+  # unusable for providers that require every tool call to be answered
+  messages = agent_executor.get_state(config).values.get('messages', [])
+  if messages and getattr(messages[-1], 'tool_calls', None):
+    cancelled = [ToolMessage(content='Cancelled by the user', tool_call_id=c['id']) for c in messages[-1].tool_calls]
+    agent_executor.update_state(config, {'messages': cancelled}, as_node='tools')
+
+
+def _inventory_fingerprint():
+  return inventory_fingerprint(c.attrs for c in get_docker_client().containers.list(all=True, sparse=True))
+
+
+def _tool_plan(messages):
+  """Returns the turn's tool calls as a replayable plan, or None if any of them is not read-only."""
+  plan = []
+  for message in messages:
+    for call in getattr(message, 'tool_calls', None) or []:
+      if call['name'] not in REPLAYABLE_TOOLS:
+        return None
+      step = {'tool': call['name'], 'args': call['args']}
+      if step not in plan:
+        plan.append(step)
+  return plan or None
+
+
+def _replay_plan(user_input, plan, config):
+  """Re-runs a cached tool plan against live data and answers with a single LLM call."""
+  tools_by_name = {t.name: t for t in tools}
+
+  def run_step(step):
+    try:
+      output = tools_by_name[step['tool']].invoke(step['args'], config={'callbacks': config['callbacks']})
+    except Exception as e:
+      output = f'Error: {e}'
+    return f'{step["tool"]}({json.dumps(step["args"])}):\n{output}'
+
+  with ThreadPoolExecutor(max_workers=len(plan)) as executor:
+    results = list(executor.map(run_step, plan))
+  question = f'Question: {user_input}\n\nLive tool results:\n\n' + '\n\n'.join(results)
+  answer = llm.invoke([SystemMessage(content=REPLAY_PROMPT), HumanMessage(content=question)], config=config)
+  # Keep the conversation coherent for follow-up questions on this thread
+  agent_executor.update_state(
+    config, {'messages': [HumanMessage(content=user_input), AIMessage(content=answer.content)]}, as_node='agent'
+  )
+  return answer.content
 
-def run_agent_flow(user_input: str):
-  initial_state = {'messages': [HumanMessage(content=user_input)]}
-  for event in agent_executor.stream(initial_state, global_config):
+
+prefetch_enabled = os.getenv('DEVPY_PREFETCH', '1').lower() not in {'0', 'false', 'no', 'n'}
+_prefetch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='prefetch')
+_LOG_INTENT_WORDS = set('log logs error errors fail failed failing crash crashed crashing exception why'.split())
+
+
+def _prefetch(user_input):
+  try:
+    read_container_list()
+    names = container_index().mentioned(user_input)
+  except Exception:
+    return []
+  wants_logs = bool(_LOG_INTENT_WORDS & set(re.findall(r'[a-z]+', user_input.lower())))
+  for name in names:
+    _prefetch_executor.submit(read_container_attrs, name)
+    if wants_logs:
+      _prefetch_executor.submit(read_container_logs, name)
+  return names
+
+
+def prefetch_docker_state(user_input):
+  """Starts filling the response cache with the listing, and the state and logs of mentioned containers.
+
+  Runs while the first LLM call of the turn is in flight; the tools then find the
+  results cached, or join the in-flight request through the cache's single-flight.
+  """
+  if not prefetch_enabled or not response_cache.enabled:
+    return None
+  return _prefetch_executor.submit(_prefetch, user_input)
+
+
+def _stream_turn(agent, inputs, config, emit, should_stop, allowed, trace):
+  """Streams one agent run; returns 'done', 'stopped', or 'fallback' when a call needs a tool not in `allowed`."""
+  stream = agent.stream(inputs, config)
+  step_started = time.monotonic()
+  for event in stream:
     if 'agent' in event:
+      trace['llm_calls'] += 1
+      trace['llm_ms'] += (time.monotonic() - step_started) * 1000
       msg = event['agent']['messages'][0]
       if msg.content:
-        console.print('\n[bold magenta]Agent[/bold magenta]')
-        console.print(Markdown(msg.content))
+        emit(msg.content)
+      if allowed is not None and any(c['name'] not in allowed for c in getattr(msg, 'tool_calls', None) or []):
+        stream.close()
+        return 'fallback'
+    if should_stop is not None and should_stop():
+      stream.close()
+      return 'stopped'
+    step_started = time.monotonic()
+  return 'done'
+
+
+def _trace_tool_selection(thread_id, selected, fallback, trace, started):
+  offered = selected if selected is not None else list(_tool_schema_tokens)
+  saved_per_call = sum(tokens for name, tokens in _tool_schema_tokens.items() if name not in offered)
+  # After a fallback only the calls made before it ran with the smaller schema
+  narrowed_calls = 1 if fallback else trace['llm_calls']
+  tool_selector.record(
+    {
+      'thread_id': thread_id,
+      'selected': selected,
+      'tools_offered': len(offered),
+      'tools_total': len(_tool_schema_tokens),
+      'fallback': fallback,
+      'llm_calls': trace['llm_calls'],
+      'schema_tokens_saved': saved_per_call * narrowed_calls if selected is not None else 0,
+      'llm_ms': round(trace['llm_ms'], 1),
+      'duration_ms': round((time.monotonic() - started) * 1000, 1),
+    }
+  )
+
+
+def run_agent_flow(user_input: str, thread_id=None, emit=None, should_stop=None):
+  """Runs one agent turn. emit(content) receives each agent message (printed to the console by default).
+
+  should_stop() is checked between graph steps; when it returns True the turn ends early.
+  With the query cache enabled, a question answered before against the same container
+  inventory replays its read-only tool plan and needs a single summarization LLM call;
+  questions that refer back to earlier turns always run the full agent loop.
+  """
+  if emit is None:
+    emit = print_agent_message
+  if thread_id is None:
+    thread_id = global_config['configurable']['thread_id']
+  callbacks = [metrics_callback, session_recorder] if session_recorder.active else [metrics_callback]
+  config = {'configurable': {'thread_id': thread_id}, 'callbacks': callbacks}
+
+  fingerprint = None
+  if query_cache.cacheable(user_input):
+    try:
+      fingerprint = _inventory_fingerprint()
+    except Exception:
+      fingerprint = None
+  if fingerprint:
+    plan = query_cache.lookup(_cache_host(), user_input, fingerprint)
+    if plan and all(step['tool'] in REPLAYABLE_TOOLS for step in plan):
+      emit(_replay_plan(user_input, plan, config))
+      return
+    seen = len(agent_executor.get_state(config).values.get('messages', []))
+
+  prefetch_docker_state(user_input)
+  started = time.monotonic()
+  selected = tool_selector.select(user_input) if tool_selection_enabled else None
+  trace = {'llm_calls': 0, 'llm_ms': 0.0}
+  initial_state = {'messages': [HumanMessage(content=user_input)]}
+  status = _stream_turn(_agent_for(selected), initial_state, config, emit, should_stop, selected, trace)
+  fallback = status == 'fallback'
+  if fallback:
+    # The model asked for a tool outside the subset: resume the same checkpoint with every tool
+    status = _stream_turn(agent_executor, None, config, emit, should_stop, None, trace)
+  _trace_tool_selection(thread_id, selected, fallback, trace, started)
+  if status == 'stopped':
+    _close_dangling_tool_calls(config)
+    return
+
+  if fingerprint:
+    plan = _tool_plan(agent_executor.get_state(config).values.get('messages', [])[seen:])
+    if plan:
+      query_cache.store(_cache_host(), user_input, fingerprint, plan)
+
+
+# Enabled with --profile, DEVPY_PROFILE=1 or the `profile on` command
+turn_profiler = TurnProfiler()
+
+
+def _run_agent_job(job):
+  with turn_profiler.profile('turn') as report, session_recorder.turn(job.prompt, job.thread_id) as capture:
+    emit = capture(job.emit or print_agent_message)
+    run_agent_flow(job.prompt, thread_id=job.thread_id, emit=emit, should_stop=lambda: job.cancelled)
+  if report:
+    for line in report[0].summary():
+      console.print(line, style='dim', markup=False, highlight=False)
+
+
+# Single executor for every agent run: interactive turns, daemon sessions and alert diagnoses
+agent_queue = AgentJobQueue(_run_agent_job, max_background=int(os.getenv('DEVPY_MAX_BACKGROUND_JOBS', '20')))
+
+
+def submit_agent_request(user_input, thread_id=None, emit=None):
+  """Queues an interactive turn ahead of background work and waits for it. Ctrl+C cancels the turn."""
+  job = agent_queue.submit(
+    user_input, priority=INTERACTIVE, thread_id=thread_id or global_config['configurable']['thread_id'], emit=emit
+  )
+  try:
+    job.wait()
+  except KeyboardInterrupt:
+    job.cancel()
+    console.print('\n[yellow]Cancelling the current request...[/yellow]')
+    job.wait()
+  if job.error is not None:
+    raise job.error
+  return job
+
+
+def submit_background_diagnosis(alert_msg, coalesce_key=None):
+  """Queues an automatic diagnosis; pending alerts with the same coalesce_key are merged into one run."""
+  try:
+    job = agent_queue.submit(alert_msg, priority=BACKGROUND, coalesce_key=coalesce_key)
+  except QueueFullError:
+    console.print('[yellow]Autodiagnostic skipped: too many diagnoses are already waiting[/yellow]')
+    return None
+  if len(job.prompts) == 1:
+    console.print('[yellow]Autodiagnostic queued[/yellow]')
+  return job
@@ -0,0 +1,30 @@
+"""Recognises the CLI's local commands; shared by the interactive CLI and the daemon thin client."""
+
+# name -> (subcommands, max words). A bare name or `name <subcommand> ...` is a local command;
+# anything else that merely starts with the word ("jobs failing on api?") is a prompt for the agent
+LOCAL_COMMANDS = {
+  'alerts': ({'start', 'stop', 'status', 'rules', 'recent'}, 2),
+  'stats': ({'start', 'stop', 'status'}, 2),
+  'metrics': ({'start', 'stop', 'status'}, 3),
+  'jobs': ({'list', 'cancel'}, 3),
+  'diagnostics': ({'clear'}, 2),
+  'profile': ({'on', 'off', 'status'}, 2),
+  'record': ({'start', 'stop', 'status'}, 3),
+  'dashboard': ({'help'}, 2),
+}
+
+
+def is_command(user_input, name, subcommands, max_words=2):
+  """True for `name` alone or `name <subcommand> ...` (at most max_words words); anything else goes to the agent."""
+  parts = user_input.split()
+  if not parts or parts[0] != name or len(parts) > max_words:
+    return False
+  return len(parts) == 1 or parts[1] in subcommands
+
+
+def local_command(user_input):
+  """Name of the local command user_input invokes, or None when it is a prompt for the agent."""
+  for name, (subcommands, max_words) in LOCAL_COMMANDS.items():
+    if is_command(user_input, name, subcommands, max_words):
+      return name
+  return None
@@ -45,3 +45,100 @@ class ConfigManager:
 
     def get_ssh_config(self):
         return self.config.get('ssh', {})
+
+    def add_host(self, name, mode, host='', user='', key_name=''):
+        if mode not in ['local', 'ssh']:
+            raise ValueError("Mode must be 'local' or 'ssh'")
+        self.config.setdefault('hosts', {})[name] = {
+            'mode': mode,
+            'host': host,
+            'user': user,
+            'key_name': key_name
+        }
+        self.save_config()
+
+    def remove_host(self, name):
+        hosts = self.config.get('hosts', {})
+        if name not in hosts:
+            return False
+        del hosts[name]
+        for members in self.config.get('groups', {}).values():
+            if name in members:
+                members.remove(name)
+        if self.config.get('active_host') == name:
+            self.config.pop('active_host')
+        self.save_config()
+        return True
+
+    def get_hosts(self):
+        return self.config.get('hosts', {})
+
+    def set_group(self, name, hosts):
+        unknown = [h for h in hosts if h not in self.get_hosts()]
+        if unknown:
+            raise ValueError(f"Unknown hosts: {', '.join(unknown)}")
+        self.config.setdefault('groups', {})[name] = list(hosts)
+        self.save_config()
+
+    def remove_group(self, name):
+        groups = self.config.get('groups', {})
+        if name not in groups:
+            return False
+        del groups[name]
+        self.save_config()
+        return True
+
+    def get_groups(self):
+        return self.config.get('groups', {})
+
+    def set_active_host(self, name):
+        if name is None:
+            self.config.pop('active_host', None)
+        elif name not in self.get_hosts():
+            raise ValueError(f"Unknown host '{name}'")
+        else:
+            self.config['active_host'] = name
+        self.save_config()
+
+    def get_active_host(self):
+        return self.config.get('active_host')
+
+    def get_profile(self, name=None):
+        """Returns the connection profile for a named host, or the default one.
+
+        The default profile is the active host when one is selected, otherwise
+        the legacy top-level 'mode'/'ssh' settings.
+        """
+        if name is None:
+            name = self.get_active_host()
+        if name is None:
+            return {'mode': self.get_mode(), **self.get_ssh_config()}
+        hosts = self.get_hosts()
+        if name not in hosts:
+            raise ValueError(f"Unknown host '{name}'")
+        return hosts[name]
+
+    def resolve_targets(self, target=None):
+        """Expands a comma separated list of host and group names into host names.
+
+        An empty target means every configured host.
+        """
+        hosts = self.get_hosts()
+        groups = self.get_groups()
+        if not target:
+            return list(hosts.keys())
+        names = []
+        for item in target.split(','):
+            item = item.strip()
+            if not item:
+                continue
+            if item in groups:
+                members = groups[item]
+            elif item in hosts:
+                members = [item]
+            else:
+                raise ValueError(f"Unknown host or group '{item}'")
+            for member in members:
+                if member not in names:
+                    names.append(member)
+        return names
@@ -0,0 +1,189 @@
+import hashlib
+import os
+import tarfile
+import time
+
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class CopyLimitError(Exception):
+  pass
+
+
+class _ChunkReader:
+  """File-like view over an iterator of byte chunks, for tarfile's streaming mode."""
+
+  def __init__(self, chunks, on_bytes=None):
+    self._chunks = iter(chunks)
+    self._chunk = b''
+    self._offset = 0
+    self._on_bytes = on_bytes
+
+  def read(self, size=-1):
+    # Slices the current chunk instead of re-buffering it, so small tar reads stay cheap
+    parts = []
+    wanted = size
+    while size < 0 or wanted > 0:
+      if self._offset >= len(self._chunk):
+        try:
+          self._chunk = next(self._chunks)
+        except StopIteration:
+          break
+        self._offset = 0
+        if self._on_bytes is not None:
+          self._on_bytes(len(self._chunk))
+      end = len(self._chunk) if size < 0 else min(len(self._chunk), self._offset + wanted)
+      parts.append(self._chunk[self._offset : end])
+      wanted -= end - self._offset
+      self._offset = end
+    return b''.join(parts)
+
+
+def _safe_destination(root, name):
+  target = os.path.realpath(os.path.join(root, name))
+  if target != root and not target.startswith(root + os.sep):
+    raise ValueError(f'Archive member escapes the destination: {name}')
+  return target
+
+
+def extract_archive(chunks, dest_dir, max_bytes, progress=None, total=None):
+  """Extracts a tar stream chunk by chunk into dest_dir, hashing regular files as they are written.
+
+  Symlinks, hard links and special files are skipped rather than recreated, so nothing
+  in the archive can point outside dest_dir. Raises CopyLimitError once the archive
+  exceeds max_bytes; files written so far are left in place.
+  """
+  root = os.path.realpath(dest_dir)
+  os.makedirs(root, exist_ok=True)
+  received = [0]
+
+  def on_bytes(count):
+    received[0] += count
+    if received[0] > max_bytes:
+      raise CopyLimitError(f'archive larger than the {max_bytes} byte limit')
+    if progress is not None:
+      progress(received[0], total)
+
+  files, skipped = [], []
+  with tarfile.open(fileobj=_ChunkReader(chunks, on_bytes), mode='r|') as archive:
+    for member in archive:
+      target = _safe_destination(root, member.name)
+      if member.isdir():
+        os.makedirs(target, exist_ok=True)
+        continue
+      if not member.isfile():
+        skipped.append(member.name)
+        continue
+      os.makedirs(os.path.dirname(target), exist_ok=True)
+      digest = hashlib.sha256()
+      source = archive.extractfile(member)
+      with open(target, 'wb') as f:
+        while True:
+          block = source.read(CHUNK_SIZE)
+          if not block:
+            break
+          digest.update(block)
+          f.write(block)
+      os.chmod(target, member.mode & 0o755 | 0o600)
+      files.append({'path': os.path.relpath(target, root), 'bytes': member.size, 'sha256': digest.hexdigest()})
+  return {'files': files, 'skipped': skipped, 'archive_bytes': received[0]}
+
+
+def copy_from_container(api, container, path, dest_dir, max_bytes, progress=None):
+  """Streams `path` (file or directory) out of a container into dest_dir through the archive endpoint."""
+  started = time.monotonic()
+  chunks, stat = api.get_archive(container, path, chunk_size=CHUNK_SIZE)
+  stat = stat or {}
+  size = stat.get('size')
+  # Directories report their own inode size, so only a regular file's size can be checked upfront
+  is_dir = bool(stat.get('mode', 0) & (1 << 31))
+  if size is not None and not is_dir and size > max_bytes:
+    close = getattr(chunks, 'close', None)
+    if close is not None:
+      close()
+    raise CopyLimitError(f'{path} is {size} bytes, over the {max_bytes} byte limit')
+  result = extract_archive(chunks, dest_dir, max_bytes, progress, None if is_dir else size)
+  result['duration_ms'] = round((time.monotonic() - started) * 1000, 1)
+  return result
+
+
+def _tar_entries(source):
+  """(local path, archive name) for source and, if it is a directory, everything below it."""
+  source = os.path.abspath(source)
+  base = os.path.basename(source.rstrip(os.sep)) or 'root'
+  yield source, base
+  if os.path.isdir(source) and not os.path.islink(source):
+    for dirpath, dirnames, filenames in os.walk(source):
+      dirnames.sort()
+      for name in sorted(dirnames) + sorted(filenames):
+        full = os.path.join(dirpath, name)
+        yield full, os.path.join(base, os.path.relpath(full, source)).replace(os.sep, '/')
+
+
+def tar_info(path, arcname):
+  st = os.lstat(path)
+  info = tarfile.TarInfo(arcname)
+  info.mode = st.st_mode & 0o7777
+  info.mtime = int(st.st_mtime)
+  if os.path.islink(path):
+    info.type = tarfile.SYMTYPE
+    info.linkname = os.readlink(path)
+  elif os.path.isdir(path):
+    info.type = tarfile.DIRTYPE
+  elif os.path.isfile(path):
+    info.size = st.st_size
+  else:
+    return None
+  return info
+
+
+def plan_upload(source):
+  """Tar headers for source plus the total bytes of file content they describe."""
+  entries = []
+  for path, arcname in _tar_entries(source):
+    info = tar_info(path, arcname)
+    if info is not None:
+      entries.append((path, info))
+  return entries, sum(info.size for _, info in entries)
+
+
+def tar_stream(entries, files, progress=None, total=None):
+  """Yields a tar archive of `entries` chunk by chunk, hashing file content into `files` as it is read."""
+  sent = 0
+  for path, info in entries:
+    yield info.tobuf(tarfile.PAX_FORMAT)
+    if not info.isfile():
+      continue
+    digest = hashlib.sha256()
+    remaining = info.size
+    with open(path, 'rb') as f:
+      while remaining:
+        block = f.read(min(CHUNK_SIZE, remaining))
+        if not block:
+          raise OSError(f'{path} shrank while being copied')
+        remaining -= len(block)
+        digest.update(block)
+        sent += len(block)
+        if progress is not None:
+          progress(sent, total)
+        yield block
+    padding = -info.size % tarfile.BLOCKSIZE
+    if padding:
+      yield tarfile.NUL * padding
+    files.append({'path': info.name, 'bytes': info.size, 'sha256': digest.hexdigest()})
+  yield tarfile.NUL * (2 * tarfile.BLOCKSIZE)
+
+
+def copy_to_container(api, container, source, dest_dir, max_bytes, progress=None):
+  """Streams a local file or directory into dest_dir (an existing directory) inside a container."""
+  if not os.path.exists(source):
+    raise FileNotFoundError(f'{source} does not exist')
+  started = time.monotonic()
+  entries, total = plan_upload(source)
+  if total > max_bytes:
+    raise CopyLimitError(f'{source} is {total} bytes, over the {max_bytes} byte limit')
+  files = []
+  if not api.put_archive(container, dest_dir, tar_stream(entries, files, progress, total)):
+    raise RuntimeError(f'Docker rejected the archive for {dest_dir}')
+  return {'files': files, 'bytes': total, 'duration_ms': round((time.monotonic() - started) * 1000, 1)}
@@ -0,0 +1,165 @@
+import difflib
+import re
+import threading
+import time
+
+
+COMPOSE_SERVICE_LABEL = 'com.docker.compose.service'
+
+
+class ContainerResolutionError(Exception):
+  def __init__(self, query, candidates, ambiguous, exact_required=False):
+    self.query = query
+    self.candidates = candidates
+    self.ambiguous = ambiguous
+    self.exact_required = exact_required
+    names = ', '.join(candidates)
+    if exact_required:
+      message = f"Container '{query}' is not an exact name or ID; confirm which one is meant: {names}"
+    elif ambiguous:
+      message = f"Container '{query}' is ambiguous, candidates: {names}"
+    elif candidates:
+      message = f"Container '{query}' not found, did you mean: {names}"
+    else:
+      message = f"Container '{query}' not found"
+    super().__init__(message)
+
+
+def _components(name):
+  return [part for part in re.split(r'[_.-]', name.lower()) if part]
+
+
+class ContainerIndex:
+  """In-memory index of one host's containers by name, ID, compose service and name components.
+
+  Filled from a sparse container listing and kept current from Docker events, so
+  resolving a name is a few dict lookups; only unmatched names fall back to difflib.
+  """
+
+  def __init__(self, max_age=None):
+    self.max_age = 30.0 if max_age is None else max_age
+    self.refreshed_at = None
+    self._by_id = {}
+    self._maps = None
+    self._lock = threading.Lock()
+
+  def __len__(self):
+    return len(self._by_id)
+
+  @property
+  def stale(self):
+    return self.refreshed_at is None or time.monotonic() - self.refreshed_at > self.max_age
+
+  def refresh(self, containers):
+    """Replaces the index with sparse listing entries (dicts with Id, Names, Labels, State)."""
+    entries = {}
+    for attrs in containers:
+      names = attrs.get('Names') or ['']
+      entries[attrs['Id']] = {
+        'id': attrs['Id'],
+        'name': names[0].lstrip('/'),
+        'service': (attrs.get('Labels') or {}).get(COMPOSE_SERVICE_LABEL),
+        'state': attrs.get('State', ''),
+      }
+    with self._lock:
+      self._by_id = entries
+      self._maps = None
+      self.refreshed_at = time.monotonic()
+
+  def apply_event(self, event):
+    if event.get('Type') != 'container':
+      return
+    actor = event.get('Actor') or {}
+    container_id = actor.get('ID')
+    attributes = actor.get('Attributes') or {}
+    action = event.get('Action') or event.get('status') or ''
+    if not container_id or action.startswith('exec_'):
+      return
+    with self._lock:
+      self._maps = None
+      if action == 'destroy':
+        self._by_id.pop(container_id, None)
+        return
+      entry = self._by_id.setdefault(container_id, {'id': container_id, 'state': ''})
+      if attributes.get('name'):
+        entry['name'] = attributes['name']
+      if attributes.get(COMPOSE_SERVICE_LABEL):
+        entry['service'] = attributes[COMPOSE_SERVICE_LABEL]
+      entry.setdefault('name', container_id[:12])
+      entry.setdefault('service', None)
+      if action in ('start', 'unpause'):
+        entry['state'] = 'running'
+      elif action in ('die', 'stop', 'kill'):
+        entry['state'] = 'exited'
+
+  def names(self):
+    with self._lock:
+      return [entry['name'] for entry in self._by_id.values()]
+
+  def _lookup_maps(self):
+    # Rebuilt lazily after a refresh or event, so lookups between changes are dict hits
+    with self._lock:
+      if self._maps is None:
+        by_name, by_service, by_component = {}, {}, {}
+        for entry in self._by_id.values():
+          by_name[entry['name'].lower()] = entry
+          if entry.get('service'):
+            by_service.setdefault(entry['service'].lower(), []).append(entry)
+          for part in set(_components(entry['name'])):
+            by_component.setdefault(part, []).append(entry)
+        self._maps = (list(self._by_id.values()), by_name, by_service, by_component)
+      return self._maps
+
+  def candidates(self, query, limit=5):
+    """Ranked container names for query: exact name, ID prefix, compose service, name component, fuzzy."""
+    entries, by_name, by_service, by_component = self._lookup_maps()
+    lowered = query.lower().lstrip('/')
+    ranked = []
+
+    def add(entries_found, score):
+      # Running containers first within one tier
+      for entry in sorted(entries_found, key=lambda e: (e['state'] != 'running', e['name'])):
+        if entry['name'] not in [name for name, _ in ranked]:
+          ranked.append((entry['name'], score))
+
+    if lowered in by_name:
+      return [(by_name[lowered]['name'], 1.0)]
+    if len(lowered) >= 3 and re.fullmatch(r'[0-9a-f]+', lowered):
+      add([e for e in entries if e['id'].startswith(lowered)], 0.95)
+    add(by_service.get(lowered, []), 0.9)
+    add(by_component.get(lowered, []), 0.8)
+    if not ranked:
+      close = difflib.get_close_matches(lowered, list(by_name), n=limit, cutoff=0.6)
+      for match in close:
+        similarity = difflib.SequenceMatcher(None, lowered, match).ratio()
+        ranked.append((by_name[match]['name'], round(similarity * 0.7, 2)))
+    return ranked[:limit]
+
+  def resolve(self, query, exact=False):
+    """Returns the single best container name for query, or raises ContainerResolutionError.
+
+    With `exact` only the full name or an unambiguous ID prefix resolves; service,
+    component and fuzzy matches are raised as candidates for the user to confirm.
+    """
+    ranked = self.candidates(query)
+    if not ranked:
+      raise ContainerResolutionError(query, [], False)
+    top = [name for name, score in ranked if score == ranked[0][1]]
+    if exact and ranked[0][1] < 0.95:
+      raise ContainerResolutionError(query, [name for name, _ in ranked], False, exact_required=True)
+    if ranked[0][1] < 0.8:
+      raise ContainerResolutionError(query, [name for name, _ in ranked], False)
+    if len(top) > 1:
+      raise ContainerResolutionError(query, top, True)
+    return top[0]
+
+  def mentioned(self, text, limit=3):
+    """Indexed containers named in free text, whole or by name component or compose service."""
+    words = {w for w in re.findall(r'[a-z0-9_.-]+', text.lower()) if len(w) >= 2}
+    entries = self._lookup_maps()[0]
+    found = []
+    for entry in sorted(entries, key=lambda e: (e['state'] != 'running', e['name'])):
+      keys = {entry['name'].lower(), (entry.get('service') or '').lower()} | set(_components(entry['name']))
+      if words & keys:
+        found.append(entry['name'])
+    return found[:limit]
@@ -0,0 +1,169 @@
+import json
+import os
+import socket
+import uuid
+from rich.console import Console
+from rich.markdown import Markdown
+from rich.prompt import Prompt
+from cli_commands import local_command
+
+console = Console()
+
+DEFAULT_SOCKET_PATH = 'devpy-daemon.sock'
+
+
+def get_socket_path():
+  return os.getenv('DEVPY_DAEMON_SOCKET', DEFAULT_SOCKET_PATH)
+
+
+class DaemonClient:
+  """Thin client for the DevPy daemon; imports nothing heavier than rich."""
+
+  def __init__(self, socket_path=None, session_id=None):
+    self.socket_path = socket_path or get_socket_path()
+    self.session_id = session_id or f'client-{uuid.uuid4().hex[:8]}'
+    # Runs share one connection: the daemon ends the session (approvals, conversation) when it closes
+    self._session = None
+
+  def _connect(self):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(self.socket_path)
+    return sock, sock.makefile('rb'), sock.makefile('wb')
+
+  @staticmethod
+  def _send(wfile, message):
+    wfile.write((json.dumps(message, ensure_ascii=False) + '\n').encode('utf-8'))
+    wfile.flush()
+
+  @staticmethod
+  def _read(rfile):
+    line = rfile.readline()
+    if not line:
+      raise ConnectionError('Daemon closed the connection')
+    return json.loads(line.decode('utf-8'))
+
+  def is_running(self):
+    if not hasattr(socket, 'AF_UNIX') or not os.path.exists(self.socket_path):
+      return False
+    try:
+      sock, _, _ = self._connect()
+      sock.close()
+      return True
+    except OSError:
+      return False
+
+  def _request(self, message):
+    sock, rfile, wfile = self._connect()
+    try:
+      self._send(wfile, message)
+      return self._read(rfile)
+    finally:
+      sock.close()
+
+  def status(self):
+    return self._request({'type': 'status'})
+
+  def shutdown(self):
+    return self._request({'type': 'shutdown'})
+
+  def close(self):
+    """Closes the session connection, which ends the session on the daemon."""
+    if self._session is not None:
+      self._session[0].close()
+      self._session = None
+
+  def run(self, user_input, on_message=None, on_prompt=None):
+    """Submits an agent request and streams results.
+
+    on_message(content) receives agent messages; on_prompt(operation, impact, command)
+    must return 'y', 'n', 'yc' or 'ys'. Prompts are denied when no handler is given.
+    """
+    if self._session is None:
+      self._session = self._connect()
+    _, rfile, wfile = self._session
+    try:
+      self._send(wfile, {'type': 'run', 'input': user_input, 'session': self.session_id})
+      while True:
+        frame = self._read(rfile)
+        kind = frame.get('type')
+        if kind == 'message' and on_message is not None:
+          on_message(frame.get('content'))
+        elif kind == 'prompt':
+          answer = 'n'
+          if on_prompt is not None:
+            answer = on_prompt(frame.get('operation'), frame.get('impact'), frame.get('command'))
+          self._send(wfile, {'type': 'prompt_response', 'answer': answer})
+        elif kind == 'done':
+          return
+        elif kind == 'error':
+          raise RuntimeError(frame.get('message'))
+    except (OSError, ConnectionError):
+      self.close()
+      raise
+
+
+def print_message(content):
+  console.print('\n[bold magenta]Agent[/bold magenta]')
+  console.print(Markdown(content if isinstance(content, str) else str(content)))
+
+
+def ask_permission(operation, impact, command_preview):
+  console.print('\n[bold yellow]Permission Required[/bold yellow]')
+  console.print(f'Operation: {operation}')
+  if impact:
+    console.print(f'Potential Impact: {impact}')
+  if command_preview:
+    console.print(f'Command: {command_preview}')
+  console.print('Options: (y) yes, (n) no, (yc) yes for command, (ys) yes for session')
+  return Prompt.ask('(y/n/yc/ys)', choices=['y', 'n', 'yc', 'ys'], default='n')
+
+
+def _run_request(client, user_input):
+  try:
+    client.run(user_input, on_message=print_message, on_prompt=ask_permission)
+  except (ConnectionError, RuntimeError) as e:
+    console.print(f'[bold red]Error: {e}[/bold red]')
+    return 1
+  return 0
+
+
+def run_one_shot(client, user_input):
+  try:
+    return _run_request(client, user_input)
+  finally:
+    client.close()
+
+
+def run_thin_cli(client):
+  console.print(Markdown('# DevPy CLI'))
+  console.print(f'[dim]Connected to daemon at {client.socket_path}[/dim]')
+  config_commands = ('config', 'keys', 'permissions')
+  try:
+    while True:
+      try:
+        user_input = Prompt.ask('\n[bold]Enter a command[/bold]')
+        if user_input.lower() in ['exit', 'quit', 'bye']:
+          console.print('\n[bold green]Goodbye[/bold green]')
+          break
+        if user_input.strip() == '':
+          continue
+        if user_input.startswith(config_commands):
+          console.print(
+            '[yellow]Configuration commands are not available through the daemon. '
+            "Stop it with 'devpy-cli daemon stop' to change settings.[/yellow]"
+          )
+          continue
+        command = local_command(user_input)
+        if command:
+          # Local commands act on the CLI process itself, which is not the one running the agent here
+          console.print(
+            f"[yellow]'{command}' is not available through the daemon; it would act on this thin client, "
+            "not on the daemon's monitors. Stop it with 'devpy-cli daemon stop' to use it.[/yellow]"
+          )
+          continue
+        _run_request(client, user_input)
+      except KeyboardInterrupt:
+        console.print('\n[bold green]Goodbye[/bold green]')
+        break
+  finally:
+    client.close()
@@ -0,0 +1,221 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+import uuid
+from rich.console import Console
+from daemon_client import DaemonClient, get_socket_path
+
+console = Console()
+
+
+def send_message(wfile, message):
+  wfile.write((json.dumps(message, ensure_ascii=False, default=str) + '\n').encode('utf-8'))
+  wfile.flush()
+
+
+def read_message(rfile):
+  line = rfile.readline()
+  if not line:
+    return None
+  return json.loads(line.decode('utf-8'))
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+  """Serves one client connection speaking newline-delimited JSON.
+
+  Requests: {"type": "run", "input": ..., "session": ...}, {"type": "status"},
+  {"type": "shutdown"}. A run streams {"type": "message"} and {"type": "prompt"}
+  frames (the client answers prompts with {"type": "prompt_response", "answer": "y|n|yc|ys"})
+  and ends with {"type": "done"} or {"type": "error"}.
+  """
+
+  def handle(self):
+    session_id = f'session-{uuid.uuid4().hex[:8]}'
+    # A client keeps one connection for its lifetime, so its sessions end when it disconnects
+    sessions = set()
+    try:
+      while True:
+        try:
+          request = read_message(self.rfile)
+        except json.JSONDecodeError:
+          send_message(self.wfile, {'type': 'error', 'message': 'Invalid JSON request'})
+          continue
+        if request is None:
+          break
+        session_id = request.get('session') or session_id
+        kind = request.get('type')
+        if kind == 'run':
+          sessions.add(session_id)
+          self.handle_run(request.get('input', ''), session_id)
+        elif kind == 'status':
+          send_message(self.wfile, {'type': 'status', **self.server.devpy_daemon.status()})
+        elif kind == 'shutdown':
+          send_message(self.wfile, {'type': 'done'})
+          threading.Thread(target=self.server.shutdown, daemon=True).start()
+          break
+        else:
+          send_message(self.wfile, {'type': 'error', 'message': f'Unknown request type: {kind}'})
+    except (BrokenPipeError, ConnectionResetError):
+      pass
+    finally:
+      for ended in sessions:
+        self.server.devpy_daemon.end_session(ended)
+
+  def handle_run(self, user_input, session_id):
+    from backend import client_session, decision_from_answer, submit_agent_request
+
+    # Prompts and messages may come from LangGraph worker threads
+    write_lock = threading.Lock()
+
+    def emit(content):
+      with write_lock:
+        send_message(self.wfile, {'type': 'message', 'content': content})
+
+    def prompt(operation, impact, command_preview):
+      with write_lock:
+        send_message(
+          self.wfile, {'type': 'prompt', 'operation': operation, 'impact': impact, 'command': command_preview}
+        )
+        response = read_message(self.rfile)
+      if not response or response.get('type') != 'prompt_response':
+        return decision_from_answer('n')
+      return decision_from_answer(response.get('answer'))
+
+    self.server.devpy_daemon.track_request(session_id, +1)
+    try:
+      with client_session(session_id, prompt=prompt):
+        submit_agent_request(user_input, thread_id=session_id, emit=emit)
+      send_message(self.wfile, {'type': 'done'})
+    except (BrokenPipeError, ConnectionResetError):
+      raise
+    except Exception as e:
+      send_message(self.wfile, {'type': 'error', 'message': str(e)})
+    finally:
+      self.server.devpy_daemon.track_request(session_id, -1)
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+  daemon_threads = True
+  allow_reuse_address = True
+
+
+class DevPyDaemon:
+  """Keeps the agent, Docker connections, permission rules and monitors alive behind a unix socket."""
+
+  handler_class = DaemonRequestHandler
+
+  def __init__(self, socket_path=None):
+    self.socket_path = socket_path or get_socket_path()
+    self.started_at = None
+    self._active = {}
+    self._lock = threading.Lock()
+    self.server = None
+
+  def track_request(self, session_id, delta):
+    with self._lock:
+      count = self._active.get(session_id, 0) + delta
+      if count > 0:
+        self._active[session_id] = count
+      else:
+        self._active.pop(session_id, None)
+
+  def end_session(self, session_id):
+    from backend import end_client_session
+
+    end_client_session(session_id)
+
+  def status(self):
+    from backend import docker_pool
+
+    with self._lock:
+      sessions = list(self._active.keys())
+    return {
+      'pid': os.getpid(),
+      'uptime_s': round(time.time() - self.started_at, 1) if self.started_at else 0,
+      'active_sessions': sessions,
+      'docker_hosts': docker_pool.hosts(),
+    }
+
+  def warm_up(self):
+    """Pays the expensive startup costs once: imports, agent compilation, key unlock and connection."""
+    start = time.time()
+    import backend
+
+    try:
+      backend.get_docker_client()
+    except Exception as e:
+      console.print(f'[yellow]Docker connection not warmed up: {e}[/yellow]')
+    if os.getenv('DEVPY_METRICS_PORT'):
+      backend.start_metrics_endpoint()
+    console.print(f'[dim]Daemon warm-up finished in {time.time() - start:.1f}s[/dim]')
+
+  def _remove_stale_socket(self):
+    if not os.path.exists(self.socket_path):
+      return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+      probe.connect(self.socket_path)
+    except OSError:
+      os.remove(self.socket_path)
+      return
+    finally:
+      probe.close()
+    raise RuntimeError(f'A daemon is already listening on {self.socket_path}')
+
+  def bind(self):
+    # Only the owner may talk to the daemon: it can run Docker operations on their behalf. The
+    # umask makes bind() create the socket as 0600, with no window where others could connect
+    previous = os.umask(0o177)
+    try:
+      self.server = _UnixServer(self.socket_path, self.handler_class)
+    finally:
+      os.umask(previous)
+    self.server.devpy_daemon = self
+    return self.server
+
+  def serve_forever(self):
+    if not hasattr(socket, 'AF_UNIX'):
+      raise RuntimeError('Daemon mode requires unix domain sockets, which this platform does not support')
+    self._remove_stale_socket()
+    self.warm_up()
+    self.bind()
+    self.started_at = time.time()
+    console.print(f'[green]DevPy daemon listening on {self.socket_path}[/green]')
+    try:
+      self.server.serve_forever()
+    finally:
+      self.server.server_close()
+      if os.path.exists(self.socket_path):
+        os.remove(self.socket_path)
+      console.print('[bold green]DevPy daemon stopped[/bold green]')
+
+
+def run_daemon_command(args):
+  cmd = args[0] if args else 'start'
+  client = DaemonClient()
+  if cmd == 'start':
+    try:
+      DevPyDaemon().serve_forever()
+    except RuntimeError as e:
+      console.print(f'[red]{e}[/red]')
+    except KeyboardInterrupt:
+      pass
+  elif cmd == 'status':
+    if not client.is_running():
+      console.print('Daemon is not running.')
+      return
+    status = client.status()
+    console.print(f'Daemon running (pid {status["pid"]}, uptime {status["uptime_s"]}s)')
+    console.print(f'Active sessions: {len(status["active_sessions"])}')
+    console.print(f'Connected Docker hosts: {", ".join(status["docker_hosts"]) or "none"}')
+  elif cmd == 'stop':
+    if client.is_running():
+      client.shutdown()
+      console.print('[green]Daemon stopped.[/green]')
+    else:
+      console.print('Daemon is not running.')
+  else:
+    console.print('[yellow]Usage: devpy-cli daemon [start|status|stop][/yellow]')
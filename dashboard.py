@@ -0,0 +1,255 @@
+import os
+import threading
+import time
+from collections import deque
+from rich.console import Group
+from rich.live import Live
+from rich.table import Table
+from rich.text import Text
+
+from events_watcher import EventsWatcher
+
+
+_STATE_STYLES = {'running': 'green', 'exited': 'red', 'dead': 'red', 'paused': 'yellow', 'restarting': 'yellow'}
+_HEALTH_STYLES = {'healthy': 'green', 'unhealthy': 'bold red', 'starting': 'yellow'}
+# Actions shown in the recent events list; exec_* and attach noise is left out
+_SHOWN_ACTIONS = {'create', 'start', 'restart', 'die', 'stop', 'kill', 'oom', 'pause', 'unpause', 'destroy', 'rename'}
+
+
+def _health_from_status(status):
+  if '(unhealthy)' in status:
+    return 'unhealthy'
+  if '(healthy)' in status:
+    return 'healthy'
+  if '(health: starting)' in status:
+    return 'starting'
+  return ''
+
+
+def _new_row(name, image, state, status):
+  return {
+    'name': name,
+    'image': image,
+    'state': state,
+    'status': status,
+    'health': _health_from_status(status),
+    'cpu': None,
+    'mem': None,
+    'mem_percent': None,
+  }
+
+
+def _clock(timestamp):
+  return time.strftime('%H:%M:%S', time.localtime(timestamp))
+
+
+class DashboardState:
+  """Container rows and recent events, kept current from Docker events and stats samples.
+
+  Every update records which rows it touched, so the renderer only rebuilds those.
+  """
+
+  def __init__(self, max_events=8):
+    self.rows = {}
+    self.events = deque(maxlen=max_events)
+    self._dirty = set()
+    self._events_changed = False
+    self._lock = threading.Lock()
+
+  def load(self, containers):
+    """Replaces the rows with sparse listing entries (dicts with Names, Image, State, Status)."""
+    with self._lock:
+      self.rows = {}
+      for attrs in containers:
+        name = (attrs.get('Names') or [attrs.get('Id', '')[:12]])[0].lstrip('/')
+        self.rows[name] = _new_row(name, attrs.get('Image', ''), attrs.get('State', ''), attrs.get('Status', ''))
+      self._dirty = set(self.rows)
+
+  def apply_event(self, event):
+    if event.get('Type', 'container') != 'container':
+      return
+    action = event.get('Action') or event.get('status') or ''
+    attributes = (event.get('Actor') or {}).get('Attributes') or {}
+    name = attributes.get('name') or ((event.get('Actor') or {}).get('ID') or '')[:12]
+    if not name or action.startswith('exec_'):
+      return
+    when = event.get('time') or time.time()
+    with self._lock:
+      if action == 'destroy':
+        self.rows.pop(name, None)
+      else:
+        row = self.rows.get(name)
+        if row is None:
+          row = self.rows[name] = _new_row(name, attributes.get('image', ''), 'created', 'Created')
+        if action in ('start', 'unpause'):
+          row['state'], row['status'] = 'running', f'Up since {_clock(when)}'
+        elif action == 'restart':
+          row['state'], row['status'] = 'running', f'Restarted at {_clock(when)}'
+        elif action == 'die':
+          row['state'] = 'exited'
+          row['status'] = f'Exited ({attributes.get("exitCode", "?")}) at {_clock(when)}'
+          row['cpu'] = row['mem'] = row['mem_percent'] = None
+        elif action == 'pause':
+          row['state'], row['status'] = 'paused', f'Paused at {_clock(when)}'
+        elif action.startswith('health_status'):
+          row['health'] = action.split(':', 1)[-1].strip()
+        elif action == 'oom':
+          row['status'] = f'OOM killed at {_clock(when)}'
+      self._dirty.add(name)
+      base_action = action.split(':', 1)[0]
+      if base_action in _SHOWN_ACTIONS or action.startswith('health_status'):
+        self.events.append((when, name, action))
+        self._events_changed = True
+
+  def apply_samples(self, samples):
+    with self._lock:
+      for name, sample in samples.items():
+        row = self.rows.get(name)
+        if row is None:
+          continue
+        row['cpu'] = sample.get('cpu_percent')
+        row['mem'] = sample.get('mem_usage')
+        row['mem_percent'] = sample.get('mem_percent')
+        self._dirty.add(name)
+
+  def take_changes(self):
+    """Returns (changed row snapshots by name, whether events changed) and clears both."""
+    with self._lock:
+      changed = {name: (dict(self.rows[name]) if name in self.rows else None) for name in self._dirty}
+      events_changed = self._events_changed
+      self._dirty = set()
+      self._events_changed = False
+      return changed, events_changed
+
+
+def _format_bytes(value):
+  for unit in ('B', 'KiB', 'MiB', 'GiB'):
+    if value < 1024 or unit == 'GiB':
+      return f'{value:.0f}{unit}' if unit == 'B' else f'{value:.1f}{unit}'
+    value /= 1024
+
+
+class Dashboard:
+  """Live terminal view of a host's containers that never calls the LLM.
+
+  Rows come from one sparse listing, then only from the Docker events stream and the
+  shared stats sampler. Each frame rebuilds the cells of rows that changed, and the
+  screen is only refreshed when some cell or the events list actually differs, at most
+  `fps` times per second.
+  """
+
+  def __init__(self, client_factory, stats_sampler, events_watcher=None, console=None, fps=None, host=''):
+    if fps is None:
+      fps = float(os.getenv('DEVPY_DASHBOARD_FPS', '4'))
+    self.client_factory = client_factory
+    self.stats_sampler = stats_sampler
+    self.events_watcher = events_watcher
+    self.console = console
+    self.fps = max(fps, 0.1)
+    self.host = host
+    self.state = DashboardState()
+    self.frames = 0
+    self._cells = {}
+    self._changed = threading.Event()
+    self._stop = threading.Event()
+
+  def _on_event(self, event):
+    self.state.apply_event(event)
+    self._changed.set()
+
+  def _on_samples(self, samples):
+    self.state.apply_samples(samples)
+    self._changed.set()
+
+  @staticmethod
+  def _row_cells(row):
+    cpu = '-' if row['cpu'] is None else f'{row["cpu"]:.1f}%'
+    mem = '-' if row['mem'] is None else f'{_format_bytes(row["mem"])} ({row["mem_percent"]:.1f}%)'
+    return (row['name'], row['image'][:40], row['state'], row['status'], row['health'] or '-', cpu, mem)
+
+  def update(self):
+    """Applies pending changes to the cell cache; returns True when anything visible changed."""
+    changed, events_changed = self.state.take_changes()
+    visible = events_changed
+    for name, row in changed.items():
+      if row is None:
+        visible = self._cells.pop(name, None) is not None or visible
+        continue
+      cells = self._row_cells(row)
+      if self._cells.get(name) != cells:
+        self._cells[name] = cells
+        visible = True
+    return visible
+
+  def render(self):
+    running = sum(1 for cells in self._cells.values() if cells[2] == 'running')
+    title = f'{self.host + ": " if self.host else ""}{running} running / {len(self._cells)} containers'
+    table = Table(title=title, expand=True)
+    for column in ('Container', 'Image', 'State', 'Status', 'Health', 'CPU', 'Memory'):
+      table.add_column(column, no_wrap=True, justify='right' if column in ('CPU', 'Memory') else 'left')
+    for cells in sorted(self._cells.values(), key=lambda c: (c[2] != 'running', c[0])):
+      name, image, state, status, health, cpu, mem = cells
+      table.add_row(
+        name,
+        image,
+        Text(state, style=_STATE_STYLES.get(state, '')),
+        status,
+        Text(health, style=_HEALTH_STYLES.get(health, '')),
+        cpu,
+        mem,
+      )
+    events = Text()
+    for when, name, action in reversed(self.state.events):
+      events.append(f'{_clock(when)}  {name}  {action}\n', style='red' if action in ('die', 'oom') else '')
+    footer = Text('Ctrl+C to exit', style='dim')
+    return Group(table, Text('Recent events', style='bold'), events or Text('none yet', style='dim'), footer)
+
+  def stop(self):
+    self._stop.set()
+    self._changed.set()
+
+  def run(self, duration=None):
+    """Shows the dashboard until Ctrl+C (or `duration` seconds); starts what it needs and stops it after."""
+    client = self.client_factory()
+    self.state.load(c.attrs for c in client.containers.list(all=True, sparse=True))
+    # An alerting watcher already running is shared; otherwise a rule-less one only feeds the view
+    watcher = self.events_watcher
+    own_watcher = watcher is None or not watcher.running
+    if own_watcher:
+      watcher = EventsWatcher(self.client_factory, lambda alert: None, rules=[])
+    started_sampler = self.stats_sampler.start()
+    watcher.listeners.append(self._on_event)
+    self.stats_sampler.listeners.append(self._on_samples)
+    if own_watcher:
+      watcher.start()
+    self._stop.clear()
+    deadline = None if duration is None else time.monotonic() + duration
+    frame = 1 / self.fps
+    try:
+      self.update()
+      with Live(self.render(), console=self.console, auto_refresh=False, transient=False) as live:
+        live.refresh()
+        self.frames += 1
+        last_frame = time.monotonic()
+        while not self._stop.is_set():
+          timeout = 1.0 if deadline is None else min(1.0, deadline - time.monotonic())
+          if timeout <= 0:
+            break
+          if not self._changed.wait(timeout):
+            continue
+          # Cap the frame rate: changes arriving within one frame are drawn together
+          self._stop.wait(max(last_frame + frame - time.monotonic(), 0))
+          self._changed.clear()
+          if self.update():
+            live.update(self.render(), refresh=True)
+            self.frames += 1
+          last_frame = time.monotonic()
+    except KeyboardInterrupt:
+      pass
+    finally:
+      watcher.listeners.remove(self._on_event)
+      self.stats_sampler.listeners.remove(self._on_samples)
+      if own_watcher:
+        watcher.stop()
+      if started_sampler:
+        self.stats_sampler.stop()
@@ -0,0 +1,134 @@
+import time
+
+
+# Run in this order. Images and volumes are removed by the identity recorded in the plan, not
+# pruned, so ones freed only by removing stopped containers are never deleted unplanned
+RECLAIM_CATEGORIES = ('stopped_containers', 'dangling_images', 'unused_images', 'unused_volumes', 'build_cache')
+
+_STOPPED_STATES = {'created', 'exited', 'dead'}
+
+
+def _tags(image):
+  return [t for t in image.get('RepoTags') or [] if t != '<none>:<none>']
+
+
+def _unique_size(image):
+  # Layers shared with other images are only freed once no remaining image uses them
+  shared = image.get('SharedSize', -1)
+  return image.get('Size', 0) - (shared if shared > 0 else 0)
+
+
+def _label(image):
+  tags = _tags(image)
+  return tags[0] if tags else image['Id'].split(':', 1)[-1][:12]
+
+
+def _references(image):
+  # A tagged image goes away with its last tag; removing it by ID would need force
+  return _tags(image) or [image['Id']]
+
+
+class ReclaimPlan:
+  """What a batch of prunes would remove, computed from one `system df` response.
+
+  `items` maps each selected category to the names of the objects it covers and the
+  bytes they free. Image sizes count unique bytes only, so the estimate is a lower
+  bound when several removed images share layers. Images and volumes are removed one
+  by one from the plan, so `execute` never deletes more than was approved.
+  """
+
+  def __init__(self, df, categories=RECLAIM_CATEGORIES, older_than_days=7, now=None):
+    unknown = set(categories) - set(RECLAIM_CATEGORIES)
+    if unknown:
+      raise ValueError(f'Unknown reclaim categories: {", ".join(sorted(unknown))}')
+    self.categories = [c for c in RECLAIM_CATEGORIES if c in categories]
+    self.older_than_days = older_than_days
+    cutoff = (time.time() if now is None else now) - older_than_days * 86400
+    self.items = {}
+
+    images = [i for i in df.get('Images') or [] if i.get('Containers', 0) == 0]
+    dangling = [i for i in images if not _tags(i)]
+    old_unused = [
+      i for i in images if i.get('Created', 0) <= cutoff and (_tags(i) or 'dangling_images' not in self.categories)
+    ]
+    stopped = [c for c in df.get('Containers') or [] if c.get('State') in _STOPPED_STATES]
+    volumes = [v for v in df.get('Volumes') or [] if (v.get('UsageData') or {}).get('RefCount', 0) == 0]
+    caches = [b for b in df.get('BuildCache') or [] if not b.get('InUse') and not b.get('Shared')]
+
+    found = {
+      'stopped_containers': [((c.get('Names') or [''])[0].lstrip('/'), c.get('SizeRw', 0)) for c in stopped],
+      'dangling_images': [(_label(i), _unique_size(i)) for i in dangling],
+      'unused_images': [(_label(i), _unique_size(i)) for i in old_unused],
+      'unused_volumes': [(v['Name'], max((v.get('UsageData') or {}).get('Size', 0), 0)) for v in volumes],
+      'build_cache': [(b.get('ID', '')[:12], b.get('Size', 0)) for b in caches],
+    }
+    for category in self.categories:
+      entries = found[category]
+      self.items[category] = {'names': [name for name, _ in entries], 'bytes': sum(size for _, size in entries)}
+    # (references to remove, bytes freed) per planned image or volume
+    self._removals = {
+      'dangling_images': [(_references(i), _unique_size(i)) for i in dangling],
+      'unused_images': [(_references(i), _unique_size(i)) for i in old_unused],
+      'unused_volumes': [([name], size) for name, size in found['unused_volumes']],
+    }
+
+  @property
+  def total_bytes(self):
+    return sum(item['bytes'] for item in self.items.values())
+
+  @property
+  def empty(self):
+    return not any(item['names'] for item in self.items.values())
+
+  def commands(self):
+    """The docker CLI equivalent of each non-empty step, in execution order."""
+    removed = {c: ' '.join(ref for refs, _ in entries for ref in refs) for c, entries in self._removals.items()}
+    equivalents = {
+      'stopped_containers': 'docker container prune -f',
+      'dangling_images': f'docker image rm {removed["dangling_images"]}',
+      'unused_images': f'docker image rm {removed["unused_images"]}',
+      'unused_volumes': f'docker volume rm {removed["unused_volumes"]}',
+      'build_cache': 'docker builder prune -a -f',
+    }
+    return [equivalents[c] for c in self.categories if self.items[c]['names']]
+
+  def execute(self, client):
+    """Runs the prunes for every non-empty category; returns {category: {deleted, reclaimed, error}}."""
+    results = {}
+    for category in self.categories:
+      if not self.items[category]['names']:
+        continue
+      if category in self._removals:
+        results[category] = self._remove(client, category)
+        continue
+      try:
+        response = self._prune(client, category) or {}
+      except Exception as e:
+        results[category] = {'deleted': 0, 'reclaimed': 0, 'error': str(e)}
+        continue
+      deleted = 0
+      for key in ('ContainersDeleted', 'ImagesDeleted', 'VolumesDeleted', 'CachesDeleted'):
+        deleted += len(response.get(key) or [])
+      results[category] = {'deleted': deleted, 'reclaimed': response.get('SpaceReclaimed', 0) or 0, 'error': None}
+    return results
+
+  def _remove(self, client, category):
+    deleted, reclaimed, errors = 0, 0, []
+    for references, size in self._removals[category]:
+      try:
+        for reference in references:
+          if category == 'unused_volumes':
+            client.api.remove_volume(reference)
+          else:
+            client.images.remove(reference)
+      except Exception as e:
+        errors.append(f'{references[0]}: {e}')
+        continue
+      deleted += 1
+      reclaimed += size
+    return {'deleted': deleted, 'reclaimed': reclaimed, 'error': '; '.join(errors) or None}
+
+  def _prune(self, client, category):
+    if category == 'stopped_containers':
+      return client.containers.prune()
+    return client.api.prune_builds(all=True)
@@ -0,0 +1,274 @@
+import fnmatch
+import json
+import os
+import threading
+import time
+from collections import deque
+
+
+DEFAULT_RULES = [
+  {
+    'name': 'container_crashed',
+    'event': 'die',
+    'exit_code': 'nonzero',
+    'action': 'diagnose',
+    'cooldown_seconds': 300,
+  },
+  {
+    'name': 'out_of_memory',
+    'event': 'oom',
+    'action': 'diagnose',
+    'cooldown_seconds': 300,
+  },
+  {
+    'name': 'health_check_failed',
+    'event': 'health_status: unhealthy',
+    'action': 'notify',
+    'cooldown_seconds': 300,
+  },
+  {
+    'name': 'crash_loop',
+    'event': 'die',
+    'count': 3,
+    'window_minutes': 5,
+    'action': 'diagnose',
+    'cooldown_seconds': 900,
+  },
+]
+
+
+class AlertRulesConfig:
+  """Loads declarative alert rules from alert_rules.json, falling back to DEFAULT_RULES.
+
+  A rule matches container events by `event` (the Docker action, e.g. 'die', 'oom',
+  'health_status: unhealthy') and optionally `exit_code` ('nonzero' or a number) and
+  `containers` (name glob patterns). With `count`/`window_minutes` it only fires once
+  the event was seen `count` times for a container within the window. Every rule has a
+  per-container `cooldown_seconds` and an `action`: 'notify' or 'diagnose'.
+  """
+
+  def __init__(self, config_file='alert_rules.json'):
+    self.config_file = config_file
+
+  def load_rules(self):
+    if not os.path.exists(self.config_file):
+      return [dict(rule) for rule in DEFAULT_RULES]
+    try:
+      with open(self.config_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    except (json.JSONDecodeError, OSError):
+      return [dict(rule) for rule in DEFAULT_RULES]
+    return data.get('rules', [])
+
+  def save_rules(self, rules):
+    with open(self.config_file, 'w', encoding='utf-8') as f:
+      json.dump({'version': '1.0', 'rules': rules}, f, indent=2, ensure_ascii=False)
+
+
+class Alert:
+  def __init__(self, rule, container, message, event, timestamp):
+    self.rule = rule
+    self.container = container
+    self.message = message
+    self.event = event
+    self.timestamp = timestamp
+
+  @property
+  def action(self):
+    return self.rule.get('action', 'notify')
+
+
+def _event_container(event):
+  actor = event.get('Actor') or {}
+  attributes = actor.get('Attributes') or {}
+  return attributes.get('name') or (actor.get('ID') or event.get('id') or '')[:12]
+
+
+def _event_action(event):
+  return event.get('Action') or event.get('status') or ''
+
+
+def _describe(event, container):
+  action = _event_action(event)
+  attributes = (event.get('Actor') or {}).get('Attributes') or {}
+  if action == 'die':
+    return f'Container {container} died with exit code {attributes.get("exitCode", "?")}'
+  if action == 'oom':
+    return f'Container {container} was killed by the OOM killer'
+  if action.startswith('health_status'):
+    return f'Container {container} health check reported {action.split(":", 1)[-1].strip()}'
+  return f'Container {container} emitted {action}'
+
+
+class AlertRuleEngine:
+  """Evaluates Docker events against rules, with sliding-window counts, deduplication and cooldowns."""
+
+  def __init__(self, rules):
+    self.rules = rules
+    self._last_fired = {}
+    self._windows = {}
+    self._seen = deque(maxlen=1024)
+    self._seen_set = set()
+
+  def _is_duplicate(self, event):
+    # Events replayed after a reconnect (`since=`) carry the same timestamp, id and action
+    key = (event.get('timeNano') or event.get('time'), (event.get('Actor') or {}).get('ID'), _event_action(event))
+    if key in self._seen_set:
+      return True
+    if len(self._seen) == self._seen.maxlen:
+      self._seen_set.discard(self._seen[0])
+    self._seen.append(key)
+    self._seen_set.add(key)
+    return False
+
+  @staticmethod
+  def _matches(rule, event, container):
+    if _event_action(event) != rule.get('event'):
+      return False
+    patterns = rule.get('containers') or ['*']
+    if not any(fnmatch.fnmatch(container, p) for p in patterns):
+      return False
+    expected_exit = rule.get('exit_code')
+    if expected_exit is not None:
+      attributes = (event.get('Actor') or {}).get('Attributes') or {}
+      try:
+        exit_code = int(attributes.get('exitCode', 0))
+      except (TypeError, ValueError):
+        return False
+      if expected_exit == 'nonzero':
+        return exit_code != 0
+      return exit_code == int(expected_exit)
+    return True
+
+  def evaluate(self, event, now=None):
+    if event.get('Type', 'container') != 'container' or self._is_duplicate(event):
+      return []
+    if now is None:
+      now = time.time()
+    container = _event_container(event)
+    alerts = []
+    for rule in self.rules:
+      if not self._matches(rule, event, container):
+        continue
+      key = (rule.get('name'), container)
+      message = _describe(event, container)
+      count = rule.get('count')
+      if count:
+        window = self._windows.setdefault(key, deque())
+        window.append(now)
+        horizon = now - float(rule.get('window_minutes', 5)) * 60
+        while window and window[0] < horizon:
+          window.popleft()
+        if len(window) < int(count):
+          continue
+        message = f'{message} ({len(window)} times in the last {rule.get("window_minutes", 5)} minutes)'
+      last = self._last_fired.get(key)
+      if last is not None and now - last < float(rule.get('cooldown_seconds', 300)):
+        continue
+      self._last_fired[key] = now
+      alerts.append(Alert(rule, container, message, event, now))
+    return alerts
+
+
+class EventsWatcher:
+  """Single long-lived subscriber to the Docker events stream feeding an AlertRuleEngine.
+
+  `client_factory()` returns a Docker client; `on_alert(alert)` is called for every
+  alert that survives deduplication and cooldowns. The stream is resumed with `since`
+  after connection errors so no events are lost across short outages.
+
+  Several holders can share the one stream: it runs while any holder has started it,
+  and alert rules are only evaluated while the `ALERTS` holder is among them, so other
+  holders (the /metrics restart counter) just feed the listeners.
+  """
+
+  ALERTS = 'alerts'
+
+  def __init__(self, client_factory, on_alert, rules=None, history_size=100):
+    self.client_factory = client_factory
+    self.on_alert = on_alert
+    self.engine = AlertRuleEngine(rules if rules is not None else AlertRulesConfig().load_rules())
+    self.recent_alerts = deque(maxlen=history_size)
+    self.listeners = []
+    self._stop = threading.Event()
+    self._thread = None
+    self._stream = None
+    self._last_event_time = None
+    self._holders = set()
+    self._lock = threading.Lock()
+
+  @property
+  def running(self):
+    return self._thread is not None and self._thread.is_alive()
+
+  @property
+  def alerting(self):
+    return self.ALERTS in self._holders
+
+  def start(self, holder=ALERTS):
+    """Starts the stream for `holder`; returns False if that holder already had it running."""
+    with self._lock:
+      if holder in self._holders and self.running:
+        return False
+      self._holders.add(holder)
+      if self.running and not self._stop.is_set():
+        return True
+      if self._thread is not None:
+        # A stop is still closing the previous stream
+        self._thread.join(timeout=2)
+      self._stop.clear()
+      self._thread = threading.Thread(target=self._run, name='docker-events', daemon=True)
+      self._thread.start()
+      return True
+
+  def stop(self, holder=ALERTS):
+    """Releases `holder`; the stream is closed once no holder is left."""
+    with self._lock:
+      self._holders.discard(holder)
+      if self._holders:
+        return
+      self._stop.set()
+      stream = self._stream
+    if stream is not None:
+      try:
+        stream.close()
+      except Exception:
+        pass
+
+  def _run(self):
+    backoff = 1
+    while not self._stop.is_set():
+      try:
+        client = self.client_factory()
+        since = self._last_event_time or int(time.time())
+        self._stream = client.events(decode=True, since=since, filters={'type': 'container'})
+        backoff = 1
+        for event in self._stream:
+          if self._stop.is_set():
+            break
+          self._last_event_time = event.get('time', self._last_event_time)
+          self.handle_event(event)
+        # The daemon closed the stream; resubscribe after a short pause
+        self._stop.wait(1)
+      except Exception:
+        if self._stop.is_set():
+          break
+        self._stop.wait(backoff)
+        backoff = min(backoff * 2, 60)
+      finally:
+        self._stream = None
+
+  def handle_event(self, event):
+    for listener in self.listeners:
+      try:
+        listener(event)
+      except Exception:
+        pass
+    if self._holders and not self.alerting:
+      return
+    for alert in self.engine.evaluate(event):
+      self.recent_alerts.append(alert)
+      try:
+        self.on_alert(alert)
+      except Exception:
+        pass
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+DEFAULT_HOST = 'default'
+
+
+class DockerClientPool:
+  """Keeps one Docker client per host profile, created lazily by `factory`."""
+
+  def __init__(self, factory):
+    self.factory = factory
+    self._clients = {}
+    self._lock = threading.Lock()
+    self._host_locks = {}
+
+  def _host_lock(self, name):
+    with self._lock:
+      if name not in self._host_locks:
+        self._host_locks[name] = threading.Lock()
+      return self._host_locks[name]
+
+  def get(self, name=DEFAULT_HOST):
+    client = self._clients.get(name)
+    if client is not None:
+      return client
+    # Per-host lock so concurrent fan-out never builds two clients for one host
+    with self._host_lock(name):
+      client = self._clients.get(name)
+      if client is None:
+        client = self.factory(name)
+        self._clients[name] = client
+      return client
+
+  def reset(self, name=None):
+    with self._lock:
+      if name is None:
+        names = list(self._clients.keys())
+      else:
+        names = [name] if name in self._clients else []
+      clients = [self._clients.pop(n) for n in names]
+    for client in clients:
+      try:
+        client.close()
+      except Exception:
+        pass
+
+  def hosts(self):
+    return list(self._clients.keys())
+
+
+class HostResult:
+  def __init__(self, host, value=None, error=None, duration_ms=0, timed_out=False):
+    self.host = host
+    self.value = value
+    self.error = error
+    self.duration_ms = duration_ms
+    self.timed_out = timed_out
+
+  @property
+  def ok(self):
+    return self.error is None and not self.timed_out
+
+
+class FleetManager:
+  """Runs a per-host function across many hosts over a bounded thread pool.
+
+  Each host gets its own timeout measured from the moment its task starts, so a
+  fleet-wide query takes roughly as long as the slowest responsive host. A host still
+  queued `timeout` seconds after submission (every worker busy, e.g. with hung hosts
+  from earlier queries) times out too. Hosts that fail or time out are reported
+  alongside the successful ones instead of failing the whole query.
+  """
+
+  def __init__(self, pool, max_workers=None, timeout=None):
+    if max_workers is None:
+      max_workers = int(os.getenv('DEVPY_FLEET_WORKERS', '8'))
+    if timeout is None:
+      timeout = float(os.getenv('DEVPY_FLEET_TIMEOUT', '15'))
+    self.pool = pool
+    self.max_workers = max_workers
+    self.timeout = timeout
+    self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fleet')
+
+  def fan_out(self, hosts, fn, timeout=None):
+    """Calls fn(client, host) for every host and returns HostResults in host order."""
+    if timeout is None:
+      timeout = self.timeout
+    started = {}
+    results = {}
+
+    def run(host):
+      started[host] = time.monotonic()
+      client = self.pool.get(host)
+      return fn(client, host)
+
+    submitted = time.monotonic()
+    futures = {self._executor.submit(run, host): host for host in hosts}
+    pending = set(futures)
+
+    def deadline(host):
+      return started.get(host, submitted) + timeout
+
+    while pending:
+      now = time.monotonic()
+      wait_for = max(0.0, min(deadline(futures[f]) for f in pending) - now)
+      done, pending = wait(pending, timeout=wait_for or 0.01, return_when=FIRST_COMPLETED)
+      for future in done:
+        host = futures[future]
+        duration = (time.monotonic() - started.get(host, now)) * 1000
+        try:
+          results[host] = HostResult(host, value=future.result(), duration_ms=duration)
+        except Exception as e:
+          results[host] = HostResult(host, error=str(e) or e.__class__.__name__, duration_ms=duration)
+      now = time.monotonic()
+      for future in list(pending):
+        host = futures[future]
+        if now >= deadline(host):
+          # A queued task is cancelled; a running one keeps its worker and its result is discarded
+          future.cancel()
+          pending.discard(future)
+          results[host] = HostResult(host, duration_ms=timeout * 1000, timed_out=True)
+    return [results[host] for host in hosts]
+
+
+def format_partial_failures(results):
+  lines = []
+  for result in results:
+    if result.timed_out:
+      lines.append(f'- {result.host}: timed out after {result.duration_ms / 1000:.1f}s')
+    elif result.error is not None:
+      lines.append(f'- {result.host}: error: {result.error}')
+  if not lines:
+    return ''
+  ok = sum(1 for r in results if r.ok)
+  return f'Partial results ({ok}/{len(results)} hosts answered):\n' + '\n'.join(lines)
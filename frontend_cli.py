@@ -1,4 +1,5 @@
 import os
+import time
 from importlib.metadata import PackageNotFoundError, version
 from pathlib import Path
 import json
@@ -7,7 +8,34 @@ import tomllib
 from rich.console import Console
 from rich.prompt import Prompt
 from rich.markdown import Markdown
-from backend import run_agent_flow, config_manager, ssh_key_manager, reset_docker_client, permission_manager
+from backend import (
+  submit_agent_request,
+  config_manager,
+  ssh_key_manager,
+  reset_docker_client,
+  permission_manager,
+  get_events_watcher,
+  agent_queue,
+  stats_sampler,
+  stats_store,
+  metrics_server,
+  start_metrics_endpoint,
+  stop_metrics_endpoint,
+  response_cache,
+  query_cache,
+  tool_selector,
+  tool_selection_enabled,
+  llm,
+  get_docker_client,
+  turn_profiler,
+  session_recorder,
+)
+from cli_commands import local_command
+from dashboard import Dashboard
+from events_watcher import AlertRulesConfig
+from llm.router import PROVIDER_MODULES
+from agent_queue import INTERACTIVE
+from session_recorder import RECORDING_WARNING
 from setup_wizard import run_setup
 
 console = Console()
@@ -75,7 +103,7 @@ def check_for_update():
 def handle_config_command(user_input):
   parts = user_input.split()
   if len(parts) < 2:
-    console.print('[yellow]Usage: config [mode|ssh|llm][/yellow]')
+    console.print('[yellow]Usage: config [mode|ssh|llm|host|group|use][/yellow]')
     return
 
   cmd = parts[1]
@@ -99,12 +127,122 @@ def handle_config_command(user_input):
       return
     key_name = Prompt.ask('SSH Key Name', choices=keys)
     config_manager.set_ssh_config(host, user, key_name)
-    reset_docker_client()
+    reset_docker_client(forget_api_version=True)
     console.print('[green]SSH Configuration saved.[/green]')
   elif cmd == 'llm':
     console.print('[bold]Reconfiguring LLM Settings...[/bold]')
     run_setup(force=True)
     console.print('[yellow]Please restart the application for changes to take effect.[/yellow]')
+  elif cmd == 'host':
+    handle_host_command(parts)
+  elif cmd == 'group':
+    handle_group_command(parts)
+  elif cmd == 'use':
+    if len(parts) != 3:
+      active = config_manager.get_active_host() or 'default'
+      console.print(f'Active host: {active}')
+      console.print('[yellow]Usage: config use <host|default>[/yellow]')
+      return
+    name = parts[2]
+    try:
+      config_manager.set_active_host(None if name == 'default' else name)
+    except ValueError as e:
+      console.print(f'[red]{e}[/red]')
+      return
+    reset_docker_client('default')
+    console.print(f'[green]Active host set to {name}[/green]')
+
+
+def handle_host_command(parts):
+  if len(parts) < 3:
+    console.print('[yellow]Usage: config host [list|add <name>|remove <name>][/yellow]')
+    return
+
+  cmd = parts[2]
+  if cmd == 'list':
+    hosts = config_manager.get_hosts()
+    if not hosts:
+      console.print('No hosts configured.')
+      return
+    active = config_manager.get_active_host()
+    console.print('[bold]Hosts:[/bold]')
+    for name, profile in hosts.items():
+      marker = ' (active)' if name == active else ''
+      if profile.get('mode') == 'ssh':
+        target = f'{profile.get("user")}@{profile.get("host")}'
+        console.print(f'- {name}: ssh {target} key={profile.get("key_name")}{marker}')
+      else:
+        console.print(f'- {name}: local{marker}')
+  elif cmd == 'add':
+    if len(parts) < 4:
+      console.print('[yellow]Usage: config host add <name>[/yellow]')
+      return
+    name = parts[3]
+    mode = Prompt.ask('Mode', choices=['local', 'ssh'], default='ssh')
+    if mode == 'ssh':
+      keys = ssh_key_manager.list_keys()
+      if not keys:
+        console.print("[red]No SSH keys found. Add one with 'keys add' first.[/red]")
+        return
+      host = Prompt.ask('SSH Host')
+      user = Prompt.ask('SSH User')
+      key_name = Prompt.ask('SSH Key Name', choices=keys)
+      config_manager.add_host(name, mode, host, user, key_name)
+    else:
+      config_manager.add_host(name, mode)
+    # The pooled 'default' client is connected to the active host, so redefining that host drops it too
+    if name == config_manager.get_active_host():
+      reset_docker_client(forget_api_version=True)
+    else:
+      reset_docker_client(name, forget_api_version=True)
+    console.print(f"[green]Host '{name}' saved.[/green]")
+  elif cmd == 'remove':
+    if len(parts) < 4:
+      console.print('[yellow]Usage: config host remove <name>[/yellow]')
+      return
+    name = parts[3]
+    was_active = name == config_manager.get_active_host()
+    if config_manager.remove_host(name):
+      # Removing the active host falls back to the default profile: drop the pooled 'default' client as well
+      reset_docker_client(None if was_active else name)
+      console.print(f"[green]Host '{name}' removed.[/green]")
+    else:
+      console.print(f"[red]Host '{name}' not found.[/red]")
+
+
+def handle_group_command(parts):
+  if len(parts) < 3:
+    console.print('[yellow]Usage: config group [list|set <name> <host1,host2...>|remove <name>][/yellow]')
+    return
+
+  cmd = parts[2]
+  if cmd == 'list':
+    groups = config_manager.get_groups()
+    if not groups:
+      console.print('No host groups configured.')
+      return
+    console.print('[bold]Host Groups:[/bold]')
+    for name, members in groups.items():
+      console.print(f'- {name}: {", ".join(members)}')
+  elif cmd == 'set':
+    if len(parts) < 5:
+      console.print('[yellow]Usage: config group set <name> <host1,host2...>[/yellow]')
+      return
+    members = [h.strip() for h in ','.join(parts[4:]).split(',') if h.strip()]
+    try:
+      config_manager.set_group(parts[3], members)
+    except ValueError as e:
+      console.print(f'[red]{e}[/red]')
+      return
+    console.print(f"[green]Group '{parts[3]}' saved.[/green]")
+  elif cmd == 'remove':
+    if len(parts) < 4:
+      console.print('[yellow]Usage: config group remove <name>[/yellow]')
+      return
+    if config_manager.remove_group(parts[3]):
+      console.print(f"[green]Group '{parts[3]}' removed.[/green]")
+    else:
+      console.print(f"[red]Group '{parts[3]}' not found.[/red]")
 
 
 def handle_keys_command(user_input):
@@ -231,6 +369,244 @@ def handle_permissions_command(user_input):
       console.print('[green]Permissions configuration reset.[/green]')
 
 
+def handle_alerts_command(user_input):
+  parts = user_input.split()
+  if len(parts) < 2:
+    console.print('[yellow]Usage: alerts [start|stop|status|rules|recent][/yellow]')
+    return
+
+  cmd = parts[1]
+  watcher = get_events_watcher()
+  if cmd == 'start':
+    if watcher.start():
+      console.print('[green]Events watcher started.[/green]')
+    else:
+      console.print('Events watcher is already running.')
+  elif cmd == 'stop':
+    watcher.stop()
+    console.print('[green]Events watcher stopped.[/green]')
+  elif cmd == 'status':
+    # The stream may also be held open for /metrics; alerting is what this command controls
+    state = 'running' if watcher.running and watcher.alerting else 'stopped'
+    rules = len(watcher.engine.rules)
+    console.print(f'Events watcher: {state} ({rules} rules, {len(watcher.recent_alerts)} recent alerts)')
+  elif cmd == 'rules':
+    console.print('[bold]Alert Rules:[/bold]')
+    for rule in AlertRulesConfig().load_rules():
+      extra = ''
+      if rule.get('count'):
+        extra = f' x{rule["count"]} in {rule.get("window_minutes", 5)}m'
+      console.print(
+        f'- {rule.get("name")}: {rule.get("event")}{extra} -> {rule.get("action", "notify")} '
+        f'(cooldown {rule.get("cooldown_seconds", 300)}s)'
+      )
+  elif cmd == 'recent':
+    if not watcher.recent_alerts:
+      console.print('No alerts yet.')
+      return
+    for alert in watcher.recent_alerts:
+      when = time.strftime('%H:%M:%S', time.localtime(alert.timestamp))
+      console.print(f'- {when} [{alert.rule.get("name")}] {alert.message}')
+
+
+def handle_stats_command(user_input):
+  parts = user_input.split()
+  if len(parts) < 2:
+    console.print('[yellow]Usage: stats [start|stop|status][/yellow]')
+    return
+
+  cmd = parts[1]
+  if cmd == 'start':
+    if stats_sampler.start():
+      console.print(f'[green]Stats sampler started (every {stats_sampler.interval:g}s).[/green]')
+    else:
+      console.print('Stats sampler is already running.')
+  elif cmd == 'stop':
+    stats_sampler.stop()
+    console.print('[green]Stats sampler stopped.[/green]')
+  elif cmd == 'status':
+    state = 'running' if stats_sampler.running else 'stopped'
+    console.print(f'Stats sampler: {state}, {len(stats_store.containers())} containers tracked')
+    if stats_store.persist_dir:
+      console.print(f'History persisted in {stats_store.persist_dir}')
+    if stats_sampler.last_error:
+      console.print(f'[red]Last error: {stats_sampler.last_error}[/red]')
+
+
+def handle_metrics_command(user_input):
+  parts = user_input.split()
+  if len(parts) < 2:
+    console.print('[yellow]Usage: metrics [start [port]|stop|status][/yellow]')
+    return
+
+  cmd = parts[1]
+  if cmd == 'start':
+    port = parts[2] if len(parts) > 2 else None
+    try:
+      if not start_metrics_endpoint(port=port):
+        console.print('Metrics endpoint is already running.')
+        return
+    except (OSError, ValueError) as e:
+      console.print(f'[red]Could not start metrics endpoint: {e}[/red]')
+      return
+    host, bound_port = metrics_server.address
+    console.print(f'[green]Serving Prometheus metrics on http://{host}:{bound_port}/metrics[/green]')
+  elif cmd == 'stop':
+    stop_metrics_endpoint()
+    console.print('[green]Metrics endpoint stopped.[/green]')
+  elif cmd == 'status':
+    if metrics_server.running:
+      host, bound_port = metrics_server.address
+      console.print(f'Metrics endpoint: http://{host}:{bound_port}/metrics')
+    else:
+      console.print('Metrics endpoint: stopped')
+
+
+def handle_jobs_command(user_input):
+  parts = user_input.split()
+  if len(parts) >= 3 and parts[1] == 'cancel':
+    if agent_queue.cancel(parts[2]):
+      console.print(f'[green]Job {parts[2]} cancelled.[/green]')
+    else:
+      console.print(f'[red]Job {parts[2]} not found.[/red]')
+    return
+  if len(parts) > 1 and parts[1] != 'list':
+    console.print('[yellow]Usage: jobs [list|cancel <id>][/yellow]')
+    return
+
+  current = agent_queue.current
+  pending = agent_queue.pending()
+  if current is None and not pending:
+    console.print('No agent jobs running or waiting.')
+    return
+  for job in ([current] if current else []) + pending:
+    kind = 'interactive' if job.priority == INTERACTIVE else 'background'
+    merged = f', {len(job.prompts)} merged' if len(job.prompts) > 1 else ''
+    console.print(f'- {job.id} [{job.status}] {kind}{merged}: {job.prompts[0][:80]}')
+
+
+def handle_diagnostics_command(user_input):
+  parts = user_input.split()
+  if len(parts) > 1 and parts[1] == 'clear':
+    response_cache.invalidate()
+    query_cache.invalidate()
+    console.print('[green]Tool response and query caches cleared.[/green]')
+    return
+
+  stats = response_cache.stats()
+  state = f'TTL {stats["ttl"]:g}s' if response_cache.enabled else 'disabled'
+  console.print(f'Tool response cache: {state}, {stats["entries"]} entries')
+  console.print(
+    f'  hits: {stats["hits"]}, misses: {stats["misses"]}, hit rate: {stats["hit_rate"]:.0%}, '
+    f'invalidations: {stats["invalidations"]}'
+  )
+  queries = query_cache.stats()
+  if queries['enabled']:
+    console.print(f'Query cache: {queries["entries"]} plans, hits: {queries["hits"]}, misses: {queries["misses"]}')
+  else:
+    console.print('Query cache: disabled (set DEVPY_QUERY_CACHE=1)')
+  if tool_selection_enabled:
+    selection = tool_selector.stats()
+    console.print(
+      f'Tool selection: {selection["narrowed_turns"]}/{selection["turns"]} turns narrowed, '
+      f'{selection["fallbacks"]} fallbacks, ~{selection["tokens_saved"]} schema tokens saved (logs/tool_selection.log)'
+    )
+  else:
+    console.print('Tool selection: disabled (DEVPY_TOOL_SELECTION=0)')
+  console.print('LLM providers:')
+  for position, (name, stats) in enumerate(llm.provider_stats().items(), start=1):
+    console.print(
+      f'  {position}. {name}: {stats["calls"]} calls, {stats["error_rate"]:.0%} errors, '
+      f'p50 {stats["p50"]:.2f}s, p95 {stats["p95"]:.2f}s'
+    )
+  if any(PROVIDER_MODULES.get(name) == 'ollama' for name in llm.provider_stats()):
+    from llm.ollama import runtime
+
+    ollama = runtime.stats()
+    state = 'loaded' if ollama['loaded'] else f'not loaded ({ollama["last_error"] or "warming up"})'
+    console.print(f'Ollama {ollama["model"]}: {state}')
+    if ollama['load_ms'] is not None:
+      console.print(f'  model load: {ollama["load_ms"]:.0f} ms, last warm-up call: {ollama["warm_up_ms"]:.0f} ms')
+    if ollama['generations']:
+      console.print(
+        f'  {ollama["generations"]} generations, avg {ollama["avg_generation_ms"]:.0f} ms '
+        f'(last {ollama["last_generation_ms"]:.0f} ms), avg queue wait {ollama["avg_wait_ms"]:.0f} ms'
+      )
+    console.print(f'  in flight: {ollama["in_flight"]}/{ollama["max_parallel"]}')
+
+
+def handle_profile_command(user_input):
+  parts = user_input.split()
+  cmd = parts[1] if len(parts) > 1 else 'status'
+  if cmd == 'on':
+    turn_profiler.enabled = True
+    console.print(f'[green]Profiling agent turns; reports go to {turn_profiler.log_dir}/.[/green]')
+  elif cmd == 'off':
+    turn_profiler.enabled = False
+    console.print('[green]Profiling off.[/green]')
+  elif cmd == 'status':
+    console.print(f'Profiling: {"on" if turn_profiler.enabled else "off"} ({turn_profiler.runs} profiled runs)')
+    report = turn_profiler.last_report
+    if report is not None:
+      console.print(f'Last report: {report.pstats_path or "-"}, {report.collapsed_path}')
+  else:
+    console.print('[yellow]Usage: profile [on|off|status][/yellow]')
+
+
+def handle_record_command(user_input):
+  parts = user_input.split()
+  cmd = parts[1] if len(parts) > 1 else 'status'
+  if cmd == 'start' and len(parts) <= 3:
+    path = parts[2] if len(parts) == 3 else os.path.join('logs', f'session-{time.strftime("%Y%m%d-%H%M%S")}.json')
+    session_recorder.start(path, dry_run=permission_manager.dry_run)
+    console.print(f'[green]Recording agent turns to {path}; replay with `devpy-cli replay {path}`.[/green]')
+    console.print(f'[bold yellow]{RECORDING_WARNING}[/bold yellow]')
+  elif cmd == 'stop' and len(parts) == 2:
+    path = session_recorder.stop()
+    if path is None:
+      console.print('[yellow]Not recording.[/yellow]')
+    else:
+      console.print(f'[green]Recording saved to {path} ({len(session_recorder.data["turns"])} turns).[/green]')
+  elif cmd == 'status' and len(parts) <= 2:
+    if session_recorder.active:
+      console.print(f'Recording to {session_recorder.path} ({len(session_recorder.data["turns"])} turns so far)')
+    else:
+      console.print('Not recording')
+  else:
+    console.print('[yellow]Usage: record [start [file]|stop|status][/yellow]')
+
+
+def handle_dashboard_command(user_input):
+  parts = user_input.split()
+  if len(parts) > 2 or (len(parts) == 2 and parts[1] != 'help'):
+    console.print('[yellow]Usage: dashboard[/yellow]')
+    return
+  if len(parts) == 2:
+    console.print('Live view of containers, health, CPU/memory and recent events; no LLM calls. Ctrl+C to exit.')
+    return
+  try:
+    dashboard = Dashboard(
+      get_docker_client, stats_sampler, get_events_watcher(), console, host=config_manager.get_active_host() or ''
+    )
+    dashboard.run()
+  except Exception as e:
+    console.print(f'[red]Dashboard error: {e}[/red]')
+    return
+  console.print(f'[dim]Dashboard closed ({dashboard.frames} frames drawn).[/dim]')
+
+
+COMMAND_HANDLERS = {
+  'alerts': handle_alerts_command,
+  'stats': handle_stats_command,
+  'metrics': handle_metrics_command,
+  'jobs': handle_jobs_command,
+  'diagnostics': handle_diagnostics_command,
+  'profile': handle_profile_command,
+  'record': handle_record_command,
+  'dashboard': handle_dashboard_command,
+}
+
+
 def run_cli():
   console.print(Markdown('# DevPy CLI'))
   console.print(f'[dim]Version {get_cli_version()}[/dim]\n')
@@ -263,7 +639,12 @@ def run_cli():
         handle_permissions_command(user_input)
         continue
 
-      run_agent_flow(user_input)
+      handler = COMMAND_HANDLERS.get(local_command(user_input))
+      if handler:
+        handler(user_input)
+        continue
+
+      submit_agent_request(user_input)
     except KeyboardInterrupt:
       console.print('\n[bold green]Goodbye[/bold green]')
       break
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from collections import deque
+from docker.utils.build import exclude_paths
+
+from container_copy import tar_info, tar_stream
+
+
+def read_dockerignore(root):
+  """Patterns from root/.dockerignore, parsed the way docker-py's own build does."""
+  path = os.path.join(root, '.dockerignore')
+  if not os.path.exists(path):
+    return []
+  with open(path, encoding='utf-8') as f:
+    return [line.strip() for line in f.read().splitlines() if line.strip() and not line.strip().startswith('#')]
+
+
+class BuildContext:
+  """The files of a build directory that `.dockerignore` lets through, hashed and streamed as a tar."""
+
+  def __init__(self, path, dockerfile='Dockerfile'):
+    self.root = os.path.abspath(path)
+    if not os.path.isdir(self.root):
+      raise NotADirectoryError(f'{path} is not a directory')
+    if not os.path.isfile(os.path.join(self.root, dockerfile)):
+      raise FileNotFoundError(f'{dockerfile} not found in {path}')
+    self.dockerfile = dockerfile
+    self.paths = sorted(exclude_paths(self.root, read_dockerignore(self.root), dockerfile))
+    self.entries = []
+    for relative in self.paths:
+      info = tar_info(os.path.join(self.root, relative), relative.replace(os.sep, '/'))
+      if info is not None:
+        self.entries.append((os.path.join(self.root, relative), info))
+
+  @property
+  def size(self):
+    return sum(info.size for _, info in self.entries)
+
+  def digest(self, known=None):
+    """Hashes the context; returns (digest, file hashes).
+
+    `known` maps relative paths to [size, mtime_ns, sha256] from a previous run; files
+    whose size and mtime are unchanged reuse that hash instead of being read again.
+    """
+    known = known or {}
+    hashes = {}
+    overall = hashlib.sha256()
+    for path, info in self.entries:
+      st = os.lstat(path)
+      if info.isfile():
+        previous = known.get(info.name)
+        if previous and previous[0] == st.st_size and previous[1] == st.st_mtime_ns:
+          file_hash = previous[2]
+        else:
+          digest = hashlib.sha256()
+          with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+              digest.update(block)
+          file_hash = digest.hexdigest()
+        hashes[info.name] = [st.st_size, st.st_mtime_ns, file_hash]
+      else:
+        file_hash = info.linkname
+      overall.update(f'{info.name}\0{info.type.decode()}\0{info.mode:o}\0{file_hash}\n'.encode('utf-8'))
+    return overall.hexdigest(), hashes
+
+  def stream(self, compress=True):
+    """Yields the context as a tar archive, gzip-compressed when `compress`, without writing it anywhere."""
+    chunks = tar_stream(self.entries, [])
+    if not compress:
+      yield from chunks
+      return
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+      data = compressor.compress(chunk)
+      if data:
+        yield data
+    yield compressor.flush()
+
+
+def build_key(context_digest, dockerfile, buildargs=None, target=None):
+  """Identifies a build: the same context built the same way yields the same image."""
+  spec = {'context': context_digest, 'dockerfile': dockerfile, 'buildargs': buildargs or {}, 'target': target or ''}
+  return hashlib.sha256(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class BuildManifest:
+  """Remembers, per host and tag, the build key and image ID of the last successful build.
+
+  Also keeps the per-file hashes of each context directory so the next digest only
+  re-reads files whose size or mtime changed. Stored in `build_manifest.json`.
+  """
+
+  def __init__(self, cache_file='build_manifest.json'):
+    self.cache_file = cache_file
+    self._lock = threading.Lock()
+    self._data = self._load()
+
+  def _load(self):
+    if not self.cache_file or not os.path.exists(self.cache_file):
+      return {'builds': {}, 'contexts': {}}
+    try:
+      with open(self.cache_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    except (json.JSONDecodeError, OSError):
+      return {'builds': {}, 'contexts': {}}
+    data.setdefault('builds', {})
+    data.setdefault('contexts', {})
+    return data
+
+  def _save(self):
+    if not self.cache_file:
+      return
+    try:
+      with open(self.cache_file, 'w', encoding='utf-8') as f:
+        json.dump(self._data, f, indent=2)
+    except OSError:
+      pass
+
+  def file_hashes(self, root):
+    with self._lock:
+      return dict(self._data['contexts'].get(root, {}))
+
+  def last_build(self, host, tag):
+    with self._lock:
+      return self._data['builds'].get(f'{host}|{tag}')
+
+  def record(self, host, tag, key, image_id, root, hashes):
+    with self._lock:
+      self._data['builds'][f'{host}|{tag}'] = {'key': key, 'image_id': image_id, 'built_at': time.time()}
+      self._data['contexts'][root] = hashes
+      self._save()
+
+
+def run_build(api, context, tag, buildargs=None, cache_from=None, target=None, pull=False, on_output=None):
+  """Streams the context to the daemon and the build output back; returns (image_id, last output lines).
+
+  Raises RuntimeError with the daemon's message when the build fails.
+  """
+  stream = api.build(
+    fileobj=context.stream(),
+    custom_context=True,
+    encoding='gzip',
+    tag=tag,
+    dockerfile=context.dockerfile,
+    buildargs=buildargs or None,
+    cache_from=cache_from or None,
+    target=target or None,
+    pull=pull,
+    rm=True,
+    decode=True,
+  )
+  image_id = None
+  output = deque(maxlen=50)
+  for event in stream:
+    if 'error' in event:
+      raise RuntimeError(event['error'].strip())
+    # Pull progress bars carry progressDetail; only their final status lines are worth showing
+    text = event.get('stream') or ('' if event.get('progressDetail') else event.get('status', ''))
+    if event.get('aux', {}).get('ID'):
+      image_id = event['aux']['ID']
+    for line in text.splitlines():
+      if line.strip():
+        output.append(line.rstrip())
+        if on_output is not None:
+          on_output(line.rstrip())
+  return image_id, list(output)
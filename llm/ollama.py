@@ -1,4 +1,8 @@
+import json
 import os
+import threading
+import time
+import urllib.request
 from langchain_openai import ChatOpenAI
 
 
@@ -12,8 +16,144 @@ def _get_base_url() -> str:
   return 'http://localhost:11434/v1'
 
 
-llm = ChatOpenAI(
-  model=os.getenv('OLLAMA_MODEL', 'llama3.1:8b'),
+class OllamaRuntime:
+  """Keeps a local Ollama model loaded and bounds concurrent generations.
+
+  warm_up() loads the model through the native /api/generate endpoint with an empty
+  prompt, and a background ping repeats it every `ping_interval` seconds so the model
+  stays resident (chat requests over /v1 reset Ollama's keep-alive to the server
+  default). Generations go through `generation()`, which allows at most
+  `max_parallel` at once and records queue wait and generation times.
+  """
+
+  def __init__(self, model, base_url, keep_alive=None, ping_interval=None, max_parallel=None):
+    if keep_alive is None:
+      keep_alive = os.getenv('OLLAMA_KEEP_ALIVE', '30m')
+    if ping_interval is None:
+      ping_interval = float(os.getenv('OLLAMA_PING_INTERVAL', '240'))
+    if max_parallel is None:
+      max_parallel = int(os.getenv('OLLAMA_MAX_PARALLEL', '1'))
+    self.model = model
+    self.api_url = base_url[: -len('/v1')] if base_url.endswith('/v1') else base_url
+    self.keep_alive = keep_alive
+    self.ping_interval = ping_interval
+    self.max_parallel = max_parallel
+    self.loaded = False
+    self.last_error = None
+    self.load_ms = None
+    self.warm_up_ms = None
+    self.generations = 0
+    self.generation_ms = 0.0
+    self.last_generation_ms = None
+    self.wait_ms = 0.0
+    self.in_flight = 0
+    self._semaphore = threading.BoundedSemaphore(max_parallel)
+    self._lock = threading.Lock()
+    self._stop = threading.Event()
+    self._thread = None
+
+  def warm_up(self, timeout=300):
+    body = json.dumps({'model': self.model, 'prompt': '', 'keep_alive': self.keep_alive}).encode('utf-8')
+    request = urllib.request.Request(
+      f'{self.api_url}/api/generate', data=body, headers={'Content-Type': 'application/json'}
+    )
+    started = time.monotonic()
+    try:
+      with urllib.request.urlopen(request, timeout=timeout) as response:
+        payload = json.loads(response.read().decode('utf-8') or '{}')
+    except Exception as e:
+      self.loaded = False
+      self.last_error = str(e)
+      return False
+    self.warm_up_ms = (time.monotonic() - started) * 1000
+    # Ollama reports durations in nanoseconds; a model already in memory loads in ~0
+    self.load_ms = payload.get('load_duration', 0) / 1e6
+    self.loaded = True
+    self.last_error = None
+    return True
+
+  def start(self):
+    """Warms the model up in the background, then keeps pinging it until stop()."""
+    if self._thread is not None and self._thread.is_alive():
+      return False
+    self._stop.clear()
+    self._thread = threading.Thread(target=self._run, name='ollama-keepalive', daemon=True)
+    self._thread.start()
+    return True
+
+  def stop(self):
+    self._stop.set()
+
+  def _run(self):
+    while not self._stop.is_set():
+      self.warm_up()
+      if self.ping_interval <= 0:
+        return
+      self._stop.wait(self.ping_interval)
+
+  def generation(self):
+    return _Generation(self)
+
+  def stats(self):
+    with self._lock:
+      return {
+        'model': self.model,
+        'loaded': self.loaded,
+        'load_ms': self.load_ms,
+        'warm_up_ms': self.warm_up_ms,
+        'last_error': self.last_error,
+        'generations': self.generations,
+        'avg_generation_ms': self.generation_ms / self.generations if self.generations else None,
+        'last_generation_ms': self.last_generation_ms,
+        'avg_wait_ms': self.wait_ms / self.generations if self.generations else None,
+        'in_flight': self.in_flight,
+        'max_parallel': self.max_parallel,
+      }
+
+
+class _Generation:
+  def __init__(self, runtime):
+    self.runtime = runtime
+
+  def __enter__(self):
+    queued = time.monotonic()
+    self.runtime._semaphore.acquire()
+    self.started = time.monotonic()
+    self.waited = (self.started - queued) * 1000
+    with self.runtime._lock:
+      self.runtime.in_flight += 1
+    return self
+
+  def __exit__(self, exc_type, exc, tb):
+    elapsed = (time.monotonic() - self.started) * 1000
+    runtime = self.runtime
+    with runtime._lock:
+      runtime.in_flight -= 1
+      runtime.generations += 1
+      runtime.generation_ms += elapsed
+      runtime.last_generation_ms = elapsed
+      runtime.wait_ms += self.waited
+    runtime._semaphore.release()
+    return False
+
+
+class OllamaChat(ChatOpenAI):
+  """ChatOpenAI against Ollama's OpenAI-compatible API, gated by the shared OllamaRuntime."""
+
+  def _generate(self, *args, **kwargs):
+    with runtime.generation():
+      return super()._generate(*args, **kwargs)
+
+  def _stream(self, *args, **kwargs):
+    with runtime.generation():
+      yield from super()._stream(*args, **kwargs)
+
+
+_model = os.getenv('OLLAMA_MODEL', 'llama3.1:8b')
+runtime = OllamaRuntime(_model, _get_base_url())
+
+llm = OllamaChat(
+  model=_model,
   api_key=os.getenv('OPENAI_API_KEY', 'ollama'),
   base_url=_get_base_url(),
   max_tokens=1500,
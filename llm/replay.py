@@ -0,0 +1,58 @@
+import threading
+import time
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+
+class ReplayChatModel(BaseChatModel):
+  """Chat model that answers with the responses of a recorded session, in order (see session_recorder).
+
+  Tools are bound as a no-op: the recorded responses already carry the tool calls. With
+  `realtime` each answer waits as long as the recorded call took.
+  """
+
+  realtime: bool = False
+  _responses: list = PrivateAttr(default_factory=list)
+  _calls: list = PrivateAttr(default_factory=list)
+  _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+  @property
+  def _llm_type(self):
+    return 'replay'
+
+  def load(self, events):
+    """Queues the `llm` events of one recorded turn and forgets the timings of the previous one."""
+    with self._lock:
+      self._responses = list(events)
+      self._calls = []
+
+  @property
+  def calls(self):
+    """(start, end) monotonic times of the calls answered since the last load."""
+    with self._lock:
+      return list(self._calls)
+
+  def bind_tools(self, tools, **kwargs):
+    return self
+
+  def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+    started = time.monotonic()
+    with self._lock:
+      event = self._responses.pop(0) if self._responses else None
+    try:
+      if event is None:
+        raise RuntimeError('The recording has no more LLM responses for this turn')
+      if self.realtime:
+        time.sleep(event.get('duration_ms', 0) / 1000)
+      if event.get('error'):
+        raise RuntimeError(event['error'])
+      message = messages_from_dict([event['response']])[0]
+      return ChatResult(generations=[ChatGeneration(message=message)], llm_output={'provider': 'replay'})
+    finally:
+      with self._lock:
+        self._calls.append((started, time.monotonic()))
+
+
+llm = ReplayChatModel()
@@ -0,0 +1,201 @@
+import importlib
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import ConfigDict
+
+from stats_store import percentile
+
+
+# LLM / LLM_PROVIDERS names and the llm/ module defining each provider's `llm`
+PROVIDER_MODULES = {
+  'chatgpt': 'chatgpt',
+  'openai': 'chatgpt',
+  'deepseek': 'deepseek',
+  'anthropic': 'claude',
+  'claude': 'claude',
+  'google': 'google',
+  'gemini': 'google',
+  'ollama': 'ollama',
+  'openwebui': 'ollama',
+  # Answers from a session recording; set by `devpy-cli replay`
+  'replay': 'replay',
+}
+
+# Calls abandoned after a timeout or lost hedge keep running here until they return
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='llm')
+
+
+class ProviderStats:
+  """Rolling latency and error window per provider, shared by a router and its tool-bound copies."""
+
+  def __init__(self, window=50):
+    self.window = window
+    self._samples = {}
+    self._lock = threading.Lock()
+
+  def record(self, name, latency, ok):
+    with self._lock:
+      self._samples.setdefault(name, deque(maxlen=self.window)).append((latency, ok))
+
+  def snapshot(self, name):
+    with self._lock:
+      samples = list(self._samples.get(name, ()))
+    latencies = [latency for latency, ok in samples if ok]
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+      'calls': len(samples),
+      'errors': errors,
+      'error_rate': errors / len(samples) if samples else 0.0,
+      'p50': percentile(latencies, 50),
+      'p95': percentile(latencies, 95),
+    }
+
+
+class LLMRouter(BaseChatModel):
+  """Chat model that spreads calls over several configured providers.
+
+  Each attempt has a timeout; a failed or timed-out provider is retried with
+  exponential backoff and then the next provider is tried. With `hedge_after` set, a
+  call still running after that many seconds is raced against the next provider and
+  the first answer wins. Providers failing more than half of their recent calls are
+  tried last; with routing='latency' the healthy ones are ordered by p50 latency
+  instead of the configured order.
+  """
+
+  model_config = ConfigDict(arbitrary_types_allowed=True)
+
+  providers: list[tuple[str, Any]]
+  timeout: float = 60.0
+  retries: int = 1
+  backoff: float = 0.5
+  hedge_after: float = 0.0
+  routing: str = 'ordered'
+  stats: Optional[ProviderStats] = None
+
+  def __init__(self, **kwargs):
+    super().__init__(**kwargs)
+    if self.stats is None:
+      self.stats = ProviderStats()
+
+  @property
+  def _llm_type(self):
+    return 'devpy-router'
+
+  def bind_tools(self, tools, **kwargs):
+    bound = [(name, model.bind_tools(tools, **kwargs)) for name, model in self.providers]
+    return self.model_copy(update={'providers': bound})
+
+  def ordered_providers(self):
+    def unhealthy(item):
+      snapshot = self.stats.snapshot(item[0])
+      return snapshot['calls'] >= 3 and snapshot['error_rate'] > 0.5
+
+    providers = list(self.providers)
+    if self.routing == 'latency':
+      providers.sort(key=lambda item: self.stats.snapshot(item[0])['p50'])
+    return sorted(providers, key=unhealthy)
+
+  def provider_stats(self):
+    return {name: self.stats.snapshot(name) for name, _ in self.providers}
+
+  def _submit(self, name, model, messages, stop, kwargs, deadline):
+    def call():
+      started = time.monotonic()
+      try:
+        result = model.invoke(messages, stop=stop, **kwargs)
+      except Exception:
+        self.stats.record(name, time.monotonic() - started, False)
+        raise
+      # An answer arriving after the caller gave up counts as a failure of the provider
+      self.stats.record(name, time.monotonic() - started, time.monotonic() <= deadline)
+      return result
+
+    return _executor.submit(call)
+
+  def _attempt(self, candidates, index, messages, stop, kwargs):
+    started = time.monotonic()
+    deadline = started + self.timeout
+    name, model = candidates[index]
+    futures = {self._submit(name, model, messages, stop, kwargs, deadline): name}
+    hedged = not self.hedge_after or index + 1 >= len(candidates)
+    error = None
+    while futures:
+      now = time.monotonic()
+      if now >= deadline:
+        raise TimeoutError(f'no answer within {self.timeout:g}s')
+      wait_for = deadline - now if hedged else max(started + self.hedge_after - now, 0)
+      done, _ = wait(futures, timeout=wait_for, return_when=FIRST_COMPLETED)
+      for future in done:
+        winner = futures.pop(future)
+        try:
+          return winner, future.result()
+        except Exception as e:
+          error = e
+      if not hedged and (not done or not futures):
+        hedge_name, hedge_model = candidates[index + 1]
+        futures[self._submit(hedge_name, hedge_model, messages, stop, kwargs, deadline)] = hedge_name
+        hedged = True
+    raise error
+
+  def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+    errors = []
+    candidates = self.ordered_providers()
+    for index, (name, _) in enumerate(candidates):
+      for attempt in range(self.retries + 1):
+        if attempt:
+          time.sleep(self.backoff * 2 ** (attempt - 1))
+        try:
+          winner, message = self._attempt(candidates, index, messages, stop, kwargs)
+        except Exception as e:
+          errors.append(f'{name}: {e}')
+          continue
+        return ChatResult(generations=[ChatGeneration(message=message)], llm_output={'provider': winner})
+    raise RuntimeError('All LLM providers failed: ' + '; '.join(errors))
+
+
+def load_provider(name):
+  module = PROVIDER_MODULES.get(name)
+  if module is None:
+    raise ValueError(f'Unknown LLM provider: {name}')
+  provider = importlib.import_module(f'llm.{module}')
+  # Local backends expose a runtime that preloads the model and keeps it resident
+  runtime = getattr(provider, 'runtime', None)
+  if runtime is not None and os.getenv('LLM_WARMUP', '1').lower() not in {'0', 'false', 'no', 'n'}:
+    runtime.start()
+  return provider.llm
+
+
+def build_router():
+  """Builds the router from LLM_PROVIDERS (comma-separated, in order of preference), or LLM alone."""
+  names = [n.strip() for n in os.getenv('LLM_PROVIDERS', '').split(',') if n.strip()]
+  if not names:
+    names = [os.getenv('LLM') or 'chatgpt']
+    if names[0] not in PROVIDER_MODULES:
+      names = ['chatgpt']
+  providers = []
+  for name in names:
+    try:
+      providers.append((name, load_provider(name)))
+    except Exception as e:
+      if len(names) == 1:
+        raise
+      print(f'LLM provider {name} unavailable: {e}', file=sys.stderr)
+  if not providers:
+    raise ValueError('None of the LLM_PROVIDERS could be loaded')
+  return LLMRouter(
+    providers=providers,
+    timeout=float(os.getenv('LLM_TIMEOUT', '60')),
+    retries=int(os.getenv('LLM_RETRIES', '1')),
+    backoff=float(os.getenv('LLM_BACKOFF', '0.5')),
+    hedge_after=float(os.getenv('LLM_HEDGE_AFTER', '0')),
+    routing=os.getenv('LLM_ROUTING', 'ordered'),
+    stats=ProviderStats(int(os.getenv('LLM_STATS_WINDOW', '50'))),
+  )
@@ -0,0 +1,136 @@
+import gzip
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+
+_RELATIVE_TIME = re.compile(r'^(\d+(?:\.\d+)?)([smhd])$')
+_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+# Enough of a line to hold the RFC 3339 timestamp docker prepends with timestamps=True
+_HEAD_BYTES = 64
+
+
+def parse_time(value, now=None):
+  """Parses '30m'/'2h'/'1d' (ago), a unix epoch or an ISO 8601 timestamp into an aware UTC datetime."""
+  if value is None or str(value).strip() == '':
+    return None
+  value = str(value).strip()
+  now = now or datetime.now(timezone.utc)
+  match = _RELATIVE_TIME.match(value)
+  if match:
+    return now - timedelta(seconds=float(match.group(1)) * _UNITS[match.group(2)])
+  try:
+    return datetime.fromtimestamp(float(value), timezone.utc)
+  except ValueError:
+    pass
+  try:
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+  except ValueError:
+    raise ValueError(f'Invalid time: {value} (use e.g. 30m, 2h, 1d, a unix timestamp or ISO 8601)') from None
+  if parsed.tzinfo is None:
+    parsed = parsed.astimezone()
+  return parsed.astimezone(timezone.utc)
+
+
+def _safe_filename(name):
+  return re.sub(r'[^A-Za-z0-9_.-]', '_', name) or 'container'
+
+
+class _LineScanner:
+  """Counts lines and remembers the first and last timestamps of a chunked log stream.
+
+  Only the head of the current line is kept, so memory stays constant however long the
+  lines or the log are.
+  """
+
+  def __init__(self):
+    self.lines = 0
+    self.first = None
+    self.last = None
+    self._head = b''
+    self._pending = False
+
+  def feed(self, chunk):
+    pieces = chunk.split(b'\n')
+    for index, piece in enumerate(pieces):
+      if len(self._head) < _HEAD_BYTES:
+        self._head += piece[: _HEAD_BYTES - len(self._head)]
+      self._pending = self._pending or bool(piece)
+      if index < len(pieces) - 1:
+        self._line()
+
+  def close(self):
+    if self._pending:
+      self._line()
+
+  def _line(self):
+    self.lines += 1
+    timestamp = self._head.split(b' ', 1)[0].decode('utf-8', errors='replace')
+    if timestamp:
+      self.first = self.first or timestamp
+      self.last = timestamp
+    self._head = b''
+    self._pending = False
+
+
+def export_container_logs(client, name, path, since=None, until=None):
+  """Streams one container's logs into a gzip file; returns its manifest entry."""
+  started = time.monotonic()
+  entry = {'container': name, 'file': os.path.basename(path), 'bytes': 0, 'compressed_bytes': 0, 'lines': 0}
+  scanner = _LineScanner()
+  try:
+    container = client.containers.get(name)
+    stream = container.logs(stream=True, follow=False, timestamps=True, since=since, until=until)
+    with gzip.open(path, 'wb', compresslevel=6) as f:
+      for chunk in stream:
+        f.write(chunk)
+        scanner.feed(chunk)
+        entry['bytes'] += len(chunk)
+    entry['error'] = None
+  except Exception as e:
+    # Whatever was streamed before the failure is kept; during an incident partial logs still help
+    entry['error'] = str(e)
+  scanner.close()
+  if os.path.exists(path):
+    entry['compressed_bytes'] = os.path.getsize(path)
+  else:
+    entry['file'] = None
+  entry['lines'] = scanner.lines
+  entry['first_timestamp'] = scanner.first
+  entry['last_timestamp'] = scanner.last
+  entry['duration_ms'] = round((time.monotonic() - started) * 1000, 1)
+  return entry
+
+
+def export_logs(client, names, output_dir, since=None, until=None, workers=None):
+  """Exports the logs of `names` in parallel into output_dir and writes manifest.json; returns the manifest."""
+  if workers is None:
+    workers = int(os.getenv('DEVPY_LOG_EXPORT_WORKERS', '8'))
+  os.makedirs(output_dir, exist_ok=True)
+  started = time.monotonic()
+  paths = {}
+  for name in names:
+    filename = _safe_filename(name)
+    # Distinct files even when two names sanitize to the same string
+    while filename in paths.values():
+      filename += '_'
+    paths[name] = filename
+  with ThreadPoolExecutor(max_workers=max(1, min(workers, len(names) or 1)), thread_name_prefix='log-export') as pool:
+    futures = [
+      pool.submit(export_container_logs, client, name, os.path.join(output_dir, f'{paths[name]}.log.gz'), since, until)
+      for name in names
+    ]
+    entries = [future.result() for future in futures]
+  manifest = {
+    'created_at': datetime.now(timezone.utc).isoformat(),
+    'since': since.isoformat() if since else None,
+    'until': until.isoformat() if until else None,
+    'duration_ms': round((time.monotonic() - started) * 1000, 1),
+    'containers': entries,
+  }
+  with open(os.path.join(output_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+    json.dump(manifest, f, indent=2)
+  return manifest
@@ -0,0 +1,168 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value):
+  return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels):
+  if not labels:
+    return ''
+  return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+
+
+def _number(value):
+  if value == float('inf'):
+    return '+Inf'
+  if float(value).is_integer():
+    return str(int(value))
+  return repr(float(value))
+
+
+class Counter:
+  kind = 'counter'
+
+  def __init__(self, name, documentation):
+    self.name = name
+    self.documentation = documentation
+    self._values = {}
+    self._lock = threading.Lock()
+
+  def inc(self, amount=1, **labels):
+    key = tuple(sorted(labels.items()))
+    with self._lock:
+      self._values[key] = self._values.get(key, 0) + amount
+
+  def samples(self):
+    with self._lock:
+      return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Histogram:
+  kind = 'histogram'
+
+  def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+    self.name = name
+    self.documentation = documentation
+    self.buckets = tuple(buckets) + (float('inf'),)
+    self._series = {}
+    self._lock = threading.Lock()
+
+  def observe(self, value, **labels):
+    key = tuple(sorted(labels.items()))
+    with self._lock:
+      counts, total = self._series.get(key, ([0] * len(self.buckets), 0.0))
+      for i, bound in enumerate(self.buckets):
+        if value <= bound:
+          counts[i] += 1
+      self._series[key] = (counts, total + value)
+
+  def samples(self):
+    out = []
+    with self._lock:
+      for key, (counts, total) in self._series.items():
+        for bound, count in zip(self.buckets, counts):
+          out.append((f'{self.name}_bucket', key + (('le', _number(bound)),), count))
+        out.append((f'{self.name}_sum', key, total))
+        out.append((f'{self.name}_count', key, counts[-1]))
+    return out
+
+
+class MetricsRegistry:
+  """Holds counters and histograms plus collectors that produce gauge families on demand.
+
+  A collector is a callable returning [(name, kind, help, [(labels_dict, value), ...])];
+  they read cached state (e.g. the stats store) so a scrape never triggers Docker calls.
+  """
+
+  def __init__(self):
+    self._metrics = []
+    self._collectors = []
+
+  def counter(self, name, documentation):
+    metric = Counter(name, documentation)
+    self._metrics.append(metric)
+    return metric
+
+  def histogram(self, name, documentation, buckets=DEFAULT_BUCKETS):
+    metric = Histogram(name, documentation, buckets)
+    self._metrics.append(metric)
+    return metric
+
+  def add_collector(self, collector):
+    self._collectors.append(collector)
+
+  def render(self):
+    lines = []
+    for metric in self._metrics:
+      lines.append(f'# HELP {metric.name} {metric.documentation}')
+      lines.append(f'# TYPE {metric.name} {metric.kind}')
+      for name, labels, value in metric.samples():
+        lines.append(f'{name}{_labels(labels)} {_number(value)}')
+    for collector in self._collectors:
+      try:
+        families = collector()
+      except Exception:
+        continue
+      for name, kind, documentation, samples in families:
+        lines.append(f'# HELP {name} {documentation}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in samples:
+          lines.append(f'{name}{_labels(sorted(labels.items()))} {_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+  def do_GET(self):
+    if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+      self.send_error(404)
+      return
+    body = self.server.registry.render().encode('utf-8')
+    self.send_response(200)
+    self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+    self.send_header('Content-Length', str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def log_message(self, format, *args):
+    pass
+
+
+class MetricsServer:
+  """Serves a MetricsRegistry in the Prometheus text exposition format on /metrics."""
+
+  def __init__(self, registry):
+    self.registry = registry
+    self._server = None
+    self._thread = None
+
+  @property
+  def address(self):
+    if self._server is None:
+      return None
+    return self._server.server_address[:2]
+
+  @property
+  def running(self):
+    return self._server is not None
+
+  def start(self, host='127.0.0.1', port=9464):
+    if self._server is not None:
+      return False
+    self._server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    self._server.daemon_threads = True
+    self._server.registry = self.registry
+    self._thread = threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True)
+    self._thread.start()
+    return True
+
+  def stop(self):
+    if self._server is None:
+      return
+    self._server.shutdown()
+    self._server.server_close()
+    self._server = None
@@ -1,7 +1,10 @@
 import os
 import json
 import getpass
+import threading
 import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
 from pathlib import Path
 from permissions_config_manager import PermissionConfigManager
@@ -14,6 +17,12 @@ class PermissionDecision:
   DENY = 'deny'
 
 
+DEFAULT_SESSION = 'default'
+
+# Contextvars (unlike thread-locals) follow tool calls into LangGraph's executor threads
+_current_session = ContextVar('permission_session', default=DEFAULT_SESSION)
+
+
 class PermissionManager:
   def __init__(self, whitelist=None, dry_run=None, user=None, log_file=None):
     env_whitelist = os.getenv('DOCKER_SAFE_COMMANDS')
@@ -51,11 +60,39 @@ class PermissionManager:
     else:
       self.log_file = Path(log_file)
       self.log_file.parent.mkdir(parents=True, exist_ok=True)
-    self.session_approvals = {'session': set(), 'command': set()}
+    self._lock = threading.Lock()
+    self._log_lock = threading.Lock()
+    self._sessions = {DEFAULT_SESSION: {'session': set(), 'command': set()}}
+    # Callables notified with each logged entry (e.g. metrics exporters)
+    self.listeners = []
 
     # Initialize Persistent Config Manager
     self.config_manager = PermissionConfigManager()
 
+  @property
+  def session_approvals(self):
+    """Approvals of the session bound to the current context (see `session`)."""
+    session_id = _current_session.get()
+    with self._lock:
+      if session_id not in self._sessions:
+        self._sessions[session_id] = {'session': set(), 'command': set()}
+      return self._sessions[session_id]
+
+  @contextmanager
+  def session(self, session_id):
+    """Binds session-scoped approvals ('yc'/'ys') to session_id for the enclosed code."""
+    token = _current_session.set(session_id or DEFAULT_SESSION)
+    try:
+      yield
+    finally:
+      _current_session.reset(token)
+
+  def end_session(self, session_id):
+    if session_id == DEFAULT_SESSION:
+      return
+    with self._lock:
+      self._sessions.pop(session_id, None)
+
   def classify_operation(self, operation):
     read_ops = {
       'list_containers',
@@ -65,6 +102,7 @@ class PermissionManager:
       'list_volumes',
       'list_networks',
       'check_resource',
+      'system_df',
     }
     if operation in read_ops:
       return 'read'
@@ -73,10 +111,12 @@ class PermissionManager:
   def needs_confirmation(self, operation, command_key=None):
     if operation in self.whitelist:
       return False
-    if operation in self.session_approvals['session']:
-      return False
-    if command_key and command_key in self.session_approvals['command']:
-      return False
+    approvals = self.session_approvals
+    with self._lock:
+      if operation in approvals['session']:
+        return False
+      if command_key and command_key in approvals['command']:
+        return False
 
     # Check persistent config
     persistent_decision = self.config_manager.get_decision(operation)
@@ -88,12 +128,18 @@ class PermissionManager:
 
   def record_approval_for_command(self, command_key):
     if command_key:
-      self.session_approvals['command'].add(command_key)
+      approvals = self.session_approvals
+      with self._lock:
+        approvals['command'].add(command_key)
 
   def record_approval_for_session(self, operation):
-    self.session_approvals['session'].add(operation)
+    approvals = self.session_approvals
+    with self._lock:
+      approvals['session'].add(operation)
 
-  def log_action(self, operation, args, decision, effective_dry_run, command_preview, impact, duration_ms=0):
+  def log_action(
+    self, operation, args, decision, effective_dry_run, command_preview, impact, duration_ms=0, target=None
+  ):
     entry = {
       'timestamp': datetime.utcnow().isoformat() + 'Z',
       'user': self.user,
@@ -104,12 +150,18 @@ class PermissionManager:
       'command_preview': command_preview,
       'impact': impact,
       'duration_ms': duration_ms,
+      'target': target,
     }
     try:
-      with self.log_file.open('a', encoding='utf-8') as f:
+      with self._log_lock, self.log_file.open('a', encoding='utf-8') as f:
         f.write(json.dumps(entry, ensure_ascii=False) + '\n')
     except Exception:
       pass
+    for listener in self.listeners:
+      try:
+        listener(entry)
+      except Exception:
+        pass
 
   def execute(
     self,
@@ -122,6 +174,7 @@ class PermissionManager:
     command_key=None,
     prompt_func=None,
     decision_override=None,
+    target=None,
   ):
     start_time = time.time()
     if fn_args is None:
@@ -136,7 +189,7 @@ class PermissionManager:
     if persistent_decision == 'deny':
       duration = (time.time() - start_time) * 1000
       self.log_action(
-        operation, args_snapshot, 'denied_by_config', effective_dry_run, command_preview, impact, duration
+        operation, args_snapshot, 'denied_by_config', effective_dry_run, command_preview, impact, duration, target
       )
       return 'Operación denegada por configuración persistente'
 
@@ -151,7 +204,9 @@ class PermissionManager:
 
       if decision == PermissionDecision.DENY:
         duration = (time.time() - start_time) * 1000
-        self.log_action(operation, args_snapshot, 'denied', effective_dry_run, command_preview, impact, duration)
+        self.log_action(
+          operation, args_snapshot, 'denied', effective_dry_run, command_preview, impact, duration, target
+        )
         return 'Operación cancelada por el usuario'
       if decision == PermissionDecision.ALLOW_COMMAND:
         self.record_approval_for_command(command_key)
@@ -160,15 +215,15 @@ class PermissionManager:
 
     if effective_dry_run:
       duration = (time.time() - start_time) * 1000
-      self.log_action(operation, args_snapshot, 'allowed_dry_run', True, command_preview, impact, duration)
+      self.log_action(operation, args_snapshot, 'allowed_dry_run', True, command_preview, impact, duration, target)
       return f'Modo dry-run: se ejecutaría {command_preview}'
 
     try:
       result = fn(*fn_args, **fn_kwargs)
       duration = (time.time() - start_time) * 1000
-      self.log_action(operation, args_snapshot, 'allowed', False, command_preview, impact, duration)
+      self.log_action(operation, args_snapshot, 'allowed', False, command_preview, impact, duration, target)
       return result
     except Exception as e:
       duration = (time.time() - start_time) * 1000
-      self.log_action(operation, args_snapshot, f'error: {str(e)}', False, command_preview, impact, duration)
+      self.log_action(operation, args_snapshot, f'error: {str(e)}', False, command_preview, impact, duration, target)
       raise e
@@ -0,0 +1,164 @@
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+
+# Leaf frames of threads parked in a pool or on a lock; counting them would drown real work
+_IDLE_FILES = ('threading.py', 'queue.py', os.path.join('concurrent', 'futures', 'thread.py'))
+
+
+def _frame_label(frame):
+  code = frame.f_code
+  return f'{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}'
+
+
+class StackSampler:
+  """Samples the Python stacks of every thread at a fixed interval into collapsed-stack counts.
+
+  Unlike cProfile, which only sees the thread that enabled it, this also catches work
+  done on pool threads (LLM calls, Docker requests, prefetch).
+  """
+
+  def __init__(self, interval=0.005):
+    self.interval = interval
+    self.counts = Counter()
+    self.samples = 0
+    self._stop = threading.Event()
+    self._thread = None
+
+  def start(self):
+    self._stop.clear()
+    self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+    self._thread.start()
+
+  def stop(self):
+    self._stop.set()
+    if self._thread is not None:
+      self._thread.join()
+
+  def _run(self):
+    own = threading.get_ident()
+    while not self._stop.wait(self.interval):
+      names = {thread.ident: thread.name for thread in threading.enumerate()}
+      for ident, frame in sys._current_frames().items():
+        if ident == own:
+          continue
+        stack = []
+        while frame is not None:
+          stack.append(_frame_label(frame))
+          frame = frame.f_back
+        stack.append(names.get(ident, str(ident)))
+        self.counts[';'.join(reversed(stack))] += 1
+      self.samples += 1
+
+  def write_collapsed(self, path):
+    """Writes `frame;frame;... count` lines, the input format of flamegraph.pl and speedscope."""
+    with open(path, 'w', encoding='utf-8') as f:
+      for stack, count in self.counts.most_common():
+        f.write(f'{stack} {count}\n')
+
+  def hottest(self, limit=5):
+    """(leaf frame, share of busy samples) for the frames most often on top of a non-idle stack."""
+    leaves = Counter()
+    for stack, count in self.counts.items():
+      leaf = stack.rsplit(';', 1)[-1]
+      if not leaf.startswith(tuple(os.path.basename(f) + ':' for f in _IDLE_FILES)):
+        leaves[re.sub(r':\d+$', '', leaf)] += count
+    busy = sum(leaves.values())
+    return [(leaf, count / busy) for leaf, count in leaves.most_common(limit)] if busy else []
+
+
+class ProfileReport:
+  def __init__(self, label, duration, pstats_path, collapsed_path, stats, sampler):
+    self.label = label
+    self.duration = duration
+    self.pstats_path = pstats_path
+    self.collapsed_path = collapsed_path
+    self.stats = stats
+    self.sampler = sampler
+
+  def summary(self, limit=10):
+    """Terminal-sized hotspot summary: functions by self time, then the hottest sampled frames."""
+    lines = [f'Profile of {self.label}: {self.duration:.2f}s']
+    if self.stats is not None:
+      lines.append(f'Top functions by own time (cProfile, {self.pstats_path}):')
+      rows = sorted(self.stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+      for (filename, line, name), (_, calls, own, cumulative, _) in rows:
+        lines.append(
+          f'  {own * 1000:8.1f} ms own {cumulative * 1000:8.1f} ms cum {calls:7d}x  '
+          f'{os.path.basename(filename)}:{line}({name})'
+        )
+    hottest = self.sampler.hottest(limit=5)
+    if hottest:
+      lines.append(f'Hottest frames across threads ({self.sampler.samples} samples, {self.collapsed_path}):')
+      for leaf, share in hottest:
+        lines.append(f'  {share * 100:5.1f}%  {leaf}')
+    return lines
+
+
+class TurnProfiler:
+  """Profiles agent turns (or startup) with cProfile plus a stack sampler when enabled.
+
+  Each profiled run writes `profile-<label>-<timestamp>-<n>.pstats` and a matching
+  `.collapsed` stack file to log_dir. Only one run is profiled at a time; runs overlapping it go unprofiled.
+  """
+
+  def __init__(self, log_dir='logs', enabled=None, interval=None):
+    if enabled is None:
+      enabled = os.getenv('DEVPY_PROFILE', '').lower() in {'1', 'true', 'yes', 'y'}
+    if interval is None:
+      interval = float(os.getenv('DEVPY_PROFILE_INTERVAL', '0.005'))
+    self.log_dir = log_dir
+    self.enabled = enabled
+    self.interval = interval
+    self.last_report = None
+    self.runs = 0
+    self._busy = threading.Lock()
+
+  @contextmanager
+  def profile(self, label):
+    """Yields a list that holds the ProfileReport once the block has finished (empty if not profiled)."""
+    result = []
+    if not self.enabled or not self._busy.acquire(blocking=False):
+      yield result
+      return
+    profile = cProfile.Profile()
+    sampler = StackSampler(self.interval)
+    try:
+      # A profiler already active in this interpreter (a debugger, or cProfile on 3.12+) keeps cProfile out
+      profile.enable()
+    except ValueError:
+      profile = None
+    sampler.start()
+    started = time.monotonic()
+    try:
+      yield result
+    finally:
+      if profile is not None:
+        profile.disable()
+      sampler.stop()
+      try:
+        result.append(self._write(label, time.monotonic() - started, profile, sampler))
+        self.last_report = result[0]
+      finally:
+        self._busy.release()
+
+  def _write(self, label, duration, profile, sampler):
+    os.makedirs(self.log_dir, exist_ok=True)
+    self.runs += 1
+    base = os.path.join(self.log_dir, f'profile-{label}-{time.strftime("%Y%m%d-%H%M%S")}-{self.runs}')
+    stats = pstats_path = None
+    if profile is not None:
+      pstats_path = f'{base}.pstats'
+      profile.dump_stats(pstats_path)
+      stats = pstats.Stats(profile, stream=io.StringIO())
+    collapsed_path = f'{base}.collapsed'
+    sampler.write_collapsed(collapsed_path)
+    return ProfileReport(label, duration, pstats_path, collapsed_path, stats, sampler)
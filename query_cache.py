@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+
+_FILLER_WORDS = set(
+  'a an the please pls can could would you me us tell show give check what whats is are of for in on my our '
+  'now right currently current'.split()
+)
+
+
+def normalize_query(text):
+  """Lowercases, strips punctuation and filler words so rephrasings of one question share a key."""
+  words = re.findall(r'[a-z0-9_.:/-]+', text.lower())
+  return ' '.join(w.strip('.') for w in words if w.strip('.') and w.strip('.') not in _FILLER_WORDS)
+
+
+# Words that point back at an earlier turn ("restart it", "show its logs", "same for db"); the
+# answer then depends on the conversation, not on the question text the cache is keyed by
+_CONTEXT_WORDS = set(
+  'it its itself they them their theirs this that these those same again also too else other others '
+  'previous earlier above former latter one ones'.split()
+)
+_CONTEXT_OPENERS = re.compile(r'^\s*(and|also|what about|how about)\b', re.IGNORECASE)
+
+
+def refers_to_context(text):
+  """True when the question leans on earlier turns and so cannot be answered from its text alone."""
+  words = re.findall(r"[a-z]+(?:'[a-z]+)?", text.lower())
+  return bool(_CONTEXT_OPENERS.match(text)) or any(w.split("'")[0] in _CONTEXT_WORDS for w in words)
+
+
+def inventory_fingerprint(containers):
+  """Hashes (name, image, state) of every container; any create/remove/start/stop changes it."""
+  rows = sorted(((c.get('Names') or [''])[0].lstrip('/'), c.get('ImageID', ''), c.get('State', '')) for c in containers)
+  return hashlib.sha1(json.dumps(rows).encode('utf-8')).hexdigest()[:16]
+
+
+class QueryCache:
+  """Maps (host, normalized question) to the read-only tool plan that answered it last time.
+
+  An entry is only reused while the host's container inventory fingerprint is the
+  one it was recorded with and it is younger than the TTL. Questions that refer back
+  to the conversation are never cached, since the same words mean different things
+  on different threads. Entries live in `query_cache.json` so they survive restarts.
+  Opt-in with DEVPY_QUERY_CACHE=1.
+  """
+
+  def __init__(self, cache_file='query_cache.json', ttl_seconds=None, enabled=None):
+    if ttl_seconds is None:
+      ttl_seconds = float(os.getenv('DEVPY_QUERY_CACHE_TTL', '3600'))
+    if enabled is None:
+      enabled = os.getenv('DEVPY_QUERY_CACHE', '').lower() in {'1', 'true', 'yes', 'y'}
+    self.cache_file = cache_file
+    self.ttl_seconds = ttl_seconds
+    self.enabled = enabled
+    self.hits = 0
+    self.misses = 0
+    self._lock = threading.Lock()
+    self._entries = self._load() if enabled else {}
+
+  def _load(self):
+    if not self.cache_file or not os.path.exists(self.cache_file):
+      return {}
+    try:
+      with open(self.cache_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+    except (json.JSONDecodeError, OSError):
+      return {}
+
+  def _save(self):
+    if not self.cache_file:
+      return
+    try:
+      with open(self.cache_file, 'w', encoding='utf-8') as f:
+        json.dump(self._entries, f, indent=2)
+    except OSError:
+      pass
+
+  @staticmethod
+  def _key(host, query):
+    return f'{host}|{normalize_query(query)}'
+
+  def cacheable(self, query):
+    return self.enabled and not refers_to_context(query)
+
+  def lookup(self, host, query, fingerprint):
+    if refers_to_context(query):
+      return None
+    key = self._key(host, query)
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is not None and (
+        entry['fingerprint'] != fingerprint or time.time() - entry['cached_at'] > self.ttl_seconds
+      ):
+        del self._entries[key]
+        self._save()
+        entry = None
+      if entry is None:
+        self.misses += 1
+        return None
+      self.hits += 1
+      return entry['plan']
+
+  def store(self, host, query, fingerprint, plan):
+    if refers_to_context(query):
+      return
+    with self._lock:
+      self._entries[self._key(host, query)] = {'fingerprint': fingerprint, 'plan': plan, 'cached_at': time.time()}
+      self._save()
+
+  def invalidate(self, host=None):
+    with self._lock:
+      for key in list(self._entries):
+        if host is None or key.startswith(f'{host}|'):
+          del self._entries[key]
+      self._save()
+
+  def stats(self):
+    with self._lock:
+      return {'enabled': self.enabled, 'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
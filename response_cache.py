@@ -0,0 +1,99 @@
+import json
+import os
+import threading
+import time
+
+
+class ResponseCache:
+  """Short-lived cache of read-only tool results keyed by (host, tool, args).
+
+  Entries may name a target (e.g. a container); invalidate(host, target) drops the
+  entries for that target plus the untargeted ones (listings), which any write may
+  change. Concurrent misses for one key share a single call, and a result whose
+  call overlapped an invalidation is returned but not stored.
+  """
+
+  def __init__(self, ttl=None):
+    if ttl is None:
+      ttl = float(os.getenv('DEVPY_TOOL_CACHE_TTL', '15'))
+    self.ttl = ttl
+    self.hits = 0
+    self.misses = 0
+    self.invalidations = 0
+    self._entries = {}
+    self._inflight = {}
+    self._generation = 0
+    self._lock = threading.Lock()
+
+  @staticmethod
+  def make_key(host, tool, args=None):
+    return (host, tool, json.dumps(args or {}, sort_keys=True, default=str))
+
+  @property
+  def enabled(self):
+    return self.ttl > 0
+
+  def get(self, host, tool, args=None):
+    key = self.make_key(host, tool, args)
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        return None
+      if entry['expires'] <= time.monotonic():
+        del self._entries[key]
+        return None
+      return entry['value']
+
+  def get_or_call(self, host, tool, args, fn, target=None):
+    if not self.enabled:
+      return fn()
+    key = self.make_key(host, tool, args)
+    while True:
+      with self._lock:
+        entry = self._entries.get(key)
+        if entry is not None and entry['expires'] > time.monotonic():
+          self.hits += 1
+          return entry['value']
+        waiter = self._inflight.get(key)
+        if waiter is None:
+          self.misses += 1
+          done = threading.Event()
+          self._inflight[key] = done
+          generation = self._generation
+          break
+      # Another thread is already fetching this key; reuse its result
+      waiter.wait()
+
+    try:
+      value = fn()
+      with self._lock:
+        if generation == self._generation:
+          self._entries[key] = {'value': value, 'target': target, 'expires': time.monotonic() + self.ttl}
+      return value
+    finally:
+      with self._lock:
+        self._inflight.pop(key, None)
+      done.set()
+
+  def invalidate(self, host=None, target=None):
+    """Drops entries of `host` (all hosts if None) for `target` and untargeted ones; everything if no target."""
+    with self._lock:
+      self._generation += 1
+      self.invalidations += 1
+      for key, entry in list(self._entries.items()):
+        if host is not None and key[0] != host:
+          continue
+        if target is None or entry['target'] in (None, target):
+          del self._entries[key]
+
+  def stats(self):
+    with self._lock:
+      lookups = self.hits + self.misses
+      return {
+        'ttl': self.ttl,
+        'entries': len(self._entries),
+        'hits': self.hits,
+        'misses': self.misses,
+        'hit_rate': self.hits / lookups if lookups else 0.0,
+        'invalidations': self.invalidations,
+      }
@@ -0,0 +1,438 @@
+import base64
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import message_to_dict, messages_to_dict
+
+
+FORMAT_VERSION = 1
+# Threads of background components (stats sampler and its pool, events watcher, metrics endpoint, memory
+# monitors); what they send while a turn runs is not part of the turn and would not happen again on replay
+BACKGROUND_THREADS = ('stats', 'docker-events', 'metrics-http', 'memory-monitor')
+RECORDING_WARNING = (
+  'Recordings hold the full LLM prompts and raw Docker API responses, including container environment '
+  'variables and other secrets. The file is readable only by you; do not share it unredacted.'
+)
+# Paths are stored without the /v1.xx prefix so a recording replays whatever API version is negotiated
+_VERSION_PREFIX = re.compile(r'^/v\d+\.\d+')
+
+
+def docker_path(path_url):
+  return _VERSION_PREFIX.sub('', path_url)
+
+
+def _encode_body(data):
+  try:
+    return {'body': data.decode('utf-8')}
+  except UnicodeDecodeError:
+    return {'body_base64': base64.b64encode(data).decode('ascii')}
+
+
+def _decode_body(event):
+  if 'body_base64' in event:
+    return base64.b64decode(event['body_base64'])
+  return event.get('body', '').encode('utf-8')
+
+
+def _elapsed_ms(since):
+  return round((time.monotonic() - since) * 1000, 1)
+
+
+def step_times(calls, total_ms):
+  """Milliseconds spent outside the LLM before each (start_ms, duration_ms) call and after the last one.
+
+  Each step is what the agent did between two model answers: running tools plus its own overhead.
+  """
+  steps, cursor = [], 0.0
+  for start, duration in sorted(calls):
+    steps.append(round(max(start - cursor, 0), 1))
+    cursor = start + duration
+  steps.append(round(max(total_ms - cursor, 0), 1))
+  return steps
+
+
+class SessionRecorder(BaseCallbackHandler):
+  """Records the LLM calls, Docker API exchanges and permission decisions of agent turns to a JSON file.
+
+  Only exchanges made while a turn is running, from threads other than BACKGROUND_THREADS,
+  are kept, and the file is rewritten after each turn, readable by its owner only. Streaming
+  Docker responses (events, followed logs, archives, builds) are passed through untouched and
+  only noted, since reading them whole would change the tool's behaviour.
+  """
+
+  def __init__(self, path=None, dry_run=False):
+    self.path = None
+    self.data = None
+    self._turn = None
+    self._turn_started = None
+    self._llm_started = {}
+    self._lock = threading.Lock()
+    if path:
+      self.start(path, dry_run)
+
+  @property
+  def active(self):
+    return self.path is not None
+
+  def start(self, path, dry_run=False):
+    with self._lock:
+      self.path = path
+      self.data = {
+        'version': FORMAT_VERSION,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'dry_run': dry_run,
+        'api_version': None,
+        'turns': [],
+      }
+
+  def stop(self):
+    with self._lock:
+      path, self.path = self.path, None
+      return path
+
+  def attach(self, client):
+    """Routes the Docker client's HTTP exchanges through the recorder and returns the client.
+
+    Meant for every client when it is created; until a turn is recorded the exchanges pass
+    straight through. Attaching twice is a no-op.
+    """
+    api = client.api
+    if getattr(api, '_session_recorder', None) is self:
+      return client
+    send = api.send
+
+    def recording_send(request, **kwargs):
+      return self._send(send, request, kwargs, api.api_version)
+
+    api.send = recording_send
+    api._session_recorder = self
+    return client
+
+  def _add(self, event):
+    with self._lock:
+      if self._turn is None:
+        return
+      event['at_ms'] = round((event.pop('started') - self._turn_started) * 1000, 1)
+      self._turn['events'].append(event)
+
+  def _send(self, send, request, kwargs, api_version):
+    if self._turn is None or threading.current_thread().name.startswith(BACKGROUND_THREADS):
+      return send(request, **kwargs)
+    started = time.monotonic()
+    event = {'kind': 'docker', 'started': started, 'method': request.method, 'path': docker_path(request.path_url)}
+    try:
+      response = send(request, **kwargs)
+    except Exception as e:
+      event.update(error=str(e), duration_ms=_elapsed_ms(started))
+      self._add(event)
+      raise
+    event['status'] = response.status_code
+    event['headers'] = dict(response.headers)
+    event['streamed'] = bool(kwargs.get('stream'))
+    if not event['streamed']:
+      event.update(_encode_body(response.content))
+    event['duration_ms'] = _elapsed_ms(started)
+    with self._lock:
+      if self.data is not None and self.data['api_version'] is None:
+        self.data['api_version'] = api_version
+    self._add(event)
+    return response
+
+  def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+    if self._turn is not None:
+      self._llm_started[run_id] = (time.monotonic(), messages_to_dict(messages[0]))
+
+  def on_llm_end(self, response, *, run_id, **kwargs):
+    started = self._llm_started.pop(run_id, None)
+    if started is None:
+      return
+    self._add(
+      {
+        'kind': 'llm',
+        'started': started[0],
+        'duration_ms': _elapsed_ms(started[0]),
+        'provider': (response.llm_output or {}).get('provider'),
+        'request': started[1],
+        'response': message_to_dict(response.generations[0][0].message),
+      }
+    )
+
+  def on_llm_error(self, error, *, run_id, **kwargs):
+    started = self._llm_started.pop(run_id, None)
+    if started is not None:
+      self._add({'kind': 'llm', 'started': started[0], 'duration_ms': _elapsed_ms(started[0]), 'error': str(error)})
+
+  def on_permission(self, entry):
+    """Permission manager listener: keeps each decision so a replay can answer prompts the same way."""
+    event = {'kind': 'permission', 'started': time.monotonic()}
+    event.update(operation=entry['operation'], decision=entry['decision'])
+    self._add(event)
+
+  @contextmanager
+  def turn(self, prompt, thread_id=None):
+    """Records the enclosed agent turn; yields a function that wraps the turn's emit to capture its output."""
+    if not self.active:
+      yield lambda emit: emit
+      return
+    turn = {'input': prompt, 'thread_id': thread_id, 'events': [], 'outputs': []}
+    with self._lock:
+      self._turn, self._turn_started = turn, time.monotonic()
+
+    def capture(emit):
+      def recording_emit(content):
+        turn['outputs'].append(content)
+        emit(content)
+
+      return recording_emit
+
+    try:
+      yield capture
+    except Exception as e:
+      turn['error'] = str(e)
+      raise
+    finally:
+      with self._lock:
+        turn['duration_ms'] = _elapsed_ms(self._turn_started)
+        self._turn = None
+        self._llm_started.clear()
+        if self.data is not None:
+          self.data['turns'].append(turn)
+      self.save()
+
+  def save(self):
+    path = self.path
+    if path is None:
+      return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with self._lock:
+      payload = json.dumps(self.data)
+    tmp = f'{path}.tmp'
+    # Created owner-only: the payload carries secrets from container inspects and prompts
+    with os.fdopen(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w', encoding='utf-8') as f:
+      f.write(payload)
+    # A leftover tmp file keeps its old mode through O_CREAT
+    os.chmod(tmp, 0o600)
+    os.replace(tmp, path)
+
+
+def load_recording(path):
+  with open(path, encoding='utf-8') as f:
+    data = json.load(f)
+  if data.get('version') != FORMAT_VERSION:
+    raise ValueError(f'{path} is not a session recording this version can replay')
+  return data
+
+
+class ReplayTransport(BaseAdapter):
+  """requests adapter that answers Docker API calls from a recorded turn instead of a daemon.
+
+  Recorded responses are served in order per method and path; once they run out the last
+  one is repeated, and a request never seen during recording gets a 404. With `realtime`
+  each answer waits as long as the recorded exchange took.
+  """
+
+  def __init__(self, realtime=False):
+    super().__init__()
+    self.realtime = realtime
+    self.calls = 0
+    self.elapsed = 0.0
+    self.misses = []
+    self._queues = {}
+    self._last = {}
+    self._lock = threading.Lock()
+
+  def load(self, events):
+    """Queues the `docker` events of one recorded turn and resets the call counters."""
+    queues = {}
+    for event in events:
+      queues.setdefault(f'{event["method"]} {event["path"]}', deque()).append(event)
+    with self._lock:
+      self._queues = queues
+      self.calls = 0
+      self.elapsed = 0.0
+      self.misses = []
+
+  def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+    started = time.monotonic()
+    key = f'{request.method} {docker_path(request.path_url)}'
+    with self._lock:
+      queue = self._queues.get(key)
+      event = queue.popleft() if queue else self._last.get(key)
+      if event is not None:
+        self._last[key] = event
+      else:
+        self.misses.append(key)
+    try:
+      if self.realtime and event is not None:
+        time.sleep(event.get('duration_ms', 0) / 1000)
+      if event is None:
+        return self._response(request, 404, {'Content-Type': 'application/json'}, b'{"message": "not recorded"}')
+      if event.get('error'):
+        raise requests.ConnectionError(event['error'], request=request)
+      if event.get('streamed'):
+        raise requests.ConnectionError(f'{key} was streamed while recording and cannot be replayed', request=request)
+      return self._response(request, event['status'], event.get('headers') or {}, _decode_body(event))
+    finally:
+      with self._lock:
+        self.calls += 1
+        self.elapsed += time.monotonic() - started
+
+  @staticmethod
+  def _response(request, status, headers, body):
+    response = requests.Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    response.headers.pop('Transfer-Encoding', None)
+    response._content = body
+    response._content_consumed = True
+    response.url = request.url
+    response.request = request
+    response.reason = 'Replayed'
+    response.encoding = 'utf-8'
+    return response
+
+  def close(self):
+    pass
+
+
+def _same_outputs(recorded, replayed):
+  return [str(c) for c in recorded] == [str(c) for c in replayed]
+
+
+def replay_session(path, realtime=False):
+  """Replays every turn of a recording offline through the real agent; returns the timing report.
+
+  Must run before anything imports backend: the LLM router is pointed at the replay model and
+  the Docker client pool at a client whose transport serves the recorded exchanges.
+  """
+  recording = load_recording(path)
+  os.environ['LLM_PROVIDERS'] = 'replay'
+  # A recorded failure must surface once, as it did, rather than be retried against the next answer
+  os.environ['LLM_RETRIES'] = '0'
+  os.environ['LLM_HEDGE_AFTER'] = '0'
+  os.environ['DEVPY_QUERY_CACHE'] = '0'
+  import docker
+  import backend
+  from llm.replay import llm as replay_llm
+  from permissions_manager import PermissionDecision
+
+  replay_llm.realtime = realtime
+  transport = ReplayTransport(realtime)
+  client = docker.DockerClient(base_url='tcp://replay.invalid:2375', version=recording.get('api_version') or '1.43')
+  client.api.mount('http://', transport)
+  backend.docker_pool.factory = lambda name: client
+  backend.docker_pool.reset()
+  backend.response_cache.invalidate()
+  backend.permission_manager.dry_run = bool(recording.get('dry_run'))
+
+  turns = []
+  thread_id = f'replay-{int(time.time())}'
+  for index, turn in enumerate(recording['turns'], 1):
+    events = turn['events']
+    decisions = {}
+    for event in events:
+      if event['kind'] == 'permission':
+        decisions.setdefault(event['operation'], deque()).append(event['decision'])
+
+    def prompt(operation, impact, command_preview, decisions=decisions):
+      recorded = decisions.get(operation)
+      decision = recorded.popleft() if recorded else 'denied'
+      return PermissionDecision.DENY if decision.startswith('denied') else PermissionDecision.ALLOW_ONCE
+
+    replay_llm.load([e for e in events if e['kind'] == 'llm'])
+    transport.load([e for e in events if e['kind'] == 'docker'])
+    outputs = []
+    error = None
+    started = time.monotonic()
+    try:
+      with backend.client_session(thread_id, prompt):
+        backend.run_agent_flow(turn['input'], thread_id=thread_id, emit=outputs.append)
+    except Exception as e:
+      error = str(e)
+    duration_ms = _elapsed_ms(started)
+    calls = [((start - started) * 1000, (end - start) * 1000) for start, end in replay_llm.calls]
+    llm_ms = sum(duration for _, duration in calls)
+    recorded_llm = [(e['at_ms'], e['duration_ms']) for e in events if e['kind'] == 'llm']
+    turns.append(
+      {
+        'turn': index,
+        'input': turn['input'],
+        'recorded_ms': turn.get('duration_ms'),
+        'replay_ms': duration_ms,
+        'overhead_ms': round(max(duration_ms - llm_ms - transport.elapsed * 1000, 0), 1),
+        'llm_calls': len(calls),
+        'recorded_llm_calls': len(recorded_llm),
+        'docker_calls': transport.calls,
+        'recorded_docker_calls': sum(1 for e in events if e['kind'] == 'docker'),
+        'unrecorded_requests': sorted(set(transport.misses)),
+        'recorded_steps_ms': step_times(recorded_llm, turn.get('duration_ms') or 0),
+        'replay_steps_ms': step_times(calls, duration_ms),
+        'same_output': error is None and _same_outputs(turn['outputs'], outputs),
+        'error': error,
+      }
+    )
+  return {
+    'recording': path,
+    'realtime': realtime,
+    'replayed_at': datetime.now(timezone.utc).isoformat(),
+    'turns': turns,
+    'recorded_ms': round(sum(t['recorded_ms'] or 0 for t in turns), 1),
+    'replay_ms': round(sum(t['replay_ms'] for t in turns), 1),
+    'overhead_ms': round(sum(t['overhead_ms'] for t in turns), 1),
+  }
+
+
+def format_report(report):
+  lines = [
+    f'Replay of {report["recording"]}{" (realtime)" if report["realtime"] else ""}',
+    f'{"Turn":>4}  {"Recorded":>10}  {"Replay":>10}  {"Overhead":>10}  {"LLM":>7}  {"Docker":>9}  Output',
+  ]
+  for turn in report['turns']:
+    recorded = '-' if turn['recorded_ms'] is None else f'{turn["recorded_ms"]:.0f} ms'
+    output = 'error: ' + turn['error'] if turn['error'] else ('same' if turn['same_output'] else 'DIFFERENT')
+    llm = f'{turn["llm_calls"]}/{turn["recorded_llm_calls"]}'
+    docker_calls = f'{turn["docker_calls"]}/{turn["recorded_docker_calls"]}'
+    lines.append(
+      f'{turn["turn"]:>4}  {recorded:>10}  {turn["replay_ms"]:>7.0f} ms  {turn["overhead_ms"]:>7.0f} ms  '
+      f'{llm:>7}  {docker_calls:>9}  {output}'
+    )
+    lines.append(f'      steps (ms) replayed: {", ".join(f"{step:.0f}" for step in turn["replay_steps_ms"])}')
+    lines.append(f'      steps (ms) recorded: {", ".join(f"{step:.0f}" for step in turn["recorded_steps_ms"])}')
+    if turn['unrecorded_requests']:
+      lines.append(f'      not recorded: {", ".join(turn["unrecorded_requests"])}')
+  lines.append(
+    f'Total: recorded {report["recorded_ms"]:.0f} ms, replay {report["replay_ms"]:.0f} ms, '
+    f'agent overhead {report["overhead_ms"]:.0f} ms'
+  )
+  return lines
+
+
+def run_replay_command(args):
+  """`replay <recording> [--realtime] [--report <file>]`; exits non-zero when any turn's output differs."""
+  realtime = '--realtime' in args
+  args = [a for a in args if a != '--realtime']
+  report_path = ''
+  if '--report' in args:
+    position = args.index('--report')
+    report_path = args[position + 1] if position + 1 < len(args) else None
+    del args[position : position + 2]
+  if len(args) != 1 or report_path is None:
+    print('Usage: devpy-cli replay <recording.json> [--realtime] [--report <report.json>]', file=sys.stderr)
+    return 2
+  report = replay_session(args[0], realtime=realtime)
+  print('\n'.join(format_report(report)))
+  if report_path:
+    with open(report_path, 'w', encoding='utf-8') as f:
+      json.dump(report, f, indent=2)
+    print(f'Report written to {report_path}')
+  return 0 if all(turn['same_output'] for turn in report['turns']) else 1
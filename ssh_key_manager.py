@@ -1,15 +1,42 @@
 import base64
+import io
 import os
 import json
 import stat
+import threading
+import paramiko
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
 
+# DSS keys are deliberately absent: recent paramiko releases dropped them
+_PKEY_CLASSES = (paramiko.Ed25519Key, paramiko.ECDSAKey, paramiko.RSAKey)
+
+
+def parse_private_key(key_content, password=None):
+  """Parses a PEM/OpenSSH private key held in memory into a paramiko key object.
+
+  `password` decrypts passphrase-protected keys and is ignored for unencrypted ones.
+  """
+  encrypted = False
+  for key_class in _PKEY_CLASSES:
+    try:
+      return key_class.from_private_key(io.StringIO(key_content), password=password)
+    except paramiko.PasswordRequiredException:
+      encrypted = True
+    except (paramiko.SSHException, ValueError):
+      continue
+  if encrypted:
+    raise ValueError('Private key is encrypted; a passphrase is required')
+  raise ValueError('Unsupported or invalid private key format')
+
+
 class SSHKeyManager:
   def __init__(self, storage_file='ssh_keys.enc'):
     self.storage_file = storage_file
+    self._pkey_cache = {}
+    self._lock = threading.Lock()
 
   def _derive_key(self, passphrase: str, salt: bytes) -> bytes:
     kdf = PBKDF2HMAC(
@@ -72,6 +99,32 @@ class SSHKeyManager:
     except Exception:
       raise ValueError('Invalid passphrase or corrupted key data')
 
+  def load_pkey(self, name, passphrase):
+    """Decrypts a stored key straight into a paramiko key object.
+
+    The parsed key is kept in memory only, so reconnects and other hosts using
+    the same key skip both the PBKDF2 derivation and parsing. A passphrase-protected
+    key is opened with the same passphrase that protects it in storage.
+    """
+    pkey = self.get_cached_pkey(name)
+    if pkey is not None:
+      return pkey
+    pkey = parse_private_key(self.get_key(name, passphrase), password=passphrase)
+    with self._lock:
+      self._pkey_cache[name] = pkey
+    return pkey
+
+  def get_cached_pkey(self, name):
+    with self._lock:
+      return self._pkey_cache.get(name)
+
+  def forget_pkeys(self, name=None):
+    with self._lock:
+      if name is None:
+        self._pkey_cache.clear()
+      else:
+        self._pkey_cache.pop(name, None)
+
   def list_keys(self):
     data = self._load_data()
     return list(data.keys())
@@ -81,5 +134,6 @@ class SSHKeyManager:
     if name in data:
       del data[name]
       self._save_data(data)
+      self.forget_pkeys(name)
       return True
     return False
@@ -0,0 +1,145 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+import requests
+from docker.transport import SSHHTTPAdapter
+
+
+def _env_int(name, default):
+  try:
+    return int(os.getenv(name, default))
+  except ValueError:
+    return default
+
+
+class ManagedSSHAdapter(SSHHTTPAdapter):
+  """SSH transport for the Docker API that survives network blips.
+
+  One paramiko transport is kept open with keepalives; concurrent requests are
+  multiplexed over up to `max_pool_size` channels on it. When the transport dies
+  it is reopened with exponential backoff, and idempotent requests that fail on a
+  dropped connection are retried once the connection is back.
+  """
+
+  RETRYABLE_METHODS = {'GET', 'HEAD'}
+
+  def __init__(self, base_url, pkey=None, keepalive=None, max_pool_size=None, reconnect_retries=None, **kwargs):
+    # In-memory paramiko key, reused as-is on every reconnect
+    self.pkey = pkey
+    self.keepalive = keepalive if keepalive is not None else _env_int('DOCKER_SSH_KEEPALIVE', 30)
+    # Not `max_retries`: requests.HTTPAdapter already uses that name for urllib3 retries
+    if reconnect_retries is None:
+      reconnect_retries = _env_int('DOCKER_SSH_RETRIES', 3)
+    self.reconnect_retries = reconnect_retries
+    self.backoff = 0.5
+    self._reconnect_lock = threading.Lock()
+    if max_pool_size is None:
+      max_pool_size = _env_int('DOCKER_SSH_POOL_SIZE', 10)
+    super().__init__(base_url, max_pool_size=max_pool_size, **kwargs)
+
+  def _create_paramiko_client(self, base_url):
+    super()._create_paramiko_client(base_url)
+    if self.pkey is not None:
+      self.ssh_params['pkey'] = self.pkey
+
+  def _connect(self):
+    if not self.ssh_client:
+      return
+    for attempt in range(self.reconnect_retries + 1):
+      try:
+        self.ssh_client.connect(**self.ssh_params)
+        break
+      except Exception:
+        if attempt == self.reconnect_retries:
+          raise
+        time.sleep(min(self.backoff * (2**attempt), 10))
+    transport = self.ssh_client.get_transport()
+    if transport and self.keepalive:
+      transport.set_keepalive(self.keepalive)
+
+  def is_alive(self):
+    transport = self.ssh_client.get_transport() if self.ssh_client else None
+    return transport is not None and transport.is_active()
+
+  def reconnect(self, force=False):
+    with self._reconnect_lock:
+      if self.is_alive() and not force:
+        return
+      # Pools hold channels of the dead transport; drop them before reconnecting
+      self.pools.clear()
+      try:
+        self.ssh_client.close()
+      except Exception:
+        pass
+      self._connect()
+
+  def get_connection(self, url, proxies=None):
+    if self.ssh_client and not self.is_alive():
+      self.reconnect()
+    return super().get_connection(url, proxies)
+
+  def send(self, request, *args, **kwargs):
+    attempts = self.reconnect_retries if request.method in self.RETRYABLE_METHODS else 0
+    for attempt in range(attempts + 1):
+      try:
+        return super().send(request, *args, **kwargs)
+      except requests.exceptions.ConnectionError:
+        if attempt == attempts or not self.ssh_client:
+          raise
+        time.sleep(min(self.backoff * (2**attempt), 10))
+        self.reconnect(force=not self.is_alive())
+
+
+class APIVersionCache:
+  """Remembers the negotiated Docker API version per host so reconnects skip the /version round-trip."""
+
+  def __init__(self, cache_file='docker_api_versions.json', ttl_seconds=None):
+    self.cache_file = cache_file
+    if ttl_seconds is None:
+      ttl_seconds = _env_int('DOCKER_API_VERSION_TTL', 7 * 24 * 3600)
+    self.ttl_seconds = ttl_seconds
+    self._lock = threading.Lock()
+
+  def _load(self):
+    if not os.path.exists(self.cache_file):
+      return {}
+    try:
+      with open(self.cache_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+    except (json.JSONDecodeError, OSError):
+      return {}
+
+  def get(self, host_key):
+    with self._lock:
+      entry = self._load().get(host_key)
+    if not entry:
+      return None
+    if time.time() - entry.get('cached_at', 0) > self.ttl_seconds:
+      return None
+    return entry.get('version')
+
+  def set(self, host_key, version):
+    with self._lock:
+      data = self._load()
+      data[host_key] = {
+        'version': version,
+        'cached_at': time.time(),
+        'updated_at': datetime.now(timezone.utc).isoformat(),
+      }
+      try:
+        with open(self.cache_file, 'w', encoding='utf-8') as f:
+          json.dump(data, f, indent=2)
+      except OSError:
+        pass
+
+  def invalidate(self, host_key=None):
+    with self._lock:
+      data = self._load() if host_key else {}
+      data.pop(host_key, None)
+      try:
+        with open(self.cache_file, 'w', encoding='utf-8') as f:
+          json.dump(data, f, indent=2)
+      except OSError:
+        pass
@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from stats_store import parse_stats_sample
+
+
+class StatsSampler:
+  """Shared monitoring engine: samples stats of every running container into a StatsStore.
+
+  One listing call per round, then one stats call per container over a bounded
+  pool, so a round costs about one stats round-trip regardless of container count.
+  Monitors, trend queries and exporters read the stored samples instead of calling
+  Docker themselves.
+  """
+
+  def __init__(self, client_factory, store, interval=None, max_workers=None):
+    if interval is None:
+      interval = float(os.getenv('DEVPY_STATS_INTERVAL', '10'))
+    if max_workers is None:
+      max_workers = int(os.getenv('DEVPY_STATS_WORKERS', '64'))
+    self.client_factory = client_factory
+    self.store = store
+    self.interval = interval
+    self.max_workers = max_workers
+    self.last_round = None
+    self.last_error = None
+    self.listeners = []
+    self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='stats')
+    self._stop = threading.Event()
+    self._thread = None
+
+  @property
+  def running(self):
+    return self._thread is not None and self._thread.is_alive()
+
+  def start(self):
+    if self.running:
+      return False
+    self._stop.clear()
+    self._thread = threading.Thread(target=self._run, name='stats-sampler', daemon=True)
+    self._thread.start()
+    return True
+
+  def stop(self):
+    self._stop.set()
+
+  def _run(self):
+    while not self._stop.is_set():
+      started = time.monotonic()
+      try:
+        self.sample_once()
+        self.last_error = None
+      except Exception as e:
+        self.last_error = str(e)
+      self._stop.wait(max(self.interval - (time.monotonic() - started), 0.1))
+
+  def is_fresh(self):
+    return self.running and self.last_round is not None and time.time() - self.last_round < self.interval * 1.5
+
+  def latest_samples(self):
+    """Returns {name: sample} for the containers seen in the last round, without Docker calls."""
+    samples = {}
+    for name in self.store.containers():
+      sample = self.store.latest(name)
+      if sample and self.last_round and sample['timestamp'] >= self.last_round - self.interval:
+        samples[name] = sample
+    return samples
+
+  def sample_once(self):
+    """Samples every running container concurrently and returns {name: sample}."""
+    client = self.client_factory()
+    containers = []
+    for c in client.containers.list(sparse=True):
+      names = c.attrs.get('Names') or [c.id]
+      containers.append((c.id, names[0].lstrip('/')))
+
+    def fetch(item):
+      container_id, name = item
+      try:
+        return name, parse_stats_sample(client.api.stats(container_id, stream=False))
+      except Exception:
+        return name, None
+
+    samples = {}
+    for name, sample in self._executor.map(fetch, containers):
+      if sample is None:
+        continue
+      self.store.record(name, sample)
+      samples[name] = sample
+    self.last_round = time.time()
+    for listener in self.listeners:
+      try:
+        listener(samples)
+      except Exception:
+        pass
+    return samples
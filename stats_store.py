@@ -0,0 +1,256 @@
+import mmap
+import os
+import re
+import threading
+import time
+from array import array
+
+
+COLUMNS = ('timestamp', 'cpu_percent', 'mem_usage', 'mem_percent', 'net_rx', 'net_tx', 'blk_read', 'blk_write')
+_MAGIC = 0x44455650  # 'DEVP'
+# Header slots (as doubles): magic, capacity, head (next write index), count
+_HEADER = 4
+
+
+def parse_stats_sample(stats, timestamp=None):
+  """Turns one Docker stats document into a flat sample of COLUMNS.
+
+  CPU% uses the cpu/precpu deltas the way `docker stats` does, and memory excludes
+  the page cache (inactive_file on cgroup v2, cache on v1) so mem% matches it too.
+  """
+  cpu_stats = stats.get('cpu_stats') or {}
+  precpu = stats.get('precpu_stats') or {}
+  cpu_delta = (cpu_stats.get('cpu_usage') or {}).get('total_usage', 0) - (precpu.get('cpu_usage') or {}).get(
+    'total_usage', 0
+  )
+  system_delta = cpu_stats.get('system_cpu_usage', 0) - precpu.get('system_cpu_usage', 0)
+  online_cpus = cpu_stats.get('online_cpus') or len((cpu_stats.get('cpu_usage') or {}).get('percpu_usage') or []) or 1
+  cpu_percent = (cpu_delta / system_delta) * online_cpus * 100 if cpu_delta > 0 and system_delta > 0 else 0.0
+
+  memory = stats.get('memory_stats') or {}
+  details = memory.get('stats') or {}
+  cache = details.get('inactive_file', details.get('total_inactive_file', details.get('cache', 0)))
+  mem_usage = max(memory.get('usage', 0) - cache, 0)
+  mem_limit = memory.get('limit', 0)
+  mem_percent = (mem_usage / mem_limit) * 100 if mem_limit else 0.0
+
+  net_rx = net_tx = 0
+  for interface in (stats.get('networks') or {}).values():
+    net_rx += interface.get('rx_bytes', 0)
+    net_tx += interface.get('tx_bytes', 0)
+
+  blk_read = blk_write = 0
+  for entry in (stats.get('blkio_stats') or {}).get('io_service_bytes_recursive') or []:
+    op = entry.get('op', '').lower()
+    if op == 'read':
+      blk_read += entry.get('value', 0)
+    elif op == 'write':
+      blk_write += entry.get('value', 0)
+
+  return {
+    'timestamp': time.time() if timestamp is None else timestamp,
+    'cpu_percent': cpu_percent,
+    'mem_usage': float(mem_usage),
+    'mem_percent': mem_percent,
+    'net_rx': float(net_rx),
+    'net_tx': float(net_tx),
+    'blk_read': float(blk_read),
+    'blk_write': float(blk_write),
+    'mem_limit': float(mem_limit),
+  }
+
+
+class StatsSeries:
+  """Fixed-size ring buffer of samples stored column-wise in one block of doubles.
+
+  The block is an in-memory `array('d')`, or a memory-mapped file when `path` is
+  given so history survives restarts without any serialization step.
+  """
+
+  def __init__(self, capacity, path=None):
+    self.capacity = capacity
+    self.path = path
+    self._mmap = None
+    size = _HEADER + capacity * len(COLUMNS)
+    if path is None:
+      self._data = array('d', bytes(size * 8))
+    else:
+      self._data = self._open_mmap(path, size)
+    if self._data[0] != _MAGIC or int(self._data[1]) != capacity:
+      self._data[0] = _MAGIC
+      self._data[1] = capacity
+      self._data[2] = 0
+      self._data[3] = 0
+
+  def _open_mmap(self, path, size):
+    nbytes = size * 8
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+      if os.fstat(fd).st_size != nbytes:
+        os.ftruncate(fd, 0)
+        os.ftruncate(fd, nbytes)
+      self._mmap = mmap.mmap(fd, nbytes)
+    finally:
+      os.close(fd)
+    return memoryview(self._mmap).cast('d')
+
+  def __len__(self):
+    return int(self._data[3])
+
+  def _offset(self, column, index):
+    return _HEADER + column * self.capacity + index
+
+  def append(self, sample):
+    head = int(self._data[2])
+    for column, name in enumerate(COLUMNS):
+      self._data[self._offset(column, head)] = float(sample.get(name, 0.0))
+    self._data[2] = (head + 1) % self.capacity
+    self._data[3] = min(len(self) + 1, self.capacity)
+
+  def _indices(self):
+    count = len(self)
+    start = (int(self._data[2]) - count) % self.capacity
+    return [(start + i) % self.capacity for i in range(count)]
+
+  def column(self, name, since=None):
+    column = COLUMNS.index(name)
+    indices = self._indices()
+    if since is not None:
+      ts = COLUMNS.index('timestamp')
+      indices = [i for i in indices if self._data[self._offset(ts, i)] >= since]
+    return [self._data[self._offset(column, i)] for i in indices]
+
+  def latest(self):
+    if not len(self):
+      return None
+    index = (int(self._data[2]) - 1) % self.capacity
+    return {name: self._data[self._offset(c, index)] for c, name in enumerate(COLUMNS)}
+
+  def flush(self):
+    if self._mmap is not None:
+      self._mmap.flush()
+
+  def close(self):
+    if self._mmap is not None:
+      self.flush()
+      self._data.release()
+      self._mmap.close()
+      self._mmap = None
+
+
+class StatsStore:
+  """Per-container StatsSeries, optionally persisted as one memory-mapped file per container."""
+
+  def __init__(self, capacity=None, persist_dir=None):
+    if capacity is None:
+      capacity = int(os.getenv('DEVPY_STATS_CAPACITY', '720'))
+    if persist_dir is None:
+      persist_dir = os.getenv('DEVPY_STATS_DIR') or None
+    self.capacity = capacity
+    self.persist_dir = persist_dir
+    self._series = {}
+    self._extra = {}
+    self._lock = threading.Lock()
+    if persist_dir:
+      os.makedirs(persist_dir, exist_ok=True)
+
+  def _path_for(self, container):
+    if not self.persist_dir:
+      return None
+    safe = re.sub(r'[^A-Za-z0-9_.-]', '_', container)
+    return os.path.join(self.persist_dir, f'{safe}.stats')
+
+  def series(self, container, create=False):
+    with self._lock:
+      series = self._series.get(container)
+      if series is None and (create or self._path_exists(container)):
+        series = StatsSeries(self.capacity, self._path_for(container))
+        self._series[container] = series
+      return series
+
+  def _path_exists(self, container):
+    path = self._path_for(container)
+    return path is not None and os.path.exists(path)
+
+  def record(self, container, sample):
+    series = self.series(container, create=True)
+    with self._lock:
+      series.append(sample)
+      self._extra[container] = {'mem_limit': sample.get('mem_limit', 0.0)}
+
+  def latest(self, container):
+    series = self.series(container)
+    if series is None:
+      return None
+    with self._lock:
+      sample = series.latest()
+      if sample is not None:
+        sample.update(self._extra.get(container, {}))
+      return sample
+
+  def containers(self):
+    with self._lock:
+      return list(self._series.keys())
+
+  def history(self, container, since=None):
+    series = self.series(container)
+    if series is None:
+      return None
+    with self._lock:
+      return {name: series.column(name, since) for name in COLUMNS}
+
+  def close(self):
+    with self._lock:
+      for series in self._series.values():
+        series.close()
+      self._series.clear()
+
+
+def percentile(values, pct):
+  if not values:
+    return 0.0
+  ordered = sorted(values)
+  rank = (len(ordered) - 1) * pct / 100
+  low = int(rank)
+  high = min(low + 1, len(ordered) - 1)
+  return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def slope_per_minute(timestamps, values):
+  """Least-squares slope of values over time, in units per minute."""
+  n = len(values)
+  if n < 2:
+    return 0.0
+  mean_t = sum(timestamps) / n
+  mean_v = sum(values) / n
+  denominator = sum((t - mean_t) ** 2 for t in timestamps)
+  if not denominator:
+    return 0.0
+  numerator = sum((t - mean_t) * (v - mean_v) for t, v in zip(timestamps, values))
+  return numerator / denominator * 60
+
+
+def summarize(timestamps, values):
+  if not values:
+    return None
+  return {
+    'min': min(values),
+    'max': max(values),
+    'mean': sum(values) / len(values),
+    'p95': percentile(values, 95),
+    'slope_per_min': slope_per_minute(timestamps, values),
+  }
+
+
+def downsample(timestamps, values, points):
+  """Averages values into at most `points` equal-count buckets, returning (timestamp, value) pairs."""
+  if points <= 0 or len(values) <= points:
+    return list(zip(timestamps, values))
+  buckets = []
+  size = len(values) / points
+  for i in range(points):
+    start = int(i * size)
+    end = max(int((i + 1) * size), start + 1)
+    chunk = values[start:end]
+    buckets.append((timestamps[end - 1], sum(chunk) / len(chunk)))
+  return buckets
@@ -0,0 +1,75 @@
+import contextvars
+import threading
+import unittest
+from agent_queue import BACKGROUND, INTERACTIVE, AgentJobQueue, QueueFullError
+
+request_user = contextvars.ContextVar('request_user', default=None)
+
+
+class RecordingRunner:
+  def __init__(self):
+    self.started = threading.Event()
+    self.release = threading.Event()
+    self.runs = []
+
+  def __call__(self, job):
+    self.runs.append((job.prompt, request_user.get()))
+    if len(self.runs) == 1:
+      self.started.set()
+      self.release.wait(2)
+
+
+class AgentJobQueueTests(unittest.TestCase):
+  def setUp(self):
+    self.runner = RecordingRunner()
+    self.queue = AgentJobQueue(self.runner, max_background=2)
+    # Keep the worker busy so the next submissions stay pending
+    self.blocker = self.queue.submit('blocker', priority=BACKGROUND)
+    self.assertTrue(self.runner.started.wait(2))
+
+  def tearDown(self):
+    self.runner.release.set()
+
+  def test_interactive_jobs_run_before_background(self):
+    background = self.queue.submit('alert', priority=BACKGROUND)
+    interactive = self.queue.submit('question', priority=INTERACTIVE)
+    self.runner.release.set()
+    background.wait(2)
+    interactive.wait(2)
+    self.assertEqual([p for p, _ in self.runner.runs], ['blocker', 'question', 'alert'])
+    self.assertEqual(interactive.thread_id, f'job-{interactive.id}')
+
+  def test_alert_storms_are_coalesced(self):
+    first = self.queue.submit('oom in api', priority=BACKGROUND, coalesce_key='container:api')
+    second = self.queue.submit('api died', priority=BACKGROUND, coalesce_key='container:api')
+    self.assertIs(first, second)
+    self.assertIn('2 related alerts', first.prompt)
+
+  def test_background_backpressure(self):
+    self.queue.submit('a', priority=BACKGROUND)
+    self.queue.submit('b', priority=BACKGROUND)
+    with self.assertRaises(QueueFullError):
+      self.queue.submit('c', priority=BACKGROUND)
+    self.queue.submit('still accepted', priority=INTERACTIVE)
+
+  def test_cancelled_pending_job_is_skipped(self):
+    job = self.queue.submit('never', priority=BACKGROUND)
+    self.assertTrue(self.queue.cancel(job.id))
+    self.runner.release.set()
+    self.assertTrue(job.wait(2))
+    self.assertEqual(job.status, 'cancelled')
+    self.assertNotIn('never', [p for p, _ in self.runner.runs])
+
+  def test_jobs_run_in_submitter_context(self):
+    token = request_user.set('alice')
+    try:
+      job = self.queue.submit('whoami', priority=INTERACTIVE)
+    finally:
+      request_user.reset(token)
+    self.runner.release.set()
+    job.wait(2)
+    self.assertIn(('whoami', 'alice'), self.runner.runs)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,70 @@
+import importlib
+import unittest
+from unittest import mock
+from cli_commands import local_command
+from tests_support import load_backend
+
+PROMPTS = [
+  'jobs failing on api?',
+  'alerts from last night',
+  'metrics for the db container look off',
+  'diagnostics show what for api',
+  'stats of the worker',
+  'profile the slow api endpoint',
+  'record how many restarts web had',
+  'dashboard of disk usage',
+]
+
+
+class LocalCommandTests(unittest.TestCase):
+  def test_commands_are_recognised(self):
+    self.assertEqual(local_command('jobs'), 'jobs')
+    self.assertEqual(local_command('jobs cancel 3'), 'jobs')
+    self.assertEqual(local_command('alerts recent'), 'alerts')
+    self.assertEqual(local_command('metrics start 9100'), 'metrics')
+    self.assertEqual(local_command('diagnostics clear'), 'diagnostics')
+    self.assertEqual(local_command('record start /tmp/session.json'), 'record')
+
+  def test_prompts_starting_with_a_command_word_are_not_commands(self):
+    for prompt in PROMPTS:
+      self.assertIsNone(local_command(prompt), prompt)
+    self.assertIsNone(local_command('jobsite is down'))
+    self.assertIsNone(local_command('alerts recent ones for db'))
+
+
+class RunCliDispatchTests(unittest.TestCase):
+  @classmethod
+  def setUpClass(cls):
+    load_backend()
+    cls.frontend_cli = importlib.import_module('frontend_cli')
+
+  def run_cli(self, inputs):
+    frontend_cli = self.frontend_cli
+    handlers = {name: mock.Mock() for name in frontend_cli.COMMAND_HANDLERS}
+    with (
+      mock.patch.object(frontend_cli, 'check_for_update'),
+      mock.patch.object(frontend_cli, 'submit_agent_request') as submit,
+      mock.patch.object(frontend_cli.Prompt, 'ask', side_effect=['n', *inputs, 'exit']),
+      mock.patch.dict(frontend_cli.COMMAND_HANDLERS, handlers),
+      mock.patch.object(frontend_cli, 'console'),
+    ):
+      frontend_cli.run_cli()
+    return submit, handlers
+
+  def test_natural_language_prompts_reach_the_agent(self):
+    submit, handlers = self.run_cli(PROMPTS)
+    self.assertEqual([call.args[0] for call in submit.call_args_list], PROMPTS)
+    for handler in handlers.values():
+      handler.assert_not_called()
+
+  def test_commands_run_locally(self):
+    submit, handlers = self.run_cli(['jobs cancel 3', 'alerts status', 'metrics stop', 'diagnostics'])
+    submit.assert_not_called()
+    handlers['jobs'].assert_called_once_with('jobs cancel 3')
+    handlers['alerts'].assert_called_once_with('alerts status')
+    handlers['metrics'].assert_called_once_with('metrics stop')
+    handlers['diagnostics'].assert_called_once_with('diagnostics')
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,101 @@
+import hashlib
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+from container_copy import CopyLimitError, copy_from_container, copy_to_container, extract_archive
+
+
+def make_tar(members):
+  buffer = io.BytesIO()
+  with tarfile.open(fileobj=buffer, mode='w') as archive:
+    for name, data in members:
+      info = tarfile.TarInfo(name)
+      if data is None:
+        info.type = tarfile.SYMTYPE
+        info.linkname = '/etc/passwd'
+        archive.addfile(info)
+      else:
+        info.size = len(data)
+        archive.addfile(info, io.BytesIO(data))
+  return buffer.getvalue()
+
+
+def chunked(data, size=100):
+  return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+class FakeAPI:
+  def __init__(self, archive=b'', stat=None):
+    self.archive = archive
+    self.stat = stat
+    self.uploaded = None
+
+  def get_archive(self, container, path, chunk_size=None):
+    return iter(chunked(self.archive)), self.stat
+
+  def put_archive(self, container, path, data):
+    self.uploaded = (path, b''.join(data))
+    return True
+
+
+class CopyFromContainerTests(unittest.TestCase):
+  def test_extracts_binary_files_with_checksums(self):
+    payload = bytes(range(256)) * 50
+    archive = make_tar([('dump/heap.bin', payload), ('dump/link', None)])
+    progress = []
+    with tempfile.TemporaryDirectory() as tmp:
+      result = copy_from_container(
+        FakeAPI(archive, {'size': 4096, 'mode': 1 << 31}), 'app', '/dump', tmp, 10**6, lambda d, t: progress.append(d)
+      )
+      with open(os.path.join(tmp, 'dump', 'heap.bin'), 'rb') as f:
+        self.assertEqual(f.read(), payload)
+      self.assertFalse(os.path.lexists(os.path.join(tmp, 'dump', 'link')))
+    self.assertEqual(
+      result['files'],
+      [
+        {'path': os.path.join('dump', 'heap.bin'), 'bytes': len(payload), 'sha256': hashlib.sha256(payload).hexdigest()}
+      ],
+    )
+    self.assertEqual(result['skipped'], ['dump/link'])
+    self.assertEqual(progress[-1], len(archive))
+
+  def test_size_limits(self):
+    with tempfile.TemporaryDirectory() as tmp:
+      with self.assertRaises(CopyLimitError):
+        copy_from_container(FakeAPI(b'', {'size': 5000, 'mode': 0o644}), 'app', '/big', tmp, 1000)
+      archive = make_tar([('big', b'x' * 5000)])
+      with self.assertRaises(CopyLimitError):
+        extract_archive(chunked(archive), tmp, 1000)
+
+  def test_rejects_members_escaping_destination(self):
+    with tempfile.TemporaryDirectory() as tmp:
+      with self.assertRaises(ValueError):
+        extract_archive(chunked(make_tar([('../evil', b'x')])), os.path.join(tmp, 'out'), 10**6)
+      self.assertFalse(os.path.exists(os.path.join(tmp, 'evil')))
+
+
+class CopyToContainerTests(unittest.TestCase):
+  def test_streams_directory_as_tar(self):
+    api = FakeAPI()
+    with tempfile.TemporaryDirectory() as tmp:
+      source = os.path.join(tmp, 'conf')
+      os.makedirs(os.path.join(source, 'sub'))
+      with open(os.path.join(source, 'sub', 'a.bin'), 'wb') as f:
+        f.write(b'\x00\xff' * 700)
+      result = copy_to_container(api, 'app', source, '/etc', 10**6)
+      with self.assertRaises(CopyLimitError):
+        copy_to_container(api, 'app', source, '/etc', 100)
+
+    path, data = api.uploaded
+    self.assertEqual(path, '/etc')
+    with tarfile.open(fileobj=io.BytesIO(data)) as archive:
+      self.assertEqual(archive.getnames(), ['conf', 'conf/sub', 'conf/sub/a.bin'])
+      self.assertEqual(archive.extractfile('conf/sub/a.bin').read(), b'\x00\xff' * 700)
+    self.assertEqual(result['bytes'], 1400)
+    self.assertEqual(result['files'][0]['sha256'], hashlib.sha256(b'\x00\xff' * 700).hexdigest())
+
+
+if __name__ == '__main__':
+  unittest.main()
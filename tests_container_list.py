@@ -0,0 +1,62 @@
+import unittest
+from tests_support import BackendTestCase, FakeClient, FakeContainer
+
+
+def make_container(i):
+  state = 'running' if i % 3 else 'exited'
+  return FakeContainer(
+    f'web-{i}',
+    State=state,
+    Image='nginx' if i % 2 else 'redis',
+    Status='Up 2 hours' if state == 'running' else 'Exited (1) 3 hours ago',
+    Created=1000 + i,
+  )
+
+
+class ContainerListTests(BackendTestCase):
+  def setUp(self):
+    self.client = self.use_docker_client(FakeClient(make_container(i) for i in range(10)))
+
+  def test_filters_are_passed_to_docker(self):
+    self.backend.read_container_list(status='exited', name='web', label='tier=front, team', ancestor='nginx')
+    call = self.client.calls_of('list')[0]
+    self.assertTrue(call['all'])
+    self.assertTrue(call['sparse'])
+    self.assertEqual(
+      call['filters'], {'status': 'exited', 'name': 'web', 'label': ['tier=front', 'team'], 'ancestor': 'nginx'}
+    )
+
+  def test_sort_keys(self):
+    by_created = self.backend.read_container_list(include_stopped=True, sort_by='created').splitlines()
+    self.assertTrue(by_created[1].startswith('web-9 '))
+    by_state = self.backend.read_container_list(include_stopped=True, sort_by='state').splitlines()
+    self.assertIn('(exited,', by_state[1])
+    with self.assertRaises(ValueError):
+      self.backend.read_container_list(sort_by='size')
+
+  def test_pages_point_to_the_next_offset(self):
+    first = self.backend.read_container_list(include_stopped=True, limit=4).splitlines()
+    self.assertEqual(first[0], 'Containers 1-4 of 10, sorted by name (next page: offset=4)')
+    last = self.backend.read_container_list(include_stopped=True, limit=4, offset=8).splitlines()
+    self.assertEqual(last[0], 'Containers 9-10 of 10, sorted by name')
+    self.assertEqual(len(last), 3)
+    self.assertIn('No containers at offset 10', self.backend.read_container_list(include_stopped=True, offset=10))
+    # Every page is served from one cached listing
+    self.assertEqual(self.client.count('list'), 1)
+
+  def test_invalid_paging_is_rejected(self):
+    with self.assertRaises(ValueError):
+      self.backend.read_container_list(offset=-5)
+    with self.assertRaises(ValueError):
+      self.backend.read_container_list(limit=0)
+    self.assertIn('offset must be 0 or more', self.backend.list_containers.invoke({'offset': -5}))
+
+  def test_summary_counts_by_state_and_image(self):
+    summary = self.backend.read_container_list(include_stopped=True, summary=True).splitlines()
+    self.assertEqual(summary[0], '10 containers')
+    self.assertEqual(summary[1], 'By state: exited=4, running=6')
+    self.assertEqual(summary[2], 'Top images: nginx (5), redis (5)')
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from container_resolver import ContainerIndex, ContainerResolutionError
+from tests_support import BackendTestCase, FakeClient, FakeContainer
+
+
+def container(container_id, name, service=None, state='running'):
+  labels = {'com.docker.compose.service': service} if service else {}
+  return {'Id': container_id, 'Names': [f'/{name}'], 'Labels': labels, 'State': state}
+
+
+class ContainerIndexTests(unittest.TestCase):
+  def setUp(self):
+    self.index = ContainerIndex()
+    self.index.refresh(
+      [
+        container('a1b2c3d4e5', 'prod_nginx_1', 'nginx'),
+        container('f6e5d4c3b2', 'prod_db_1', 'db'),
+        container('0123456789', 'staging_db_1', 'db', state='exited'),
+        container('9876543210', 'worker'),
+      ]
+    )
+
+  def test_exact_name_id_prefix_and_service(self):
+    self.assertEqual(self.index.resolve('worker'), 'worker')
+    self.assertEqual(self.index.resolve('a1b2c3'), 'prod_nginx_1')
+    self.assertEqual(self.index.resolve('nginx'), 'prod_nginx_1')
+
+  def test_ambiguous_service_lists_running_first(self):
+    with self.assertRaises(ContainerResolutionError) as ctx:
+      self.index.resolve('db')
+    self.assertTrue(ctx.exception.ambiguous)
+    self.assertEqual(ctx.exception.candidates, ['prod_db_1', 'staging_db_1'])
+
+  def test_misspelling_suggests_candidates(self):
+    with self.assertRaises(ContainerResolutionError) as ctx:
+      self.index.resolve('prod_ngnix_1')
+    self.assertFalse(ctx.exception.ambiguous)
+    self.assertEqual(ctx.exception.candidates[0], 'prod_nginx_1')
+    with self.assertRaises(ContainerResolutionError) as ctx:
+      self.index.resolve('zzz')
+    self.assertEqual(ctx.exception.candidates, [])
+
+  def test_exact_resolution_needs_the_name_or_an_id_prefix(self):
+    self.assertEqual(self.index.resolve('worker', exact=True), 'worker')
+    self.assertEqual(self.index.resolve('a1b2c3', exact=True), 'prod_nginx_1')
+    for query in ('nginx', 'prod', 'wroker'):
+      with self.assertRaises(ContainerResolutionError) as ctx:
+        self.index.resolve(query, exact=True)
+      self.assertTrue(ctx.exception.exact_required)
+    self.assertEqual(ctx.exception.candidates, ['worker'])
+
+  def test_events_keep_index_current(self):
+    self.index.apply_event(
+      {'Type': 'container', 'Action': 'create', 'Actor': {'ID': 'abcdef0000', 'Attributes': {'name': 'cache_1'}}}
+    )
+    self.assertEqual(self.index.resolve('cache_1'), 'cache_1')
+    self.index.apply_event({'Type': 'container', 'Action': 'destroy', 'Actor': {'ID': '9876543210', 'Attributes': {}}})
+    self.assertNotIn('worker', self.index.names())
+
+  def test_mentioned_containers(self):
+    self.assertEqual(self.index.mentioned('why is nginx failing?'), ['prod_nginx_1'])
+    self.assertEqual(self.index.mentioned('check the db'), ['prod_db_1', 'staging_db_1'])
+
+
+class WriteToolResolutionTests(BackendTestCase):
+  def setUp(self):
+    self.client = self.use_docker_client(
+      FakeClient([FakeContainer('prod_api_1', Id='a1b2c3d4e5'), FakeContainer('worker', Id='9876543210')])
+    )
+
+  def test_component_match_does_not_resolve_for_delete_container(self):
+    result = self.backend.delete_container.invoke({'container_name': 'api'})
+    self.assertIn("Container 'api' is not an exact name or ID", result)
+    self.assertIn('prod_api_1', result)
+    self.assertEqual(self.client.calls_of('get'), [])
+
+  def test_read_tools_still_resolve_partial_names(self):
+    self.assertEqual(self.backend.resolve_container('api'), 'prod_api_1')
+    self.assertEqual(self.backend.resolve_container('a1b2c3', exact=True), 'prod_api_1')
+
+
+if __name__ == '__main__':
+  unittest.main()
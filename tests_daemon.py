@@ -0,0 +1,97 @@
+import os
+import socket
+import stat
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import daemon_client
+from daemon_client import DaemonClient, run_thin_cli
+from daemon_server import DaemonRequestHandler, DevPyDaemon, send_message
+
+
+class EchoHandler(DaemonRequestHandler):
+  def handle_run(self, user_input, session_id):
+    send_message(self.wfile, {'type': 'message', 'content': f'{session_id}: {user_input}'})
+    send_message(self.wfile, {'type': 'done'})
+
+
+class RecordingDaemon(DevPyDaemon):
+  handler_class = EchoHandler
+
+  def __init__(self, socket_path):
+    super().__init__(socket_path)
+    self.ended = []
+    self.session_ended = threading.Event()
+
+  def end_session(self, session_id):
+    self.ended.append(session_id)
+    self.session_ended.set()
+
+
+def current_umask():
+  umask = os.umask(0o022)
+  os.umask(umask)
+  return umask
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'needs unix domain sockets')
+class DaemonSessionTests(unittest.TestCase):
+  def setUp(self):
+    tmp = tempfile.TemporaryDirectory()
+    self.addCleanup(tmp.cleanup)
+    self.daemon = RecordingDaemon(os.path.join(tmp.name, 'devpy.sock'))
+    self.umask = current_umask()
+    server = self.daemon.bind()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    self.addCleanup(server.server_close)
+    self.addCleanup(server.shutdown)
+
+  def test_socket_is_created_owner_only(self):
+    self.assertEqual(stat.S_IMODE(os.stat(self.daemon.socket_path).st_mode), 0o600)
+    self.assertEqual(current_umask(), self.umask)
+
+  def test_session_ends_when_the_client_disconnects(self):
+    client = DaemonClient(self.daemon.socket_path, session_id='client-1')
+    messages = []
+    client.run('first', on_message=messages.append)
+    client.run('second', on_message=messages.append)
+    self.assertEqual(messages, ['client-1: first', 'client-1: second'])
+    self.assertEqual(self.daemon.ended, [])
+    client.close()
+    self.assertTrue(self.daemon.session_ended.wait(2))
+    self.assertEqual(self.daemon.ended, ['client-1'])
+
+
+class FakeDaemonClient:
+  socket_path = 'devpy.sock'
+
+  def __init__(self):
+    self.inputs = []
+    self.closed = False
+
+  def run(self, user_input, on_message=None, on_prompt=None):
+    self.inputs.append(user_input)
+
+  def close(self):
+    self.closed = True
+
+
+class ThinCliTests(unittest.TestCase):
+  def test_local_commands_are_rejected_and_prompts_sent(self):
+    client = FakeDaemonClient()
+    inputs = ['stats start', 'jobs', 'dashboard', 'config show', 'jobs failing on api?', 'exit']
+    with (
+      mock.patch.object(daemon_client.Prompt, 'ask', side_effect=inputs),
+      mock.patch.object(daemon_client, 'console') as console,
+    ):
+      run_thin_cli(client)
+    self.assertEqual(client.inputs, ['jobs failing on api?'])
+    self.assertTrue(client.closed)
+    printed = ' '.join(str(call.args[0]) for call in console.print.call_args_list)
+    self.assertIn("'stats' is not available through the daemon", printed)
+    self.assertIn("'dashboard' is not available through the daemon", printed)
+
+
+if __name__ == '__main__':
+  unittest.main()
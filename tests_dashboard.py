@@ -0,0 +1,124 @@
+import io
+import threading
+import time
+import unittest
+from rich.console import Console
+from dashboard import Dashboard, DashboardState
+
+
+def container(name, state='running', status='Up 2 hours', image='nginx:1'):
+  return {'Id': name * 4, 'Names': [f'/{name}'], 'Image': image, 'State': state, 'Status': status}
+
+
+def event(name, action, **attributes):
+  return {
+    'Type': 'container',
+    'Action': action,
+    'time': 1700000000,
+    'Actor': {'ID': name * 4, 'Attributes': {'name': name, **attributes}},
+  }
+
+
+class FakeSparse:
+  def __init__(self, attrs):
+    self.attrs = attrs
+
+
+class FakeClient:
+  def __init__(self, containers):
+    self.containers = self
+    self._containers = containers
+
+  def list(self, all=False, sparse=False):
+    return [FakeSparse(c) for c in self._containers]
+
+
+class FakeSampler:
+  def __init__(self):
+    self.listeners = []
+    self.started = False
+    self.stopped = False
+
+  def start(self):
+    self.started = True
+    return True
+
+  def stop(self):
+    self.stopped = True
+
+
+class FakeWatcher:
+  running = True
+
+  def __init__(self):
+    self.listeners = []
+
+
+class DashboardStateTests(unittest.TestCase):
+  def test_events_and_samples_mark_rows_dirty(self):
+    state = DashboardState(max_events=2)
+    state.load([container('web', status='Up 1 hour (unhealthy)'), container('db')])
+    changed, _ = state.take_changes()
+    self.assertEqual(set(changed), {'web', 'db'})
+    self.assertEqual(changed['web']['health'], 'unhealthy')
+
+    state.apply_event(event('web', 'die', exitCode='137'))
+    state.apply_event(event('web', 'exec_start: sh'))
+    state.apply_samples({'db': {'cpu_percent': 12.5, 'mem_usage': 2048, 'mem_percent': 1.0}, 'gone': {}})
+    changed, events_changed = state.take_changes()
+    self.assertEqual(set(changed), {'web', 'db'})
+    self.assertEqual(changed['web']['state'], 'exited')
+    self.assertIn('(137)', changed['web']['status'])
+    self.assertEqual(changed['db']['cpu'], 12.5)
+    self.assertTrue(events_changed)
+    self.assertEqual([e[2] for e in state.events], ['die'])
+
+    state.apply_event(event('new', 'create', image='redis'))
+    state.apply_event(event('new', 'health_status: healthy'))
+    state.apply_event(event('db', 'destroy'))
+    changed, _ = state.take_changes()
+    self.assertIsNone(changed['db'])
+    self.assertEqual((changed['new']['image'], changed['new']['health']), ('redis', 'healthy'))
+    self.assertEqual(len(state.events), 2)
+
+
+class DashboardTests(unittest.TestCase):
+  def make(self):
+    console = Console(file=io.StringIO(), width=140, force_terminal=False)
+    return Dashboard(lambda: FakeClient([container('web')]), FakeSampler(), FakeWatcher(), console, fps=50)
+
+  def test_redraws_only_on_visible_changes(self):
+    dashboard = self.make()
+    dashboard.state.load([container('web')])
+    self.assertTrue(dashboard.update())
+    self.assertFalse(dashboard.update())
+    sample = {'cpu_percent': 5.0, 'mem_usage': 1024, 'mem_percent': 1.0}
+    dashboard.state.apply_samples({'web': sample})
+    self.assertTrue(dashboard.update())
+    # Same values rounded to the displayed precision: nothing to redraw
+    dashboard.state.apply_samples({'web': dict(sample, cpu_percent=5.01)})
+    self.assertFalse(dashboard.update())
+
+  def test_run_attaches_to_sources_and_detaches(self):
+    dashboard = self.make()
+    watcher, sampler = dashboard.events_watcher, dashboard.stats_sampler
+
+    def feed():
+      time.sleep(0.05)
+      watcher.listeners[0](event('web', 'die', exitCode='1'))
+      sampler.listeners[0]({'web': {'cpu_percent': 0.0, 'mem_usage': 0, 'mem_percent': 0.0}})
+
+    thread = threading.Thread(target=feed)
+    thread.start()
+    dashboard.run(duration=0.3)
+    thread.join()
+    output = dashboard.console.file.getvalue()
+    self.assertIn('web', output)
+    self.assertIn('Exited (1)', output)
+    self.assertGreaterEqual(dashboard.frames, 2)
+    self.assertEqual((watcher.listeners, sampler.listeners), ([], []))
+    self.assertTrue(sampler.started and sampler.stopped)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,153 @@
+import unittest
+from disk_reclaim import ReclaimPlan
+
+NOW = 1_700_000_000
+DAY = 86400
+
+DF = {
+  'Images': [
+    {'Id': 'sha256:aaa111', 'RepoTags': ['nginx:1'], 'Size': 100, 'SharedSize': 40, 'Containers': 1, 'Created': 0},
+    {
+      'Id': 'sha256:bbb222',
+      'RepoTags': ['<none>:<none>'],
+      'Size': 50,
+      'SharedSize': 0,
+      'Containers': 0,
+      'Created': NOW - DAY,
+    },
+    {
+      'Id': 'sha256:ccc333',
+      'RepoTags': ['old:1'],
+      'Size': 300,
+      'SharedSize': 100,
+      'Containers': 0,
+      'Created': NOW - 30 * DAY,
+    },
+    {'Id': 'sha256:ddd444', 'RepoTags': ['new:1'], 'Size': 70, 'SharedSize': -1, 'Containers': 0, 'Created': NOW - DAY},
+  ],
+  'Containers': [
+    {'Names': ['/web'], 'State': 'running', 'SizeRw': 5},
+    {'Names': ['/job'], 'State': 'exited', 'SizeRw': 8},
+  ],
+  'Volumes': [
+    {'Name': 'data', 'UsageData': {'Size': 1000, 'RefCount': 1}},
+    {'Name': 'orphan', 'UsageData': {'Size': 400, 'RefCount': 0}},
+  ],
+  'BuildCache': [
+    {'ID': 'cache1', 'Size': 20, 'InUse': False, 'Shared': False},
+    {'ID': 'cache2', 'Size': 30, 'InUse': True, 'Shared': False},
+  ],
+}
+
+
+class FakeContainers:
+  def __init__(self, calls):
+    self.calls = calls
+
+  def prune(self, filters=None):
+    self.calls.append(('containers', filters))
+    return {'ContainersDeleted': ['x'], 'SpaceReclaimed': 8}
+
+
+class FakeImages:
+  def __init__(self, calls):
+    self.calls = calls
+
+  def remove(self, image):
+    self.calls.append(('image', image))
+
+
+class FakeAPI:
+  def __init__(self, calls, volume_error=None):
+    self.calls = calls
+    self.volume_error = volume_error
+
+  def remove_volume(self, name):
+    self.calls.append(('volume', name))
+    if self.volume_error:
+      raise self.volume_error
+
+  def prune_builds(self, all=None):
+    self.calls.append(('builds', all))
+    return {'CachesDeleted': ['cache1'], 'SpaceReclaimed': 20}
+
+
+class FakeClient:
+  def __init__(self, volume_error=None):
+    self.calls = []
+    self.api = FakeAPI(self.calls, volume_error)
+    self.containers = FakeContainers(self.calls)
+    self.images = FakeImages(self.calls)
+
+
+class ReclaimPlanTests(unittest.TestCase):
+  def test_plan_from_df(self):
+    plan = ReclaimPlan(DF, older_than_days=7, now=NOW)
+    self.assertEqual(plan.items['stopped_containers'], {'names': ['job'], 'bytes': 8})
+    self.assertEqual(plan.items['dangling_images'], {'names': ['bbb222'], 'bytes': 50})
+    # Only old unused images, counting unique bytes
+    self.assertEqual(plan.items['unused_images'], {'names': ['old:1'], 'bytes': 200})
+    self.assertEqual(plan.items['unused_volumes'], {'names': ['orphan'], 'bytes': 400})
+    self.assertEqual(plan.items['build_cache'], {'names': ['cache1'], 'bytes': 20})
+    self.assertEqual(plan.total_bytes, 678)
+
+  def test_unused_images_cover_dangling_when_dangling_not_selected(self):
+    plan = ReclaimPlan(DF, ['unused_images'], older_than_days=0, now=NOW)
+    self.assertEqual(plan.categories, ['unused_images'])
+    self.assertEqual(sorted(plan.items['unused_images']['names']), ['bbb222', 'new:1', 'old:1'])
+
+  def test_unknown_category(self):
+    with self.assertRaises(ValueError):
+      ReclaimPlan(DF, ['everything'])
+
+  def test_execute_removes_planned_objects_in_order(self):
+    df = dict(DF, BuildCache=[])
+    plan = ReclaimPlan(df, now=NOW)
+    self.assertNotIn('docker builder prune -a -f', plan.commands())
+    self.assertIn('docker image rm old:1', plan.commands())
+    client = FakeClient()
+    results = plan.execute(client)
+    self.assertEqual(
+      client.calls,
+      [('containers', None), ('image', 'sha256:bbb222'), ('image', 'old:1'), ('volume', 'orphan')],
+    )
+    self.assertEqual(results['unused_images'], {'deleted': 1, 'reclaimed': 200, 'error': None})
+    self.assertEqual(results['unused_volumes'], {'deleted': 1, 'reclaimed': 400, 'error': None})
+    self.assertNotIn('build_cache', results)
+
+  def test_images_and_volumes_of_pruned_containers_are_kept_unless_planned(self):
+    df = dict(
+      DF,
+      Images=DF['Images']
+      + [{'Id': 'sha256:eee555', 'RepoTags': ['job:1'], 'Size': 90, 'SharedSize': 0, 'Containers': 1, 'Created': 0}],
+      Volumes=DF['Volumes'] + [{'Name': 'job-data', 'UsageData': {'Size': 10, 'RefCount': 1}}],
+    )
+    plan = ReclaimPlan(df, older_than_days=0, now=NOW)
+    self.assertIn('job', plan.items['stopped_containers']['names'])
+    self.assertNotIn('job:1', plan.items['unused_images']['names'])
+    client = FakeClient()
+    plan.execute(client)
+    self.assertNotIn(('image', 'job:1'), client.calls)
+    self.assertNotIn(('image', 'sha256:eee555'), client.calls)
+    self.assertNotIn(('volume', 'job-data'), client.calls)
+
+  def test_multi_tag_images_are_removed_tag_by_tag(self):
+    df = dict(
+      DF,
+      Images=[{'Id': 'sha256:fff666', 'RepoTags': ['app:1', 'app:latest'], 'Size': 10, 'Containers': 0, 'Created': 0}],
+    )
+    client = FakeClient()
+    ReclaimPlan(df, ['unused_images'], now=NOW).execute(client)
+    self.assertEqual(client.calls, [('image', 'app:1'), ('image', 'app:latest')])
+
+  def test_execute_reports_step_errors(self):
+    plan = ReclaimPlan(DF, ['unused_volumes', 'build_cache'], now=NOW)
+    client = FakeClient(volume_error=RuntimeError('busy'))
+    results = plan.execute(client)
+    self.assertEqual(client.calls, [('volume', 'orphan'), ('builds', True)])
+    self.assertEqual(results['unused_volumes'], {'deleted': 0, 'reclaimed': 0, 'error': 'orphan: busy'})
+    self.assertEqual(results['build_cache'], {'deleted': 1, 'reclaimed': 20, 'error': None})
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,131 @@
+import threading
+import time
+import unittest
+from events_watcher import DEFAULT_RULES, AlertRuleEngine, EventsWatcher
+
+
+def make_event(action, name='api', exit_code=None, time_nano=None):
+  attributes = {'name': name}
+  if exit_code is not None:
+    attributes['exitCode'] = str(exit_code)
+  return {
+    'Type': 'container',
+    'Action': action,
+    'Actor': {'ID': f'{name}-id', 'Attributes': attributes},
+    'timeNano': time_nano,
+  }
+
+
+class AlertRuleEngineTests(unittest.TestCase):
+  def setUp(self):
+    self.engine = AlertRuleEngine([dict(rule) for rule in DEFAULT_RULES])
+    self.nano = 0
+
+  def evaluate(self, action, now, **kwargs):
+    self.nano += 1
+    return self.engine.evaluate(make_event(action, time_nano=self.nano, **kwargs), now=now)
+
+  def test_clean_exit_does_not_alert(self):
+    self.assertEqual(self.evaluate('die', 0, exit_code=0), [])
+
+  def test_nonzero_exit_and_oom_alert(self):
+    crash = self.evaluate('die', 0, exit_code=137)
+    self.assertEqual([a.rule['name'] for a in crash], ['container_crashed'])
+    self.assertIn('exit code 137', crash[0].message)
+    oom = self.evaluate('oom', 1)
+    self.assertEqual([a.rule['name'] for a in oom], ['out_of_memory'])
+
+  def test_cooldown_suppresses_repeated_alerts(self):
+    self.assertEqual(len(self.evaluate('health_status: unhealthy', 0)), 1)
+    self.assertEqual(self.evaluate('health_status: unhealthy', 60), [])
+    self.assertEqual(len(self.evaluate('health_status: unhealthy', 400)), 1)
+    self.assertEqual(len(self.evaluate('health_status: unhealthy', 401, name='db')), 1)
+
+  def test_crash_loop_counts_within_window(self):
+    names = []
+    for now in (0, 60, 120):
+      names.extend(a.rule['name'] for a in self.evaluate('die', now, exit_code=1))
+    self.assertIn('crash_loop', names)
+
+    engine = AlertRuleEngine([r for r in DEFAULT_RULES if r['name'] == 'crash_loop'])
+    alerts = []
+    for i, now in enumerate((0, 400, 800)):
+      alerts.extend(engine.evaluate(make_event('die', exit_code=1, time_nano=i), now=now))
+    self.assertEqual(alerts, [])
+
+  def test_replayed_events_are_deduplicated(self):
+    event = make_event('oom', time_nano=42)
+    self.assertEqual(len(self.engine.evaluate(event, now=0)), 1)
+    self.assertEqual(self.engine.evaluate(dict(event), now=1000), [])
+
+  def test_container_patterns(self):
+    engine = AlertRuleEngine([{'name': 'db_oom', 'event': 'oom', 'containers': ['db*']}])
+    self.assertEqual(engine.evaluate(make_event('oom', name='api', time_nano=1), now=0), [])
+    self.assertEqual(len(engine.evaluate(make_event('oom', name='db_1', time_nano=2), now=0)), 1)
+
+
+class FakeStream:
+  def __init__(self):
+    self.closed = False
+    self._closed = threading.Event()
+
+  def __iter__(self):
+    self._closed.wait(5)
+    return iter(())
+
+  def close(self):
+    self.closed = True
+    self._closed.set()
+
+
+class FakeEventsClient:
+  def __init__(self, streams):
+    self.streams = streams
+
+  def events(self, decode=False, since=None, filters=None):
+    stream = FakeStream()
+    self.streams.append(stream)
+    return stream
+
+
+def wait_for(condition, expected=True, timeout=2):
+  deadline = time.monotonic() + timeout
+  while bool(condition()) != expected and time.monotonic() < deadline:
+    time.sleep(0.01)
+  return condition()
+
+
+class EventsWatcherTests(unittest.TestCase):
+  def test_handle_event_dispatches_alerts_and_listeners(self):
+    alerts = []
+    seen = []
+    watcher = EventsWatcher(lambda: None, alerts.append, rules=[dict(r) for r in DEFAULT_RULES])
+    watcher.listeners.append(seen.append)
+    watcher.handle_event(make_event('start', time_nano=1))
+    watcher.handle_event(make_event('oom', time_nano=2))
+    self.assertEqual(len(seen), 2)
+    self.assertEqual([a.rule['name'] for a in alerts], ['out_of_memory'])
+    self.assertEqual(len(watcher.recent_alerts), 1)
+
+  def test_holders_share_one_stream_and_only_alerts_fire_rules(self):
+    streams = []
+    client = FakeEventsClient(streams)
+    alerts = []
+    seen = []
+    watcher = EventsWatcher(lambda: client, alerts.append, rules=[dict(r) for r in DEFAULT_RULES])
+    watcher.listeners.append(seen.append)
+    self.assertTrue(watcher.start(holder='metrics'))
+    self.assertTrue(watcher.start())
+    self.assertFalse(watcher.start())
+    self.assertEqual(wait_for(lambda: len(streams)), 1)
+    watcher.stop()
+    self.assertTrue(watcher.running)
+    watcher.handle_event(make_event('oom', time_nano=1))
+    self.assertEqual((len(seen), alerts), (1, []))
+    watcher.stop(holder='metrics')
+    self.assertTrue(streams[0].closed)
+    self.assertFalse(wait_for(lambda: watcher.running, expected=False))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,129 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from config_manager import ConfigManager
+from fleet_manager import DockerClientPool, FleetManager, format_partial_failures
+
+
+class FakeClient:
+  def __init__(self, name):
+    self.name = name
+    self.closed = False
+
+  def close(self):
+    self.closed = True
+
+
+class DockerClientPoolTests(unittest.TestCase):
+  def test_one_client_per_host(self):
+    created = []
+
+    def factory(name):
+      created.append(name)
+      time.sleep(0.05)
+      return FakeClient(name)
+
+    pool = DockerClientPool(factory)
+    threads = [threading.Thread(target=pool.get, args=('prod-1',)) for _ in range(5)]
+    for t in threads:
+      t.start()
+    for t in threads:
+      t.join()
+    self.assertEqual(created, ['prod-1'])
+    self.assertIs(pool.get('prod-1'), pool.get('prod-1'))
+
+  def test_reset_closes_clients(self):
+    pool = DockerClientPool(FakeClient)
+    a = pool.get('a')
+    b = pool.get('b')
+    pool.reset('a')
+    self.assertTrue(a.closed)
+    self.assertFalse(b.closed)
+    pool.reset()
+    self.assertTrue(b.closed)
+    self.assertEqual(pool.hosts(), [])
+
+
+class FleetManagerTests(unittest.TestCase):
+  def test_fan_out_runs_concurrently_and_reports_partial_results(self):
+    fleet = FleetManager(DockerClientPool(FakeClient), max_workers=4, timeout=0.5)
+
+    def per_host(client, host):
+      if host == 'slow':
+        time.sleep(2)
+      if host == 'broken':
+        raise RuntimeError('connection refused')
+      time.sleep(0.2)
+      return client.name
+
+    start = time.monotonic()
+    results = fleet.fan_out(['a', 'b', 'slow', 'broken'], per_host)
+    elapsed = time.monotonic() - start
+
+    self.assertLess(elapsed, 1.0)
+    self.assertEqual([r.host for r in results], ['a', 'b', 'slow', 'broken'])
+    self.assertEqual(results[0].value, 'a')
+    self.assertTrue(results[1].ok)
+    self.assertTrue(results[2].timed_out)
+    self.assertIn('connection refused', results[3].error)
+    report = format_partial_failures(results)
+    self.assertIn('2/4 hosts answered', report)
+
+  def test_queued_hosts_time_out_when_every_worker_hangs(self):
+    fleet = FleetManager(DockerClientPool(FakeClient), max_workers=2, timeout=0.2)
+    release = threading.Event()
+
+    def per_host(client, host):
+      if host.startswith('hung'):
+        release.wait(5)
+      return client.name
+
+    try:
+      results = fleet.fan_out(['hung-1', 'hung-2'], per_host)
+      self.assertTrue(all(r.timed_out for r in results))
+      # Both workers are still stuck; a later query must not wait on them forever
+      start = time.monotonic()
+      results = fleet.fan_out(['ok'], per_host)
+      self.assertLess(time.monotonic() - start, 1.0)
+      self.assertTrue(results[0].timed_out)
+    finally:
+      release.set()
+    self.assertEqual(fleet.fan_out(['ok'], per_host)[0].value, 'ok')
+
+
+class ConfigManagerFleetTests(unittest.TestCase):
+  def setUp(self):
+    fd, self.path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    os.remove(self.path)
+    self.config = ConfigManager(self.path)
+
+  def tearDown(self):
+    if os.path.exists(self.path):
+      os.remove(self.path)
+
+  def test_resolve_targets_expands_groups(self):
+    self.config.add_host('web-1', 'ssh', 'web1.example.com', 'deploy', 'prod')
+    self.config.add_host('web-2', 'ssh', 'web2.example.com', 'deploy', 'prod')
+    self.config.add_host('db-1', 'local')
+    self.config.set_group('prod', ['web-1', 'web-2'])
+
+    self.assertEqual(self.config.resolve_targets('prod'), ['web-1', 'web-2'])
+    self.assertEqual(self.config.resolve_targets('prod,db-1,web-1'), ['web-1', 'web-2', 'db-1'])
+    self.assertEqual(self.config.resolve_targets(''), ['web-1', 'web-2', 'db-1'])
+    with self.assertRaises(ValueError):
+      self.config.resolve_targets('staging')
+
+  def test_active_host_profile(self):
+    self.config.add_host('web-1', 'ssh', 'web1.example.com', 'deploy', 'prod')
+    self.assertEqual(self.config.get_profile()['mode'], 'local')
+    self.config.set_active_host('web-1')
+    self.assertEqual(self.config.get_profile()['host'], 'web1.example.com')
+    self.config.remove_host('web-1')
+    self.assertIsNone(self.config.get_active_host())
+
+
+if __name__ == '__main__':
+  unittest.main()
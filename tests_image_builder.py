@@ -0,0 +1,111 @@
+import gzip
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+from image_builder import BuildContext, BuildManifest, build_key, run_build
+
+
+def write(root, relative, content):
+  path = os.path.join(root, relative)
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+  with open(path, 'w', encoding='utf-8') as f:
+    f.write(content)
+
+
+class FakeAPI:
+  def __init__(self, events):
+    self.events = events
+    self.kwargs = None
+    self.context = None
+
+  def build(self, **kwargs):
+    self.kwargs = kwargs
+    self.context = b''.join(kwargs['fileobj'])
+    return iter(self.events)
+
+
+class BuildContextTests(unittest.TestCase):
+  def setUp(self):
+    self.tmp = tempfile.TemporaryDirectory()
+    self.root = self.tmp.name
+    write(self.root, 'Dockerfile', 'FROM alpine\nCOPY . /app\n')
+    write(self.root, 'app/main.py', 'print(1)\n')
+    write(self.root, 'node_modules/big/index.js', 'x' * 1000)
+    write(self.root, '.dockerignore', '# deps\nnode_modules\n')
+
+  def tearDown(self):
+    self.tmp.cleanup()
+
+  def test_dockerignore_and_streamed_tar(self):
+    context = BuildContext(self.root)
+    self.assertEqual(context.paths, ['.dockerignore', 'Dockerfile', 'app', 'app/main.py'])
+    with tarfile.open(fileobj=io.BytesIO(gzip.decompress(b''.join(context.stream())))) as archive:
+      self.assertEqual(archive.getnames(), context.paths)
+      self.assertEqual(archive.extractfile('app/main.py').read(), b'print(1)\n')
+
+  def test_digest_changes_with_content_and_reuses_known_hashes(self):
+    digest, hashes = BuildContext(self.root).digest()
+    self.assertEqual(BuildContext(self.root).digest(hashes)[0], digest)
+    # Unchanged size and mtime: the recorded hash is trusted without reading the file
+    stale = {name: [size, mtime, 'cached'] for name, (size, mtime, _) in hashes.items()}
+    self.assertEqual(BuildContext(self.root).digest(stale)[1]['app/main.py'][2], 'cached')
+    write(self.root, 'node_modules/big/index.js', 'changed')
+    self.assertEqual(BuildContext(self.root).digest(hashes)[0], digest)
+    write(self.root, 'app/main.py', 'print(2)\n')
+    self.assertNotEqual(BuildContext(self.root).digest()[0], digest)
+
+  def test_build_key_covers_arguments(self):
+    self.assertNotEqual(build_key('d', 'Dockerfile', {'A': '1'}), build_key('d', 'Dockerfile', {'A': '2'}))
+    self.assertEqual(
+      build_key('d', 'Dockerfile', {'A': '1', 'B': '2'}), build_key('d', 'Dockerfile', {'B': '2', 'A': '1'})
+    )
+
+  def test_missing_dockerfile(self):
+    with self.assertRaises(FileNotFoundError):
+      BuildContext(self.root, 'Dockerfile.prod')
+
+
+class RunBuildTests(unittest.TestCase):
+  def test_streams_output_and_returns_image_id(self):
+    with tempfile.TemporaryDirectory() as root:
+      write(root, 'Dockerfile', 'FROM alpine\n')
+      api = FakeAPI(
+        [
+          {'stream': 'Step 1/1 : FROM alpine\n'},
+          {'status': 'Downloading', 'progressDetail': {'current': 1}},
+          {'aux': {'ID': 'sha256:abc'}},
+          {'stream': 'Successfully tagged app:1\n'},
+        ]
+      )
+      lines = []
+      image_id, output = run_build(api, BuildContext(root), 'app:1', {'V': '1'}, ['app:cache'], on_output=lines.append)
+    self.assertEqual(image_id, 'sha256:abc')
+    self.assertEqual(output, ['Step 1/1 : FROM alpine', 'Successfully tagged app:1'])
+    self.assertEqual(lines, output)
+    self.assertEqual(api.kwargs['encoding'], 'gzip')
+    self.assertEqual(api.kwargs['cache_from'], ['app:cache'])
+    self.assertTrue(api.kwargs['custom_context'])
+    self.assertIn(b'FROM alpine', gzip.decompress(api.context))
+
+  def test_build_error(self):
+    with tempfile.TemporaryDirectory() as root:
+      write(root, 'Dockerfile', 'FROM nothing\n')
+      with self.assertRaises(RuntimeError):
+        run_build(FakeAPI([{'error': 'pull access denied\n'}]), BuildContext(root), 'app:1')
+
+
+class BuildManifestTests(unittest.TestCase):
+  def test_persists_builds_per_host(self):
+    with tempfile.TemporaryDirectory() as tmp:
+      path = os.path.join(tmp, 'build_manifest.json')
+      BuildManifest(path).record('prod', 'app:1', 'key', 'sha256:abc', '/src', {'Dockerfile': [1, 2, 'h']})
+      manifest = BuildManifest(path)
+    self.assertEqual(manifest.last_build('prod', 'app:1')['image_id'], 'sha256:abc')
+    self.assertIsNone(manifest.last_build('dev', 'app:1'))
+    self.assertEqual(manifest.file_hashes('/src'), {'Dockerfile': [1, 2, 'h']})
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,59 @@
+import time
+import unittest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from llm.router import LLMRouter
+
+
+class _Model(GenericFakeChatModel):
+  delay: float = 0.0
+  fail: bool = False
+
+  def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+    time.sleep(self.delay)
+    if self.fail:
+      raise ConnectionError('provider down')
+    return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+
+def make_model(text, **kwargs):
+  return _Model(messages=iter([AIMessage(content=text)] * 10), **kwargs)
+
+
+class LLMRouterTests(unittest.TestCase):
+  def test_fails_over_after_retries(self):
+    router = LLMRouter(
+      providers=[('down', make_model('a', fail=True)), ('up', make_model('b'))], retries=1, backoff=0.01
+    )
+    result = router.invoke([HumanMessage(content='hi')])
+    self.assertEqual(result.content, 'b')
+    self.assertEqual(router.provider_stats()['down']['errors'], 2)
+
+  def test_timeout_moves_to_next_provider(self):
+    router = LLMRouter(
+      providers=[('slow', make_model('a', delay=0.5)), ('fast', make_model('b'))], timeout=0.1, retries=0
+    )
+    self.assertEqual(router.invoke('hi').content, 'b')
+
+  def test_hedging_races_the_next_provider(self):
+    router = LLMRouter(
+      providers=[('slow', make_model('a', delay=0.5)), ('fast', make_model('b'))], timeout=5, hedge_after=0.05
+    )
+    started = time.monotonic()
+    self.assertEqual(router.invoke('hi').content, 'b')
+    self.assertLess(time.monotonic() - started, 0.4)
+
+  def test_unhealthy_providers_are_tried_last(self):
+    router = LLMRouter(providers=[('flaky', make_model('a')), ('steady', make_model('b'))])
+    for _ in range(3):
+      router.stats.record('flaky', 0.1, False)
+    self.assertEqual([name for name, _ in router.ordered_providers()], ['steady', 'flaky'])
+
+  def test_all_providers_failing_raises(self):
+    router = LLMRouter(providers=[('down', make_model('a', fail=True))], retries=0)
+    with self.assertRaises(RuntimeError):
+      router.invoke('hi')
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,91 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from log_export import export_logs, parse_time
+
+
+class FakeContainer:
+  def __init__(self, chunks, error=None):
+    self.chunks = chunks
+    self.error = error
+    self.kwargs = None
+
+  def logs(self, **kwargs):
+    self.kwargs = kwargs
+
+    def stream():
+      yield from self.chunks
+      if self.error:
+        raise self.error
+
+    return stream()
+
+
+class FakeContainers:
+  def __init__(self, containers):
+    self.containers = containers
+
+  def get(self, name):
+    if name not in self.containers:
+      raise KeyError(name)
+    return self.containers[name]
+
+
+class FakeClient:
+  def __init__(self, containers):
+    self.containers = FakeContainers(containers)
+
+
+class ParseTimeTests(unittest.TestCase):
+  def test_formats(self):
+    now = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+    self.assertIsNone(parse_time(''))
+    self.assertEqual(parse_time('2h', now), now - timedelta(hours=2))
+    self.assertEqual(parse_time('1714564800'), now)
+    self.assertEqual(parse_time('2024-05-01T12:00:00Z'), now)
+    with self.assertRaises(ValueError):
+      parse_time('yesterday')
+
+
+class ExportLogsTests(unittest.TestCase):
+  def test_streams_to_gzip_with_manifest(self):
+    # Lines split across chunks, and a last line without a trailing newline
+    web = FakeContainer(
+      [b'2024-05-01T10:00:00.1Z start\n2024-05-01T10:00:01.0Z re', b'quest\n', b'2024-05-01T10:05:00.0Z done']
+    )
+    client = FakeClient({'web': web, 'db': FakeContainer([])})
+    since = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    with tempfile.TemporaryDirectory() as tmp:
+      manifest = export_logs(client, ['web', 'db'], tmp, since=since, workers=2)
+      with gzip.open(os.path.join(tmp, 'web.log.gz'), 'rb') as f:
+        content = f.read()
+      with open(os.path.join(tmp, 'manifest.json'), encoding='utf-8') as f:
+        self.assertEqual(json.load(f), manifest)
+
+    self.assertEqual(content.count(b'\n'), 2)
+    self.assertEqual(web.kwargs['since'], since)
+    self.assertTrue(web.kwargs['stream'] and web.kwargs['timestamps'])
+    entry, empty = manifest['containers']
+    self.assertEqual(entry['lines'], 3)
+    self.assertEqual(entry['bytes'], len(content))
+    self.assertGreater(entry['compressed_bytes'], 0)
+    self.assertEqual(entry['first_timestamp'], '2024-05-01T10:00:00.1Z')
+    self.assertEqual(entry['last_timestamp'], '2024-05-01T10:05:00.0Z')
+    self.assertEqual((empty['lines'], empty['first_timestamp'], empty['error']), (0, None, None))
+    self.assertEqual(manifest['since'], since.isoformat())
+
+  def test_failures_keep_partial_output(self):
+    client = FakeClient({'flaky': FakeContainer([b'2024-05-01T10:00:00Z a\n'], error=RuntimeError('reset'))})
+    with tempfile.TemporaryDirectory() as tmp:
+      manifest = export_logs(client, ['flaky', 'gone'], tmp)
+    flaky, gone = manifest['containers']
+    self.assertEqual((flaky['lines'], flaky['error'], flaky['file']), (1, 'reset', 'flaky.log.gz'))
+    self.assertIsNone(gone['file'])
+    self.assertIn('gone', gone['error'])
+
+
+if __name__ == '__main__':
+  unittest.main()
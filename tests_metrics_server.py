@@ -0,0 +1,73 @@
+import time
+import unittest
+import urllib.request
+from metrics_server import MetricsRegistry, MetricsServer
+from tests_support import BackendTestCase, FakeClient
+
+
+class MetricsRegistryTests(unittest.TestCase):
+  def test_render_text_exposition_format(self):
+    registry = MetricsRegistry()
+    decisions = registry.counter('devpy_permission_decisions_total', 'Permission decisions')
+    latency = registry.histogram('devpy_tool_duration_seconds', 'Tool latency', buckets=(0.1, 1))
+    registry.add_collector(
+      lambda: [('devpy_container_cpu_percent', 'gauge', 'CPU', [({'container': 'web "1"'}, 12.5)])]
+    )
+    decisions.inc(operation='restart_container', decision='denied')
+    decisions.inc(operation='restart_container', decision='denied')
+    latency.observe(0.05, tool='list_containers')
+    latency.observe(2, tool='list_containers')
+
+    body = registry.render()
+    self.assertIn('# TYPE devpy_permission_decisions_total counter', body)
+    self.assertIn('devpy_permission_decisions_total{decision="denied",operation="restart_container"} 2', body)
+    self.assertIn('devpy_tool_duration_seconds_bucket{tool="list_containers",le="0.1"} 1', body)
+    self.assertIn('devpy_tool_duration_seconds_bucket{tool="list_containers",le="+Inf"} 2', body)
+    self.assertIn('devpy_tool_duration_seconds_count{tool="list_containers"} 2', body)
+    self.assertIn('devpy_container_cpu_percent{container="web \\"1\\""} 12.5', body)
+
+  def test_server_serves_metrics_on_localhost(self):
+    registry = MetricsRegistry()
+    registry.counter('devpy_test_total', 'Test').inc()
+    server = MetricsServer(registry)
+    server.start('127.0.0.1', 0)
+    try:
+      host, port = server.address
+      with urllib.request.urlopen(f'http://{host}:{port}/metrics', timeout=2) as resp:
+        self.assertIn('text/plain', resp.headers['Content-Type'])
+        self.assertIn('devpy_test_total 1', resp.read().decode('utf-8'))
+    finally:
+      server.stop()
+
+
+def container_event(action, name, exit_code=None):
+  attributes = {'name': name} if exit_code is None else {'name': name, 'exitCode': str(exit_code)}
+  return {'Type': 'container', 'Action': action, 'Actor': {'ID': f'{name}-id', 'Attributes': attributes}}
+
+
+class RestartCounterTests(BackendTestCase):
+  def test_restarts_are_counted_on_the_shared_stream_without_alerting(self):
+    client = self.use_docker_client(FakeClient())
+    client.pending_events = [container_event('die', 'flaky', exit_code=1), container_event('start', 'flaky')]
+    watcher = self.backend.get_events_watcher()
+    alerts = []
+    self.addCleanup(setattr, watcher, 'on_alert', watcher.on_alert)
+    watcher.on_alert = alerts.append
+    self.addCleanup(watcher.stop, holder='metrics')
+    self.assertTrue(watcher.start(holder='metrics'))
+
+    def restarts():
+      samples = self.backend.container_restarts.samples()
+      return sum(value for _, labels, value in samples if labels == (('container', 'flaky'),))
+
+    deadline = time.monotonic() + 2
+    while not restarts() and time.monotonic() < deadline:
+      time.sleep(0.01)
+    self.assertEqual(restarts(), 1)
+    self.assertEqual(client.count('events'), 1)
+    self.assertFalse(watcher.alerting)
+    self.assertEqual(alerts, [])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,71 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from llm.ollama import OllamaRuntime
+
+
+class _FakeOllama(BaseHTTPRequestHandler):
+  requests = []
+
+  def do_POST(self):
+    body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+    _FakeOllama.requests.append((self.path, body))
+    payload = json.dumps({'model': body['model'], 'done': True, 'load_duration': 2_500_000_000}).encode('utf-8')
+    self.send_response(200)
+    self.send_header('Content-Length', str(len(payload)))
+    self.end_headers()
+    self.wfile.write(payload)
+
+  def log_message(self, format, *args):
+    pass
+
+
+class OllamaRuntimeTests(unittest.TestCase):
+  def test_warm_up_loads_model_with_keep_alive(self):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _FakeOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+      port = server.server_address[1]
+      runtime = OllamaRuntime('llama3.1:8b', f'http://127.0.0.1:{port}/v1', keep_alive='30m')
+      self.assertTrue(runtime.warm_up(timeout=5))
+    finally:
+      server.shutdown()
+      server.server_close()
+    path, body = _FakeOllama.requests[-1]
+    self.assertEqual(path, '/api/generate')
+    self.assertEqual(body, {'model': 'llama3.1:8b', 'prompt': '', 'keep_alive': '30m'})
+    stats = runtime.stats()
+    self.assertTrue(stats['loaded'])
+    self.assertEqual(stats['load_ms'], 2500)
+
+  def test_unreachable_server_is_reported(self):
+    runtime = OllamaRuntime('llama3.1:8b', 'http://127.0.0.1:9/v1')
+    self.assertFalse(runtime.warm_up(timeout=1))
+    self.assertFalse(runtime.stats()['loaded'])
+    self.assertIsNotNone(runtime.stats()['last_error'])
+
+  def test_generations_are_bounded(self):
+    runtime = OllamaRuntime('m', 'http://127.0.0.1:9/v1', max_parallel=1)
+    peak = []
+
+    def generate():
+      with runtime.generation():
+        peak.append(runtime.in_flight)
+        time.sleep(0.02)
+
+    threads = [threading.Thread(target=generate) for _ in range(3)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    stats = runtime.stats()
+    self.assertEqual(max(peak), 1)
+    self.assertEqual(stats['generations'], 3)
+    self.assertEqual(stats['in_flight'], 0)
+    self.assertGreater(stats['avg_wait_ms'], 0)
+
+
+if __name__ == '__main__':
+  unittest.main()
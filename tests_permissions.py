@@ -103,6 +103,23 @@ class PermissionManagerTests(unittest.TestCase):
     self.assertEqual(action.calls, 1)
     self.assertEqual(result, 'ok')
 
+  def test_session_approvals_are_isolated_per_session(self):
+    action = DummyAction()
+    with self.manager.session('alice'):
+      self.manager.execute(
+        operation='restart_container',
+        fn=action,
+        command_key='restart:test',
+        decision_override=PermissionDecision.ALLOW_SESSION,
+      )
+      self.assertFalse(self.manager.needs_confirmation('restart_container'))
+    with self.manager.session('bob'):
+      self.assertTrue(self.manager.needs_confirmation('restart_container'))
+    self.assertTrue(self.manager.needs_confirmation('restart_container'))
+    self.manager.end_session('alice')
+    with self.manager.session('alice'):
+      self.assertTrue(self.manager.needs_confirmation('restart_container'))
+
 
 if __name__ == '__main__':
   unittest.main()
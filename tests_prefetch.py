@@ -0,0 +1,41 @@
+import time
+import unittest
+from response_cache import ResponseCache
+from tests_support import BackendTestCase, FakeClient, FakeContainer
+
+
+class PrefetchTests(BackendTestCase):
+  def setUp(self):
+    self.client = self.use_docker_client(FakeClient(FakeContainer(name) for name in ('api', 'db', 'worker')))
+    # Slow enough that a tool called right after the prefetch joins the in-flight request
+    self.client.containers.get_delay = 0.1
+    cache = self.backend.response_cache
+    self.addCleanup(setattr, self.backend, 'response_cache', cache)
+    self.backend.response_cache = ResponseCache(ttl=60)
+
+  def test_mentioned_containers_are_prefetched_and_tools_reuse_them(self):
+    self.assertEqual(self.backend.prefetch_docker_state('is api healthy?').result(), ['api'])
+    self.backend.read_container_attrs('api')
+    self.backend.read_container_list()
+    self.assertEqual(self.client.count('get', 'api'), 1)
+    self.assertEqual(self.client.count('get', 'db'), 0)
+    self.assertEqual(self.client.count('logs'), 0)
+
+  def test_logs_are_prefetched_only_on_log_intent(self):
+    self.backend.prefetch_docker_state('why is db failing').result()
+    self.backend.read_container_logs('db')
+    self.assertEqual(self.client.count('logs', 'db'), 1)
+
+    self.backend.prefetch_docker_state('restart worker').result()
+    self.backend.read_container_attrs('worker')
+    time.sleep(0.05)
+    self.assertEqual(self.client.count('logs', 'worker'), 0)
+
+  def test_nothing_runs_with_the_cache_disabled(self):
+    self.backend.response_cache = ResponseCache(ttl=0)
+    self.assertIsNone(self.backend.prefetch_docker_state('why is api failing'))
+    self.assertEqual(self.client.calls, [])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,60 @@
+import os
+import pstats
+import tempfile
+import threading
+import time
+import unittest
+from profiler import TurnProfiler
+
+
+def busy_loop(seconds):
+  end = time.monotonic() + seconds
+  total = 0
+  while time.monotonic() < end:
+    total += sum(range(200))
+  return total
+
+
+class TurnProfilerTests(unittest.TestCase):
+  def test_disabled_profiles_nothing(self):
+    with tempfile.TemporaryDirectory() as tmp:
+      profiler = TurnProfiler(log_dir=tmp, enabled=False)
+      with profiler.profile('turn') as report:
+        busy_loop(0.01)
+      self.assertEqual(report, [])
+      self.assertEqual(os.listdir(tmp), [])
+
+  def test_writes_pstats_and_collapsed_stacks_including_pool_threads(self):
+    with tempfile.TemporaryDirectory() as tmp:
+      profiler = TurnProfiler(log_dir=tmp, enabled=True, interval=0.002)
+      with profiler.profile('turn') as report:
+        worker = threading.Thread(target=busy_loop, args=(0.2,), name='worker')
+        worker.start()
+        busy_loop(0.1)
+        worker.join()
+      result = report[0]
+      self.assertIs(profiler.last_report, result)
+      with open(result.collapsed_path, encoding='utf-8') as f:
+        collapsed = f.read()
+      if result.pstats_path is not None:
+        functions = {name for _, _, name in pstats.Stats(result.pstats_path).stats}
+        self.assertIn('busy_loop', functions)
+    # cProfile only sees this thread; the sampler also sees the worker
+    self.assertIn('worker;', collapsed)
+    self.assertRegex(collapsed.splitlines()[0], r' \d+$')
+    summary = '\n'.join(result.summary())
+    self.assertIn('Profile of turn', summary)
+    self.assertIn('busy_loop', summary)
+
+  def test_overlapping_runs_are_not_profiled(self):
+    with tempfile.TemporaryDirectory() as tmp:
+      profiler = TurnProfiler(log_dir=tmp, enabled=True)
+      with profiler.profile('outer') as outer:
+        with profiler.profile('inner') as inner:
+          pass
+      self.assertEqual(inner, [])
+      self.assertEqual(len(outer), 1)
+
+
+if __name__ == '__main__':
+  unittest.main()
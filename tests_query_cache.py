@@ -0,0 +1,120 @@
+import os
+import tempfile
+import unittest
+import uuid
+from unittest import mock
+from langchain_core.messages import AIMessage, message_to_dict
+from llm.replay import llm as replay_llm
+from query_cache import QueryCache, inventory_fingerprint, normalize_query, refers_to_context
+from tests_support import BackendTestCase, FakeClient, FakeContainer
+
+
+PLAN = [{'tool': 'list_containers', 'args': {}}]
+
+
+class QueryCacheTests(unittest.TestCase):
+  def setUp(self):
+    self.tmp = tempfile.TemporaryDirectory()
+    self.path = os.path.join(self.tmp.name, 'query_cache.json')
+
+  def tearDown(self):
+    self.tmp.cleanup()
+
+  def test_normalize_query_ignores_phrasing(self):
+    self.assertEqual(normalize_query('Is the db healthy?'), normalize_query('is DB healthy'))
+    self.assertEqual(normalize_query('Show me nginx errors, please!'), 'nginx errors')
+
+  def test_fingerprint_tracks_inventory_state(self):
+    running = [{'Names': ['/db'], 'ImageID': 'sha:1', 'State': 'running'}]
+    exited = [{'Names': ['/db'], 'ImageID': 'sha:1', 'State': 'exited'}]
+    self.assertEqual(inventory_fingerprint(running), inventory_fingerprint(list(running)))
+    self.assertNotEqual(inventory_fingerprint(running), inventory_fingerprint(exited))
+
+  def test_lookup_requires_same_host_and_fingerprint(self):
+    cache = QueryCache(self.path, ttl_seconds=60, enabled=True)
+    cache.store('prod', 'is the db healthy?', 'f1', PLAN)
+    self.assertEqual(cache.lookup('prod', 'Is DB healthy', 'f1'), PLAN)
+    self.assertIsNone(cache.lookup('staging', 'Is DB healthy', 'f1'))
+    self.assertIsNone(cache.lookup('prod', 'Is DB healthy', 'f2'))
+    # A state change drops the entry for good
+    self.assertIsNone(cache.lookup('prod', 'Is DB healthy', 'f1'))
+    self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+  def test_entries_expire_and_persist(self):
+    cache = QueryCache(self.path, ttl_seconds=60, enabled=True)
+    cache.store('prod', 'nginx errors', 'f1', PLAN)
+    self.assertEqual(QueryCache(self.path, ttl_seconds=60, enabled=True).lookup('prod', 'nginx errors', 'f1'), PLAN)
+    expired = QueryCache(self.path, ttl_seconds=-1, enabled=True)
+    self.assertIsNone(expired.lookup('prod', 'nginx errors', 'f1'))
+
+  def test_questions_referring_to_earlier_turns_are_not_cached(self):
+    for query in ('restart it', 'show its logs', 'same for db', 'what about db?', 'is it up?'):
+      self.assertTrue(refers_to_context(query), query)
+    for query in ('is the db healthy?', 'show logs for worker', 'why is api failing'):
+      self.assertFalse(refers_to_context(query), query)
+    cache = QueryCache(self.path, ttl_seconds=60, enabled=True)
+    cache.store('prod', 'show its logs', 'f1', PLAN)
+    self.assertIsNone(cache.lookup('prod', 'show its logs', 'f1'))
+    self.assertEqual(cache.stats()['entries'], 0)
+    self.assertFalse(cache.cacheable('same for db'))
+
+
+def llm_turn(*messages):
+  """Queues the replay model's answers for the next LLM calls, in order."""
+  replay_llm.load([{'kind': 'llm', 'response': message_to_dict(m)} for m in messages])
+
+
+def list_call(**args):
+  return AIMessage(content='', tool_calls=[{'id': uuid.uuid4().hex, 'name': 'list_containers', 'args': args}])
+
+
+class PlanReplayTests(BackendTestCase):
+  def setUp(self):
+    self.client = self.use_docker_client(FakeClient(FakeContainer(name) for name in ('api', 'db')))
+    tmp = tempfile.TemporaryDirectory()
+    self.addCleanup(tmp.cleanup)
+    patches = (
+      mock.patch.object(self.backend, 'query_cache', QueryCache(os.path.join(tmp.name, 'q.json'), 60, True)),
+      mock.patch.object(self.backend, 'tool_selection_enabled', False),
+      mock.patch.object(self.backend, 'prefetch_enabled', False),
+    )
+    for patch in patches:
+      patch.start()
+      self.addCleanup(patch.stop)
+    self.addCleanup(replay_llm.load, [])
+
+  def ask(self, question):
+    outputs = []
+    self.backend.run_agent_flow(question, thread_id=uuid.uuid4().hex, emit=outputs.append)
+    return outputs, len(replay_llm.calls)
+
+  def test_repeated_question_replays_the_tool_plan_with_one_llm_call(self):
+    llm_turn(list_call(name='db'), AIMessage(content='db is running'))
+    self.assertEqual(self.ask('Is the db healthy?'), (['db is running'], 2))
+    self.assertEqual(self.backend.query_cache.stats()['entries'], 1)
+
+    lists = self.client.count('list')
+    llm_turn(AIMessage(content='db is still running'))
+    self.assertEqual(self.ask('is DB healthy'), (['db is still running'], 1))
+    self.assertEqual(self.backend.query_cache.hits, 1)
+    # The plan ran again against live Docker rather than answering from stale output
+    self.assertGreater(self.client.count('list'), lists)
+
+  def test_plan_keeps_only_read_only_tools(self):
+    read = list_call(name='db')
+    self.assertEqual(self.backend._tool_plan([read, read]), [{'tool': 'list_containers', 'args': {'name': 'db'}}])
+    restart = AIMessage(
+      content='', tool_calls=[{'id': 'r1', 'name': 'restart_container', 'args': {'container_name': 'db'}}]
+    )
+    self.assertIsNone(self.backend._tool_plan([read, restart]))
+
+  def test_follow_up_questions_always_run_the_agent(self):
+    for _ in range(2):
+      llm_turn(list_call(name='db'), AIMessage(content='db is running'))
+      # On another thread "it" would be a different container; a replay would answer for the wrong one
+      self.assertEqual(self.ask('is it healthy?'), (['db is running'], 2))
+    self.assertEqual(self.backend.query_cache.stats(), {'enabled': True, 'entries': 0, 'hits': 0, 'misses': 0})
+
+
+if __name__ == '__main__':
+  unittest.main()
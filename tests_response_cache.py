@@ -0,0 +1,89 @@
+import threading
+import time
+import unittest
+from response_cache import ResponseCache
+
+
+class ResponseCacheTests(unittest.TestCase):
+  def test_hits_within_ttl_and_expires(self):
+    cache = ResponseCache(ttl=0.05)
+    calls = []
+
+    def fetch():
+      calls.append(1)
+      return 'value'
+
+    self.assertEqual(cache.get_or_call('h', 'list_containers', {}, fetch), 'value')
+    self.assertEqual(cache.get_or_call('h', 'list_containers', {}, fetch), 'value')
+    self.assertEqual(len(calls), 1)
+    self.assertEqual((cache.hits, cache.misses), (1, 1))
+    time.sleep(0.06)
+    cache.get_or_call('h', 'list_containers', {}, fetch)
+    self.assertEqual(len(calls), 2)
+
+  def test_keys_include_host_and_args(self):
+    cache = ResponseCache(ttl=60)
+    cache.get_or_call('a', 'inspect_container', {'container': 'api'}, lambda: 'a-api')
+    self.assertEqual(cache.get_or_call('b', 'inspect_container', {'container': 'api'}, lambda: 'b-api'), 'b-api')
+    self.assertEqual(cache.get_or_call('a', 'inspect_container', {'container': 'db'}, lambda: 'a-db'), 'a-db')
+    self.assertEqual(cache.get('a', 'inspect_container', {'container': 'api'}), 'a-api')
+
+  def test_invalidate_target_keeps_other_containers(self):
+    cache = ResponseCache(ttl=60)
+    cache.get_or_call('h', 'inspect_container', {'container': 'api'}, lambda: 'api', target='api')
+    cache.get_or_call('h', 'inspect_container', {'container': 'db'}, lambda: 'db', target='db')
+    cache.get_or_call('h', 'list_containers', {}, lambda: 'list')
+    cache.get_or_call('other', 'inspect_container', {'container': 'api'}, lambda: 'api', target='api')
+    cache.invalidate('h', 'api')
+    self.assertIsNone(cache.get('h', 'inspect_container', {'container': 'api'}))
+    self.assertIsNone(cache.get('h', 'list_containers', {}))
+    self.assertEqual(cache.get('h', 'inspect_container', {'container': 'db'}), 'db')
+    self.assertEqual(cache.get('other', 'inspect_container', {'container': 'api'}), 'api')
+
+  def test_errors_are_not_cached(self):
+    cache = ResponseCache(ttl=60)
+
+    def fail():
+      raise RuntimeError('boom')
+
+    with self.assertRaises(RuntimeError):
+      cache.get_or_call('h', 'list_containers', {}, fail)
+    self.assertEqual(cache.get_or_call('h', 'list_containers', {}, lambda: 'ok'), 'ok')
+
+  def test_concurrent_misses_share_one_call(self):
+    cache = ResponseCache(ttl=60)
+    calls = []
+    release = threading.Event()
+
+    def slow():
+      calls.append(1)
+      release.wait(1)
+      return 'value'
+
+    results = []
+    threads = [
+      threading.Thread(target=lambda: results.append(cache.get_or_call('h', 'list_containers', {}, slow)))
+      for _ in range(5)
+    ]
+    for thread in threads:
+      thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(results, ['value'] * 5)
+    self.assertEqual(len(calls), 1)
+
+  def test_write_during_fetch_is_not_stored(self):
+    cache = ResponseCache(ttl=60)
+
+    def fetch():
+      cache.invalidate('h', 'api')
+      return 'stale'
+
+    self.assertEqual(cache.get_or_call('h', 'list_containers', {}, fetch), 'stale')
+    self.assertIsNone(cache.get('h', 'list_containers', {}))
+
+
+if __name__ == '__main__':
+  unittest.main()
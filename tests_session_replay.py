@@ -0,0 +1,151 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+import uuid
+import docker
+import requests
+from docker.errors import NotFound
+from requests.adapters import BaseAdapter
+from langchain_core.messages import AIMessage, HumanMessage, message_to_dict
+from langchain_core.outputs import ChatGeneration, LLMResult
+from llm.replay import ReplayChatModel
+from session_recorder import ReplayTransport, SessionRecorder, load_recording, step_times
+
+
+class FakeDaemon(BaseAdapter):
+  def __init__(self, bodies):
+    super().__init__()
+    self.bodies = bodies
+
+  def send(self, request, stream=False, **kwargs):
+    response = requests.Response()
+    response.status_code = 200
+    response.headers['Content-Type'] = 'application/json'
+    response._content = json.dumps(self.bodies.get(request.path_url.split('?')[0], {})).encode('utf-8')
+    response.request = request
+    return response
+
+  def close(self):
+    pass
+
+
+def make_client(adapter):
+  client = docker.DockerClient(base_url='tcp://docker.invalid:2375', version='1.43')
+  client.api.mount('http://', adapter)
+  return client
+
+
+def docker_event(path, body, status=200, **extra):
+  event = {'kind': 'docker', 'method': 'GET', 'path': path, 'status': status, 'body': json.dumps(body)}
+  event.update(extra)
+  return event
+
+
+class SessionRecorderTests(unittest.TestCase):
+  def test_records_turn_exchanges_and_outputs(self):
+    with tempfile.TemporaryDirectory() as tmp:
+      path = os.path.join(tmp, 'session.json')
+      recorder = SessionRecorder(path)
+      client = make_client(FakeDaemon({'/v1.43/containers/json': [{'Id': 'abc', 'Names': ['/web']}]}))
+      recorder.attach(client)
+      recorder.attach(client)
+      client.containers.list()
+      outputs = []
+      with recorder.turn('list containers', 'thread') as capture:
+        client.containers.list(all=True, sparse=True)
+        run_id = uuid.uuid4()
+        recorder.on_chat_model_start({}, [[HumanMessage(content='list containers')]], run_id=run_id)
+        message = AIMessage(content='web is running')
+        recorder.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]), run_id=run_id)
+        recorder.on_permission({'operation': 'restart_container', 'decision': 'denied'})
+        capture(outputs.append)('web is running')
+      turn = load_recording(path)['turns'][0]
+      self.assertEqual(outputs, ['web is running'])
+      self.assertEqual(turn['outputs'], ['web is running'])
+      self.assertEqual([e['kind'] for e in turn['events']], ['docker', 'llm', 'permission'])
+      docker_call = turn['events'][0]
+      self.assertTrue(docker_call['path'].startswith('/containers/json?'))
+      self.assertEqual(json.loads(docker_call['body'])[0]['Id'], 'abc')
+      self.assertEqual(turn['events'][1]['response']['data']['content'], 'web is running')
+      self.assertEqual(turn['events'][1]['request'][0]['data']['content'], 'list containers')
+      self.assertEqual(turn['events'][2]['decision'], 'denied')
+
+  def test_background_threads_are_left_out_of_turns(self):
+    recorder = SessionRecorder(os.path.join(tempfile.mkdtemp(), 'session.json'))
+    client = recorder.attach(make_client(FakeDaemon({})))
+    with recorder.turn('list containers'):
+      sampler = threading.Thread(target=client.containers.list, kwargs={'sparse': True}, name='stats-sampler')
+      sampler.start()
+      sampler.join()
+      client.api.inspect_container('abc')
+    paths = [e['path'] for e in recorder.data['turns'][0]['events']]
+    self.assertEqual(paths, ['/containers/abc/json'])
+    self.assertEqual(recorder.data['api_version'], '1.43')
+
+  def test_recording_is_readable_by_its_owner_only(self):
+    with tempfile.TemporaryDirectory() as tmp:
+      path = os.path.join(tmp, 'session.json')
+      # A stale world-readable tmp file must not leak its mode into the recording
+      with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+        f.write('{}')
+      os.chmod(f'{path}.tmp', 0o644)
+      recorder = SessionRecorder(path)
+      with recorder.turn('list containers'):
+        pass
+      self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+
+  def test_inactive_recorder_records_nothing(self):
+    recorder = SessionRecorder()
+    outputs = []
+    with recorder.turn('hi') as capture:
+      capture(outputs.append)('hello')
+    self.assertEqual(outputs, ['hello'])
+    self.assertIsNone(recorder.data)
+
+
+class ReplayTransportTests(unittest.TestCase):
+  def test_serves_recorded_responses_in_order_then_repeats_the_last(self):
+    transport = ReplayTransport()
+    transport.load(
+      [
+        docker_event('/containers/abc/json', {'Id': 'abc', 'State': {'Status': 'running'}}),
+        docker_event('/containers/abc/json', {'Id': 'abc', 'State': {'Status': 'exited'}}),
+      ]
+    )
+    api = make_client(transport).api
+    statuses = [api.inspect_container('abc')['State']['Status'] for _ in range(3)]
+    self.assertEqual(statuses, ['running', 'exited', 'exited'])
+    self.assertEqual(transport.calls, 3)
+
+  def test_unrecorded_and_streamed_requests(self):
+    transport = ReplayTransport()
+    transport.load([docker_event('/events', None, streamed=True)])
+    client = make_client(transport)
+    with self.assertRaises(NotFound):
+      client.api.inspect_container('missing')
+    self.assertEqual(transport.misses, ['GET /containers/missing/json'])
+    with self.assertRaises(requests.ConnectionError):
+      client.api.events()
+
+
+class ReplayChatModelTests(unittest.TestCase):
+  def test_answers_with_recorded_messages_in_order(self):
+    model = ReplayChatModel()
+    call = AIMessage(content='', tool_calls=[{'name': 'list_containers', 'args': {}, 'id': 'call_1'}])
+    model.load([{'response': message_to_dict(call)}, {'response': message_to_dict(AIMessage(content='done'))}])
+    bound = model.bind_tools([])
+    self.assertEqual(bound.invoke('hi').tool_calls[0]['name'], 'list_containers')
+    self.assertEqual(bound.invoke('hi').content, 'done')
+    with self.assertRaises(RuntimeError):
+      bound.invoke('hi')
+    self.assertEqual(len(model.calls), 3)
+
+  def test_step_times_are_the_gaps_around_llm_calls(self):
+    self.assertEqual(step_times([(10, 100), (150, 50)], 230), [10, 40, 30])
+    self.assertEqual(step_times([], 12.5), [12.5])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,151 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+import requests
+from docker.transport import SSHHTTPAdapter
+from ssh_transport import APIVersionCache, ManagedSSHAdapter
+
+
+class FakeTransport:
+  def __init__(self):
+    self.active = True
+    self.keepalive = None
+
+  def is_active(self):
+    return self.active
+
+  def set_keepalive(self, interval):
+    self.keepalive = interval
+
+
+class FakeSSHClient:
+  def __init__(self, failures=0):
+    self.failures = failures
+    self.connects = 0
+    self.transport = FakeTransport()
+
+  def connect(self, **params):
+    self.connects += 1
+    if self.connects <= self.failures:
+      raise OSError('connection refused')
+    self.transport = FakeTransport()
+
+  def get_transport(self):
+    return self.transport
+
+  def close(self):
+    self.transport.active = False
+
+
+def make_adapter(ssh_client, reconnect_retries=3):
+  # shell_out skips paramiko; the fake client stands in for it afterwards
+  adapter = ManagedSSHAdapter('ssh://user@example.com', reconnect_retries=reconnect_retries, shell_out=True)
+  adapter.ssh_client = ssh_client
+  adapter.ssh_params = {'hostname': 'example.com'}
+  return adapter
+
+
+class ManagedSSHAdapterTests(unittest.TestCase):
+  def setUp(self):
+    self.delays = []
+    self.calls = []
+    sleep = mock.patch('ssh_transport.time.sleep', side_effect=self.delays.append)
+    sleep.start()
+    self.addCleanup(sleep.stop)
+
+  def fail_send(self, adapter, request, *args, **kwargs):
+    self.calls.append(request.method)
+    raise requests.exceptions.ConnectionError('channel closed')
+
+  def send(self, adapter, method):
+    request = requests.Request(method, 'http+docker://ssh/containers/json').prepare()
+    with mock.patch.object(SSHHTTPAdapter, 'send', side_effect=self.fail_send, autospec=True):
+      with self.assertRaises(requests.exceptions.ConnectionError):
+        adapter.send(request)
+
+  def test_only_idempotent_methods_are_retried(self):
+    client = FakeSSHClient()
+    adapter = make_adapter(client, reconnect_retries=2)
+    self.send(adapter, 'GET')
+    self.assertEqual(self.calls, ['GET'] * 3)
+    self.send(adapter, 'HEAD')
+    self.assertEqual(self.calls.count('HEAD'), 3)
+    for method in ('POST', 'DELETE', 'PUT'):
+      self.send(adapter, method)
+      self.assertEqual(self.calls.count(method), 1)
+    self.assertEqual(client.connects, 0)
+
+  def test_dead_transport_is_reopened_before_retrying(self):
+    client = FakeSSHClient()
+    client.transport.active = False
+    adapter = make_adapter(client, reconnect_retries=1)
+    self.send(adapter, 'GET')
+    self.assertEqual(client.connects, 1)
+    self.assertTrue(adapter.is_alive())
+    self.assertEqual(client.transport.keepalive, adapter.keepalive)
+
+  def test_backoff_doubles_and_is_capped(self):
+    adapter = make_adapter(FakeSSHClient(), reconnect_retries=7)
+    self.send(adapter, 'GET')
+    self.assertEqual(self.delays, [0.5, 1, 2, 4, 8, 10, 10])
+
+  def test_connect_gives_up_after_the_retries(self):
+    client = FakeSSHClient(failures=10)
+    adapter = make_adapter(client, reconnect_retries=3)
+    with self.assertRaises(OSError):
+      adapter._connect()
+    self.assertEqual(client.connects, 4)
+    self.assertEqual(self.delays, [0.5, 1, 2])
+
+  def test_connect_recovers_from_a_blip(self):
+    client = FakeSSHClient(failures=1)
+    adapter = make_adapter(client)
+    adapter._connect()
+    self.assertEqual(client.connects, 2)
+    self.assertEqual(self.delays, [0.5])
+
+
+class APIVersionCacheTests(unittest.TestCase):
+  def setUp(self):
+    tmp = tempfile.TemporaryDirectory()
+    self.addCleanup(tmp.cleanup)
+    self.path = os.path.join(tmp.name, 'versions.json')
+
+  def test_round_trip(self):
+    APIVersionCache(self.path, ttl_seconds=60).set('ssh://prod', '1.43')
+    self.assertEqual(APIVersionCache(self.path, ttl_seconds=60).get('ssh://prod'), '1.43')
+    self.assertIsNone(APIVersionCache(self.path, ttl_seconds=60).get('ssh://staging'))
+    with open(self.path, encoding='utf-8') as f:
+      self.assertTrue(json.load(f)['ssh://prod']['updated_at'].endswith('+00:00'))
+
+  def test_entries_expire_after_the_ttl(self):
+    cache = APIVersionCache(self.path, ttl_seconds=60)
+    cache.set('ssh://prod', '1.43')
+    with open(self.path, encoding='utf-8') as f:
+      data = json.load(f)
+    data['ssh://prod']['cached_at'] = time.time() - 61
+    with open(self.path, 'w', encoding='utf-8') as f:
+      json.dump(data, f)
+    self.assertIsNone(cache.get('ssh://prod'))
+
+  def test_invalidate(self):
+    cache = APIVersionCache(self.path, ttl_seconds=60)
+    cache.set('ssh://prod', '1.43')
+    cache.set('ssh://staging', '1.41')
+    cache.invalidate('ssh://prod')
+    self.assertIsNone(cache.get('ssh://prod'))
+    self.assertEqual(cache.get('ssh://staging'), '1.41')
+    cache.invalidate()
+    self.assertIsNone(cache.get('ssh://staging'))
+
+  def test_unreadable_file_is_a_miss(self):
+    with open(self.path, 'w', encoding='utf-8') as f:
+      f.write('{not json')
+    self.assertIsNone(APIVersionCache(self.path, ttl_seconds=60).get('ssh://prod'))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,95 @@
+import os
+import tempfile
+import unittest
+from stats_sampler import StatsSampler
+from stats_store import StatsSeries, StatsStore, downsample, parse_stats_sample, summarize
+
+
+def make_sample(ts, mem):
+  return {'timestamp': ts, 'cpu_percent': 1.0, 'mem_usage': mem, 'mem_percent': mem / 10}
+
+
+class StatsSeriesTests(unittest.TestCase):
+  def test_ring_buffer_keeps_latest_samples_in_order(self):
+    series = StatsSeries(capacity=3)
+    for i in range(5):
+      series.append(make_sample(i, i * 10))
+    self.assertEqual(len(series), 3)
+    self.assertEqual(series.column('timestamp'), [2, 3, 4])
+    self.assertEqual(series.column('mem_usage', since=3), [30, 40])
+    self.assertEqual(series.latest()['timestamp'], 4)
+
+  def test_memory_mapped_series_survives_reopen(self):
+    with tempfile.TemporaryDirectory() as tmp:
+      store = StatsStore(capacity=4, persist_dir=tmp)
+      for i in range(6):
+        store.record('web/1', make_sample(i, i))
+      store.close()
+      self.assertTrue(os.path.exists(os.path.join(tmp, 'web_1.stats')))
+
+      reopened = StatsStore(capacity=4, persist_dir=tmp)
+      self.assertEqual(reopened.history('web/1')['timestamp'], [2, 3, 4, 5])
+      reopened.close()
+
+
+class StatsParsingTests(unittest.TestCase):
+  def test_parse_stats_sample_matches_docker_stats(self):
+    stats = {
+      'cpu_stats': {'cpu_usage': {'total_usage': 400}, 'system_cpu_usage': 2000, 'online_cpus': 2},
+      'precpu_stats': {'cpu_usage': {'total_usage': 200}, 'system_cpu_usage': 1000},
+      'memory_stats': {'usage': 600, 'limit': 1000, 'stats': {'inactive_file': 100}},
+      'networks': {'eth0': {'rx_bytes': 10, 'tx_bytes': 20}, 'eth1': {'rx_bytes': 1, 'tx_bytes': 2}},
+      'blkio_stats': {'io_service_bytes_recursive': [{'op': 'Read', 'value': 5}, {'op': 'Write', 'value': 7}]},
+    }
+    sample = parse_stats_sample(stats, timestamp=1)
+    self.assertAlmostEqual(sample['cpu_percent'], 40.0)
+    self.assertEqual(sample['mem_usage'], 500)
+    self.assertAlmostEqual(sample['mem_percent'], 50.0)
+    self.assertEqual((sample['net_rx'], sample['net_tx']), (11, 22))
+    self.assertEqual((sample['blk_read'], sample['blk_write']), (5, 7))
+
+  def test_summaries_and_downsampling(self):
+    ts = [0, 60, 120, 180]
+    summary = summarize(ts, [1, 2, 3, 4])
+    self.assertEqual((summary['min'], summary['max']), (1, 4))
+    self.assertAlmostEqual(summary['slope_per_min'], 1.0)
+    self.assertEqual(downsample(ts, [1, 2, 3, 4], 2), [(60, 1.5), (180, 3.5)])
+
+
+class _FakeContainer:
+  def __init__(self, index):
+    self.id = f'id{index}'
+    self.attrs = {'Names': [f'/c{index}']}
+
+
+class _FakeClient:
+  def __init__(self, count):
+    self.count = count
+    self.api = self
+    self.containers = self
+
+  def list(self, sparse=False):
+    return [_FakeContainer(i) for i in range(self.count)]
+
+  def stats(self, container_id, stream=False):
+    index = int(container_id[2:])
+    return {
+      'cpu_stats': {'cpu_usage': {'total_usage': 100 + index}, 'system_cpu_usage': 200, 'online_cpus': 1},
+      'precpu_stats': {'cpu_usage': {'total_usage': 100}, 'system_cpu_usage': 100},
+      'memory_stats': {'usage': 1000 - index, 'limit': 10000},
+    }
+
+
+class StatsSamplerTests(unittest.TestCase):
+  def test_sample_once_records_every_container(self):
+    store = StatsStore(capacity=4)
+    sampler = StatsSampler(lambda: _FakeClient(5), store, max_workers=2)
+    samples = sampler.sample_once()
+    self.assertEqual(sorted(samples), [f'c{i}' for i in range(5)])
+    self.assertAlmostEqual(samples['c4']['cpu_percent'], 4.0)
+    self.assertEqual(store.latest('c0')['mem_usage'], 1000)
+    self.assertFalse(sampler.is_fresh())
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,106 @@
+"""Shared setup for tests that drive backend tools against a fake Docker client."""
+
+import importlib
+import os
+import threading
+import time
+import unittest
+from docker.errors import NotFound
+
+
+def load_backend():
+  # The backend builds its LLM router on import; the replay provider needs no credentials
+  os.environ.setdefault('LLM_PROVIDERS', 'replay')
+  return importlib.import_module('backend')
+
+
+class FakeContainer:
+  def __init__(self, name, **attrs):
+    self.name = name
+    self.client = None
+    self.attrs = {'Id': f'{name}-id', 'Names': [f'/{name}'], 'Image': 'app', 'State': 'running', 'Status': 'Up'}
+    self.attrs.update(attrs)
+    self.id = self.attrs['Id']
+
+  def logs(self, tail=50):
+    self.client.record('logs', self.name)
+    return b'started\n'
+
+
+class FakeContainers:
+  def __init__(self, client, containers):
+    self.client = client
+    self.containers = containers
+    # Lets a test keep a get() in flight long enough for a concurrent caller to join it
+    self.get_delay = 0
+
+  def list(self, all=False, filters=None, sparse=False):
+    self.client.record('list', {'all': all, 'filters': filters, 'sparse': sparse})
+    return [c for c in self.containers if all or c.attrs['State'] == 'running']
+
+  def get(self, name):
+    self.client.record('get', name)
+    time.sleep(self.get_delay)
+    for container in self.containers:
+      if name in (container.name, container.id):
+        return container
+    raise NotFound(f'No such container: {name}')
+
+
+class FakeClient:
+  """Docker client double that records every call as (kind, argument)."""
+
+  def __init__(self, containers=(), api=None, system_df=None):
+    self.calls = []
+    self._lock = threading.Lock()
+    self.containers = FakeContainers(self, list(containers))
+    for container in self.containers.containers:
+      container.client = self
+    self.api = api
+    self.system_df = system_df
+    # Delivered once by the next events() subscription
+    self.pending_events = []
+
+  def record(self, kind, argument):
+    with self._lock:
+      self.calls.append((kind, argument))
+
+  def calls_of(self, kind):
+    with self._lock:
+      return [argument for call_kind, argument in self.calls if call_kind == kind]
+
+  def count(self, kind, argument=None):
+    return sum(1 for call in self.calls_of(kind) if argument is None or call == argument)
+
+  def events(self, decode=False, since=None, filters=None):
+    self.record('events', filters)
+    events, self.pending_events = self.pending_events, []
+    return iter(events)
+
+  def df(self):
+    self.record('df', None)
+    return self.system_df()
+
+  def close(self):
+    pass
+
+
+class BackendTestCase(unittest.TestCase):
+  """Imports the backend once per class; use_docker_client() swaps in a fake for one test."""
+
+  @classmethod
+  def setUpClass(cls):
+    cls.backend = load_backend()
+
+  def use_docker_client(self, client):
+    backend = self.backend
+    factory = backend.docker_pool.factory
+    backend.docker_pool.factory = lambda name: client
+    backend.reset_docker_client()
+
+    def restore():
+      backend.docker_pool.factory = factory
+      backend.reset_docker_client()
+
+    self.addCleanup(restore)
+    return client
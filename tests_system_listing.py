@@ -0,0 +1,126 @@
+import time
+import unittest
+from tests_support import BackendTestCase, FakeClient, FakeContainer
+
+
+MB = 1024 * 1024
+DAY = 86400
+
+
+def system_df():
+  now = time.time()
+  return {
+    'Images': [
+      {
+        'Id': 'sha256:' + 'a' * 64,
+        'RepoTags': ['nginx:1.25'],
+        'Size': 190 * MB,
+        'SharedSize': 80 * MB,
+        'Containers': 2,
+        'Created': now - 30 * DAY,
+      },
+      {
+        'Id': 'sha256:' + 'b' * 64,
+        'RepoTags': ['<none>:<none>'],
+        'Size': 50 * MB,
+        'SharedSize': -1,
+        'Containers': 0,
+        'Created': now - 10 * DAY,
+      },
+      {
+        'Id': 'sha256:' + 'c' * 64,
+        'RepoTags': ['redis:7'],
+        'Size': 120 * MB,
+        'SharedSize': 0,
+        'Containers': 0,
+        'Created': now - 2 * DAY,
+      },
+    ],
+    'Volumes': [
+      {'Name': 'pgdata', 'Driver': 'local', 'UsageData': {'Size': 500 * MB, 'RefCount': 1}},
+      {'Name': 'old-cache', 'Driver': 'local', 'UsageData': {'Size': 20 * MB, 'RefCount': 0}},
+      {'Name': 'scratch', 'Driver': 'local', 'UsageData': {'Size': -1, 'RefCount': 0}},
+    ],
+  }
+
+
+def attached_container(name, networks):
+  settings = {'Networks': {net: {'NetworkID': nid} for net, nid in networks.items()}}
+  return FakeContainer(name, NetworkSettings=settings)
+
+
+class FakeAPI:
+  def __init__(self):
+    self.calls = []
+
+  def images(self, quiet=False, filters=None):
+    self.calls.append(('images', filters))
+    return ['sha256:' + 'c' * 64] if filters.get('reference') == 'redis' else []
+
+  def volumes(self, filters=None):
+    self.calls.append(('volumes', filters))
+    names = ['old-cache', 'scratch'] if filters.get('dangling') else ['pgdata']
+    return {'Volumes': [{'Name': name} for name in names]}
+
+  def networks(self, filters=None):
+    self.calls.append(('networks', filters))
+    return [
+      {'Name': 'bridge', 'Id': 'net-bridge', 'Driver': 'bridge', 'Scope': 'local'},
+      {'Name': 'host', 'Id': 'net-host', 'Driver': 'host', 'Scope': 'local'},
+      {'Name': 'app', 'Id': 'net-app', 'Driver': 'bridge', 'Scope': 'local'},
+      {'Name': 'legacy', 'Id': 'net-legacy', 'Driver': 'bridge', 'Scope': 'local'},
+    ]
+
+
+class SystemListingTests(BackendTestCase):
+  def setUp(self):
+    containers = [
+      attached_container('web', {'app': 'net-app'}),
+      attached_container('proxy', {'app': 'net-app', 'bridge': 'net-bridge'}),
+    ]
+    self.client = self.use_docker_client(FakeClient(containers, api=FakeAPI(), system_df=system_df))
+
+  def test_images_come_from_one_df_call(self):
+    lines = self.backend.list_images.invoke({}).splitlines()
+    self.assertEqual(
+      lines[0], '3 images, 360.0MiB total; dangling: 1 (50.0MiB); unused: 2 (170.0MiB, shared layers not deducted)'
+    )
+    self.assertTrue(lines[2].startswith('nginx:1.25 | aaaaaaaaaaaa | 190.0MiB | 80.0MiB | 2 | 30'))
+    self.assertTrue(lines[4].startswith('<none> | bbbbbbbbbbbb | 50.0MiB | - | 0'))
+    self.backend.list_images.invoke({'sort_by': 'name'})
+    self.backend.list_volumes.invoke({})
+    self.assertEqual(self.client.count('df'), 1)
+
+  def test_image_filters_unused_only_and_limit(self):
+    unused = self.backend.list_images.invoke({'unused_only': True, 'sort_by': 'created'}).splitlines()
+    self.assertEqual([line.split(' | ')[0] for line in unused[2:]], ['redis:7', '<none>'])
+    filtered = self.backend.list_images.invoke({'reference': 'redis'}).splitlines()
+    self.assertTrue(filtered[0].startswith('1 images'))
+    self.assertEqual(self.client.api.calls, [('images', {'reference': 'redis'})])
+    limited = self.backend.list_images.invoke({'limit': 1}).splitlines()
+    self.assertEqual(len(limited), 4)
+    self.assertEqual(limited[-1], '... 2 more')
+    self.assertIn('limit must be at least 1', self.backend.list_images.invoke({'limit': 0}))
+
+  def test_volumes_unused_only_and_limit(self):
+    lines = self.backend.list_volumes.invoke({}).splitlines()
+    self.assertEqual(lines[0], '3 volumes, 520.0MiB total; unused: 2 (20.0MiB)')
+    self.assertEqual(lines[2], 'pgdata | local | 500.0MiB | 1')
+    unused = self.backend.list_volumes.invoke({'unused_only': True}).splitlines()
+    self.assertEqual([line.split(' | ')[0] for line in unused[2:]], ['old-cache', 'scratch'])
+    self.assertEqual(self.client.api.calls, [('volumes', {'dangling': True})])
+    limited = self.backend.list_volumes.invoke({'limit': 1}).splitlines()
+    self.assertEqual(limited[-1], '... 2 more')
+    self.assertIn('limit must be at least 1', self.backend.list_volumes.invoke({'limit': -1}))
+
+  def test_networks_count_attachments_and_flag_unused_user_networks(self):
+    lines = self.backend.list_networks.invoke({}).splitlines()
+    self.assertEqual(lines[0], '4 networks; unused: 1 (legacy)')
+    self.assertIn('app | net-app | bridge | local | 2', lines)
+    self.assertIn('host | net-host | host | local | 0', lines)
+    unused = self.backend.list_networks.invoke({'unused_only': True}).splitlines()
+    self.assertEqual(unused[2:], ['legacy | net-legacy | bridge | local | 0'])
+
+
+if __name__ == '__main__':
+  unittest.main()
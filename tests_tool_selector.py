@@ -0,0 +1,81 @@
+import json
+import os
+import tempfile
+import unittest
+import uuid
+from unittest import mock
+from langchain_core.messages import AIMessage, message_to_dict
+from llm.replay import llm as replay_llm
+from tests_support import BackendTestCase, FakeClient, FakeContainer
+from tool_selector import CORE_TOOLS, DEFAULT_TOOL_KEYWORDS, ToolSelector
+
+
+TOOLS = list(CORE_TOOLS) + list(DEFAULT_TOOL_KEYWORDS)
+
+
+class ToolSelectorTests(unittest.TestCase):
+  def test_selects_matching_tools_plus_core(self):
+    selector = ToolSelector(TOOLS, log_file=os.devnull)
+    selected = selector.select('Show nginx errors from the logs')
+    self.assertIn('get_docker_logs', selected)
+    self.assertTrue(set(CORE_TOOLS) <= set(selected))
+    self.assertNotIn('delete_image', selected)
+    self.assertEqual(selected, [name for name in TOOLS if name in selected])
+
+  def test_word_variants_match(self):
+    selector = ToolSelector(TOOLS, log_file=os.devnull)
+    self.assertIn('restart_docker_container', selector.select('it keeps restarting, restarted twice'))
+    self.assertIn('download_image', selector.select('pull the latest images'))
+
+  def test_unmatched_question_offers_every_tool(self):
+    selector = ToolSelector(TOOLS, log_file=os.devnull)
+    self.assertIsNone(selector.select('yes, go ahead'))
+
+  def test_tools_without_keywords_are_always_offered(self):
+    selector = ToolSelector(TOOLS + ['new_tool'], log_file=os.devnull)
+    self.assertIn('new_tool', selector.select('show the logs'))
+
+  def test_record_traces_and_counts(self):
+    with tempfile.TemporaryDirectory() as tmp:
+      path = os.path.join(tmp, 'tool_selection.log')
+      selector = ToolSelector(TOOLS, log_file=path)
+      selector.record({'selected': ['list_containers'], 'fallback': True, 'schema_tokens_saved': 500})
+      selector.record({'selected': None, 'fallback': False, 'schema_tokens_saved': 0})
+      with open(path, encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f]
+      self.assertEqual(len(entries), 2)
+      self.assertEqual(selector.stats(), {'turns': 2, 'narrowed_turns': 1, 'fallbacks': 1, 'tokens_saved': 500})
+
+
+class ToolFallbackTests(BackendTestCase):
+  def setUp(self):
+    self.client = self.use_docker_client(FakeClient([FakeContainer('api')]))
+    selector = ToolSelector([t.name for t in self.backend.tools], log_file=os.devnull)
+    patch = mock.patch.object(self.backend, 'tool_selector', selector)
+    patch.start()
+    self.addCleanup(patch.stop)
+    self.addCleanup(replay_llm.load, [])
+
+  def test_call_outside_the_subset_resumes_with_every_tool(self):
+    question = 'restart api'
+    self.assertNotIn('get_docker_logs', self.backend.tool_selector.select(question))
+    logs_call = {'id': 'c1', 'name': 'get_docker_logs', 'args': {'container_name': 'api'}}
+    answers = [AIMessage(content='', tool_calls=[logs_call]), AIMessage(content='api started cleanly')]
+    replay_llm.load([{'kind': 'llm', 'response': message_to_dict(m)} for m in answers])
+
+    thread_id = uuid.uuid4().hex
+    outputs = []
+    self.backend.run_agent_flow(question, thread_id=thread_id, emit=outputs.append)
+
+    self.assertEqual(outputs, ['api started cleanly'])
+    # The narrowed agent's tool call ran once, on the full agent resumed from its checkpoint
+    self.assertEqual(self.client.count('logs', 'api'), 1)
+    self.assertEqual(len(replay_llm.calls), 2)
+    self.assertEqual(self.backend.tool_selector.stats()['fallbacks'], 1)
+    config = {'configurable': {'thread_id': thread_id}}
+    messages = self.backend.agent_executor.get_state(config).values['messages']
+    self.assertEqual([m.type for m in messages], ['human', 'ai', 'tool', 'ai'])
+
+
+if __name__ == '__main__':
+  unittest.main()
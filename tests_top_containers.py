@@ -0,0 +1,51 @@
+import unittest
+from tests_support import BackendTestCase
+
+
+MB = 1024 * 1024
+
+
+class FakeSampler:
+  def __init__(self, samples):
+    self.samples = samples
+    self.rounds = 0
+
+  def is_fresh(self):
+    return False
+
+  def sample_once(self):
+    self.rounds += 1
+    return self.samples
+
+
+class TopContainersTests(BackendTestCase):
+  def setUp(self):
+    self.sampler = FakeSampler(
+      {
+        'api': {'cpu_percent': 40.0, 'mem_usage': 100 * MB, 'mem_limit': 0, 'mem_percent': 5.0},
+        'db': {'cpu_percent': 5.0, 'mem_usage': 900 * MB, 'mem_limit': 1024 * MB, 'mem_percent': 87.9},
+        'worker': {'cpu_percent': 75.5, 'mem_usage': 300 * MB, 'mem_limit': 0, 'mem_percent': 15.0},
+      }
+    )
+    self._sampler = self.backend.stats_sampler
+    self.backend.stats_sampler = self.sampler
+
+  def tearDown(self):
+    self.backend.stats_sampler = self._sampler
+
+  def test_ranks_by_memory_and_cpu(self):
+    lines = self.backend.top_containers.invoke({'limit': 2}).splitlines()
+    self.assertEqual(lines[0], 'Top 2 of 3 running containers by memory:')
+    self.assertEqual(lines[2], '1 | db | 5.0 | 900.0MiB / 1.0GiB | 87.9')
+    self.assertEqual(len(lines), 4)
+    by_cpu = self.backend.top_containers.invoke({'sort_by': 'cpu'}).splitlines()
+    self.assertEqual([line.split(' | ')[1] for line in by_cpu[2:]], ['worker', 'api', 'db'])
+
+  def test_limit_below_one_is_rejected_without_sampling(self):
+    for limit in (0, -3):
+      self.assertEqual(self.backend.top_containers.invoke({'limit': limit}), 'Error: limit must be at least 1')
+    self.assertEqual(self.sampler.rounds, 0)
+
+
+if __name__ == '__main__':
+  unittest.main()
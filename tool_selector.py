@@ -0,0 +1,106 @@
+import json
+import re
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+# Tools offered on every turn; cheap, generic lookups most questions need
+CORE_TOOLS = ('list_containers', 'inspect_container')
+
+DEFAULT_TOOL_KEYWORDS = {
+  'check_resource': 'cpu memory mem ram disk resource load usage host server machine',
+  'get_docker_logs': 'log error exception crash fail failure trace traceback warn warning output stderr',
+  'export_logs': 'export snapshot archive save dump collect gzip',
+  'restart_docker_container': 'restart reboot bounce recover',
+  'create_container': 'create launch deploy new run',
+  'delete_container': 'delete remove rm destroy',
+  'stop_container': 'stop halt shutdown kill',
+  'start_monitoring': 'monitor monitoring watch threshold alert',
+  'stats_history': 'trend history hour minute day grow growing leak spike usage cpu memory mem stat',
+  'top_containers': 'top most heaviest rank hog busiest usage cpu memory mem consuming',
+  'watch_events': 'event watch alert crash oom unhealthy',
+  'exec_command': 'exec execute command shell inside run curl ps env cat ls',
+  'copy_from_container': 'copy cp file files dump heap config fetch extract',
+  'copy_to_container': 'copy cp file files upload put push config into',
+  'download_image': 'pull download image',
+  'build_image': 'build rebuild dockerfile image tag compile',
+  'delete_image': 'image rmi delete remove',
+  'list_images': 'image images disk space size dangling unused untagged tag',
+  'list_volumes': 'volume volumes disk space size dangling unused storage',
+  'list_networks': 'network networks subnet bridge overlay unused',
+  'reclaim_space': 'disk space full free reclaim prune cleanup clean dangling unused cache',
+  'fleet_list_containers': 'fleet hosts servers group across unhealthy',
+  'fleet_find_image': 'fleet hosts servers group across where which image version',
+}
+
+_SUFFIXES = ('s', 'es', 'ing', 'ed')
+
+
+def _variants(word):
+  yield word
+  for suffix in _SUFFIXES:
+    if word.endswith(suffix) and len(word) > len(suffix) + 2:
+      yield word[: -len(suffix)]
+
+
+class ToolSelector:
+  """Picks the tools relevant to a question by keyword, so each LLM call carries fewer tool schemas.
+
+  Tools without keywords and the CORE_TOOLS are always offered; a question that matches
+  no keyword gets every tool. Each turn can be traced as one JSON line in
+  `logs/tool_selection.log` with the schema tokens it saved.
+  """
+
+  def __init__(self, tool_names, keywords=None, core=CORE_TOOLS, log_file=None):
+    if keywords is None:
+      keywords = DEFAULT_TOOL_KEYWORDS
+    self.tool_names = list(tool_names)
+    self.keywords = {name: set(words.split()) for name, words in keywords.items()}
+    self.core = set(core)
+    if log_file is None:
+      log_file = Path('logs') / 'tool_selection.log'
+    self.log_file = Path(log_file)
+    self.turns = 0
+    self.narrowed_turns = 0
+    self.fallbacks = 0
+    self.tokens_saved = 0
+    self._lock = threading.Lock()
+
+  def select(self, text):
+    """Returns the ordered subset of tool names for `text`, or None when every tool should be offered."""
+    words = set()
+    for word in re.findall(r'[a-z0-9]+', text.lower()):
+      words.update(_variants(word))
+    matched = {name for name, keys in self.keywords.items() if keys & words}
+    if not matched:
+      return None
+    selected = [n for n in self.tool_names if n in matched or n in self.core or n not in self.keywords]
+    if len(selected) == len(self.tool_names):
+      return None
+    return selected
+
+  def record(self, entry):
+    """Accumulates counters for diagnostics and appends the turn's trace to the selection log."""
+    with self._lock:
+      self.turns += 1
+      if entry.get('selected') is not None:
+        self.narrowed_turns += 1
+      if entry.get('fallback'):
+        self.fallbacks += 1
+      self.tokens_saved += entry.get('schema_tokens_saved', 0)
+      try:
+        self.log_file.parent.mkdir(parents=True, exist_ok=True)
+        with self.log_file.open('a', encoding='utf-8') as f:
+          f.write(json.dumps({'timestamp': datetime.now(timezone.utc).isoformat(), **entry}) + '\n')
+      except OSError:
+        pass
+
+  def stats(self):
+    with self._lock:
+      return {
+        'turns': self.turns,
+        'narrowed_turns': self.narrowed_turns,
+        'fallbacks': self.fallbacks,
+        'tokens_saved': self.tokens_saved,
+      }